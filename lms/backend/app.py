@@ -1,11 +1,23 @@
 """
 Main Flask application for VREC Library Management System
 """
-from flask import Flask, jsonify
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
-from backend.config import DEBUG, HOST, PORT
-from backend.utils.db_helper import init_db
+from backend.config import DEBUG, HOST, PORT, SCHEDULER_ENABLED
+from backend.utils.db_helper import (
+    init_db, rebuild_circulation_counters, get_db_connection, connection_pool, writer_queue
+)
+from backend.utils.migration_helper import check_query_plans
+from backend.utils.scheduler_helper import start_background_jobs, sweep_overdue_transactions
+from backend.utils.session_helper import sweep_expired_sessions
+from backend.utils.json_helper import JSONEncoder
+from backend.utils.metrics_helper import metrics
+from backend.utils.slow_query_helper import slow_query_report
+from backend.utils.jwt_helper import token_cache
+from backend.utils.password_helper import password_pool
+import click
 import logging
+import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -22,6 +34,9 @@ CORS(app)
 # Load configuration
 app.config.from_object('backend.config')
 
+# Serialize responses with the configured JSON backend
+app.json_encoder = JSONEncoder
+
 # Import routes
 from backend.routes.frontend import frontend_bp
 from backend.routes.auth import auth_bp
@@ -36,6 +51,47 @@ app.register_blueprint(books_bp, url_prefix='/api/books')
 app.register_blueprint(transactions_bp, url_prefix='/api/transactions')
 app.register_blueprint(academic_bp, url_prefix='/api/academic')
 
+from backend.routes.books import book_cache
+from backend.routes.academic import academic_cache
+
+# Request metrics
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    metrics.begin_request()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        metrics.end_request(
+            request.endpoint or 'unmatched', response.status_code, time.perf_counter() - started
+        )
+    return response
+
+def runtime_gauges():
+    """Pool, queue and cache gauges of this worker"""
+    pool = connection_pool.stats()
+    gauges = {
+        ('lms_db_pool_size', ()): pool['size'],
+        ('lms_db_pool_idle_connections', ()): pool['idle'],
+        ('lms_db_writer_queue_pending', ()): writer_queue.stats()['pending'],
+        ('lms_password_pool_rejected', ()): password_pool.rejected,
+    }
+    for name, cache in (('academic', academic_cache), ('books', book_cache), ('tokens', token_cache)):
+        stats = cache.stats()
+        labels = (('cache', name),)
+        gauges[('lms_cache_hits', labels)] = stats['hits']
+        gauges[('lms_cache_misses', labels)] = stats['misses']
+        gauges[('lms_cache_entries', labels)] = stats['entries']
+    return gauges
+
+metrics.register_gauges(runtime_gauges)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
@@ -51,6 +107,73 @@ def internal_error(error):
 def health_check():
     return jsonify({'status': 'healthy'}), 200
 
+# Start background jobs once per worker, after gunicorn has forked
+@app.before_first_request
+def start_jobs():
+    if SCHEDULER_ENABLED:
+        start_background_jobs()
+
+# Maintenance commands
+@app.cli.command('rebuild-counters')
+def rebuild_counters_command():
+    """Recompute circulation counters from the transactions table"""
+    rebuild_circulation_counters()
+    logger.info("Circulation counters rebuilt")
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Fail if any hot route query needs a full table scan"""
+    init_db()
+    connection = get_db_connection()
+    try:
+        failures = check_query_plans(connection)
+    finally:
+        connection.close()
+    for name, scans in failures.items():
+        logger.error(f"{name}: {'; '.join(scans)}")
+    if failures:
+        raise SystemExit(1)
+    logger.info("All hot queries use indexes")
+
+@app.cli.command('sweep-overdue')
+def sweep_overdue_command():
+    """Mark issued books past their due date as overdue"""
+    marked = sweep_overdue_transactions()
+    logger.info(f"{marked} transactions marked overdue")
+
+@app.cli.command('clear-metrics')
+def clear_metrics_command():
+    """Delete the per-worker metric files; run before starting a new deployment"""
+    metrics.clear()
+    logger.info("Metrics cleared")
+
+@app.cli.command('slow-queries')
+@click.option('--top', default=20, show_default=True, help='Number of statements to show')
+@click.option('--order-by', default='total_ms', show_default=True,
+              type=click.Choice(['total_ms', 'count', 'max_ms', 'mean_ms']))
+def slow_queries_command(top, order_by):
+    """Report the slowest statements in the slow-query log"""
+    report = slow_query_report(top=top, order_by=order_by)
+    if not report:
+        click.echo("No slow queries logged")
+        return
+    for stats in report:
+        click.echo(
+            f"{stats['fingerprint']}  count={stats['count']}  total={stats['total_ms']:.1f}ms  "
+            f"mean={stats['mean_ms']:.1f}ms  max={stats['max_ms']:.1f}ms  "
+            f"rows={stats['mean_rows']:.0f}  last={stats['last_seen']}"
+        )
+        click.echo(f"    {stats['sql']}")
+        for detail in stats['plan'] or []:
+            click.echo(f"    plan: {detail}")
+        click.echo()
+
+@app.cli.command('sweep-sessions')
+def sweep_sessions_command():
+    """Delete refresh token sessions past their expiry"""
+    deleted = sweep_expired_sessions()
+    logger.info(f"{deleted} expired sessions deleted")
+
 if __name__ == '__main__':
     try:
         # Initialize the database
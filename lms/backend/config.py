@@ -5,17 +5,75 @@ import os
 from datetime import timedelta
 
 # Database Configuration
-DATABASE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'vrec_lms.db')
+DATABASE_PATH = os.environ.get(
+    'LMS_DATABASE_PATH', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'vrec_lms.db')
+)
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'  # Stored form of every timestamp; sorts chronologically as text
+
+# Connection Pool Configuration
+DB_POOL_SIZE = 8                    # Idle connections kept per worker process (0 disables pooling)
+DB_POOL_HEALTH_CHECK_INTERVAL = 30  # Seconds a connection may sit idle before it is re-validated
+
+# SQLite Storage Engine Configuration (applied as PRAGMAs on every connection)
+DB_JOURNAL_MODE = 'WAL'             # Readers never block on the writer
+DB_SYNCHRONOUS = 'NORMAL'           # fsync on checkpoint only; safe with WAL
+DB_MMAP_SIZE = 256 * 1024 * 1024    # Bytes of the database file to memory-map
+DB_CACHE_SIZE = -64000              # Negative values are KiB (64 MB page cache)
+DB_BUSY_TIMEOUT = 5000              # Milliseconds to wait on a lock held by another worker
 
 # JWT Configuration
 JWT_SECRET_KEY = 'your-secret-key-here'  # Change in production
 JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
+JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+TOKEN_CACHE_MAX_ENTRIES = 4096  # Verified tokens kept per worker (0 disables the cache)
+
+# Password Hashing Configuration
+PASSWORD_HASH_ROUNDS = 12        # bcrypt work factor for new hashes (each step doubles the cost)
+PASSWORD_POOL_WORKERS = 2        # Hashing processes per worker (0 hashes inline)
+PASSWORD_POOL_MAX_PENDING = 8    # Hash jobs admitted per worker before logins get 503
+PASSWORD_POOL_TIMEOUT = 10       # Seconds to wait for a hash result
 
 # Application Configuration
 DEBUG = True
 HOST = '0.0.0.0'  # Allow external connections
 PORT = 8000       # Use port 8000 for web environment
 
+# JSON Configuration
+JSON_BACKEND = 'auto'   # 'orjson', 'stdlib', or 'auto' (orjson when installed)
+JSON_SORT_KEYS = False  # Keep row column order instead of sorting keys on every response
+
+# Reference Data Cache Configuration
+CACHE_VERSION_TTL = 1.0   # Seconds a worker trusts its cached version before re-reading it
+CACHE_MAX_ENTRIES = 256   # Cached responses kept per namespace
+BARCODE_CACHE_MAX_ENTRIES = 4096  # Resolved barcodes kept per worker
+BARCODE_LOOKUP_CHUNK = 500        # Barcodes per IN query when resolving a batch
+
+# Metrics Configuration
+METRICS_ENABLED = True
+METRICS_DIR = os.environ.get(
+    'LMS_METRICS_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'metrics')
+)                           # One memory-mapped counter file per worker process; clear on deploy
+METRICS_GAUGE_INTERVAL = 1.0  # Seconds between a worker's pool/cache gauge updates
+
+# Slow Query Log Configuration
+SLOW_QUERY_THRESHOLD_MS = 200       # Database calls at least this slow are logged (None disables)
+SLOW_QUERY_SAMPLE_RATE = 1.0        # Fraction of slow calls written; lower it on busy servers
+SLOW_QUERY_LOG_DIR = os.environ.get(
+    'LMS_SLOW_QUERY_LOG_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
+)                                   # One rotating JSON-lines log per worker process
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024  # Size at which a worker's log file rotates
+SLOW_QUERY_LOG_BACKUPS = 5          # Rotated files kept per worker
+
+# Pagination Configuration
+PAGE_SIZE_DEFAULT = 50   # Rows per page when no limit is given
+PAGE_SIZE_MAX = 500      # Upper bound on the limit query parameter
+
+# Export Configuration
+EXPORT_CHUNK_SIZE = 1000  # Rows fetched from the cursor per streamed chunk
+
+# Bulk Import Configuration
+BULK_IMPORT_BATCH_SIZE = 1000  # Books inserted per write transaction
+
 # Book Status
 BOOK_STATUS = {
     'AVAILABLE': 'Available',
@@ -30,6 +88,20 @@ TRANSACTION_STATUS = {
     'OVERDUE': 'Overdue'
 }
 
+# Circulation Configuration
+LOAN_PERIOD_DAYS = 14              # Days until an issued book is due back
+CIRCULATION_BATCH_MAX_ITEMS = 50   # Books per batch allot/return request
+
+# Background Job Configuration
+SCHEDULER_ENABLED = True           # Start background jobs in each worker
+OVERDUE_SWEEP_INTERVAL = 300       # Seconds between overdue sweeps
+OVERDUE_SWEEP_BATCH_SIZE = 500     # Transactions marked Overdue per write transaction
+PREORDER_RELEASE_BATCH_SIZE = 500  # Expired preorders released per write transaction
+SCHEDULER_LEASE_TTL = 60           # Seconds a worker holds the scheduler leadership lease
+SCHEDULER_LEASE_RENEW_INTERVAL = 20  # Seconds between lease renewals / preorder resyncs
+SESSION_SWEEP_INTERVAL = 3600      # Seconds between expired session sweeps
+SESSION_SWEEP_BATCH_SIZE = 500     # Expired sessions deleted per write transaction
+
 # Preorder Configuration
 PREORDER_AMOUNT = 10  # Amount in INR
 PREORDER_EXPIRY_TIME = '15:30'  # 24-hour format
@@ -4,6 +4,8 @@ Academic management routes for VREC Library Management System
 from flask import Blueprint, request, jsonify
 from ..utils.jwt_helper import token_required
 from ..utils.db_helper import execute_query
+from ..utils.query_helper import SUBJECT_BOOKS, course_list_query, subject_list_query
+from ..utils.cache_helper import VersionedCache, cached_json_response
 import uuid
 import logging
 
@@ -14,6 +16,9 @@ logger = logging.getLogger(__name__)
 # Create blueprint
 academic_bp = Blueprint('academic', __name__)
 
+# Streams, courses and subjects; bumped by every write below
+academic_cache = VersionedCache('academic')
+
 @academic_bp.route('/streams', methods=['GET'])
 @token_required
 def get_streams():
@@ -21,9 +26,12 @@ def get_streams():
     Get all academic streams
     """
     try:
-        query = "SELECT * FROM streams ORDER BY name"
-        streams = execute_query(query)
-        return jsonify({'streams': streams}), 200
+        def build():
+            query = "SELECT * FROM streams ORDER BY name"
+            streams = execute_query(query)
+            return {'streams': streams}
+            
+        return cached_json_response(academic_cache, build)
         
     except Exception as e:
         logger.error(f"Error fetching streams: {e}")
@@ -57,6 +65,7 @@ def add_stream():
         stream_id = str(uuid.uuid4())
         query = "INSERT INTO streams (stream_id, name) VALUES (%s, %s)"
         execute_query(query, (stream_id, data['name']), fetch=False)
+        academic_cache.bump()
         
         return jsonify({
             'message': 'Stream added successfully',
@@ -74,23 +83,14 @@ def get_courses():
     Get courses with optional stream filter
     """
     try:
-        stream_id = request.args.get('stream_id')
-        
-        query = """
-            SELECT c.*, s.name as stream_name
-            FROM courses c
-            JOIN streams s ON c.stream_id = s.stream_id
-        """
-        params = None
-        
-        if stream_id:
-            query += " WHERE c.stream_id = %s"
-            params = (stream_id,)
+        def build():
+            stream_id = request.args.get('stream_id')
             
-        query += " ORDER BY s.name, c.name"
-        
-        courses = execute_query(query, params)
-        return jsonify({'courses': courses}), 200
+            query, params = course_list_query(stream_id)
+            courses = execute_query(query, params)
+            return {'courses': courses}
+            
+        return cached_json_response(academic_cache, build)
         
     except Exception as e:
         logger.error(f"Error fetching courses: {e}")
@@ -133,6 +133,7 @@ def add_course():
             (course_id, data['name'], data['stream_id'], data['semesters']),
             fetch=False
         )
+        academic_cache.bump()
         
         return jsonify({
             'message': 'Course added successfully',
@@ -150,30 +151,15 @@ def get_subjects():
     Get subjects with optional course and semester filters
     """
     try:
-        course_id = request.args.get('course_id')
-        semester = request.args.get('semester')
-        
-        query = """
-            SELECT s.*, c.name as course_name, st.name as stream_name
-            FROM subjects s
-            JOIN courses c ON s.course_id = c.course_id
-            JOIN streams st ON c.stream_id = st.stream_id
-            WHERE 1=1
-        """
-        params = []
-        
-        if course_id:
-            query += " AND s.course_id = %s"
-            params.append(course_id)
+        def build():
+            course_id = request.args.get('course_id')
+            semester = request.args.get('semester')
             
-        if semester:
-            query += " AND s.semester = %s"
-            params.append(semester)
+            query, params = subject_list_query(course_id, semester)
+            subjects = execute_query(query, params)
+            return {'subjects': subjects}
             
-        query += " ORDER BY st.name, c.name, s.semester, s.name"
-        
-        subjects = execute_query(query, tuple(params) if params else None)
-        return jsonify({'subjects': subjects}), 200
+        return cached_json_response(academic_cache, build)
         
     except Exception as e:
         logger.error(f"Error fetching subjects: {e}")
@@ -234,6 +220,7 @@ def add_subject():
             (subject_id, data['name'], data['course_id'], data['semester']),
             fetch=False
         )
+        academic_cache.bump()
         
         return jsonify({
             'message': 'Subject added successfully',
@@ -251,41 +238,36 @@ def get_academic_hierarchy():
     Get complete academic hierarchy (streams -> courses -> subjects)
     """
     try:
-        # Get all streams
-        streams_query = "SELECT * FROM streams ORDER BY name"
-        streams = execute_query(streams_query)
-        
-        # Get courses for each stream
-        for stream in streams:
-            courses_query = """
-                SELECT * FROM courses 
-                WHERE stream_id = %s 
-                ORDER BY name
-            """
-            courses = execute_query(courses_query, (stream['stream_id'],))
+        def build():
+            # Fetch each level with one set-based query
+            streams = execute_query("SELECT * FROM streams ORDER BY name")
+            courses = execute_query("SELECT * FROM courses ORDER BY name")
+            subjects = execute_query("SELECT * FROM subjects ORDER BY semester, name")
+            
+            # Attach courses to their streams
+            streams_by_id = {}
+            for stream in streams:
+                stream['courses'] = []
+                streams_by_id[stream['stream_id']] = stream
             
-            # Get subjects for each course
+            courses_by_id = {}
             for course in courses:
-                subjects_query = """
-                    SELECT * FROM subjects 
-                    WHERE course_id = %s 
-                    ORDER BY semester, name
-                """
-                subjects = execute_query(subjects_query, (course['course_id'],))
-                
-                # Group subjects by semester
-                subjects_by_semester = {}
-                for subject in subjects:
-                    semester = subject['semester']
-                    if semester not in subjects_by_semester:
-                        subjects_by_semester[semester] = []
-                    subjects_by_semester[semester].append(subject)
-                
-                course['subjects_by_semester'] = subjects_by_semester
+                stream = streams_by_id.get(course['stream_id'])
+                if stream is None:
+                    continue
+                course['subjects_by_semester'] = {}
+                courses_by_id[course['course_id']] = course
+                stream['courses'].append(course)
             
-            stream['courses'] = courses
-        
-        return jsonify({'academic_hierarchy': streams}), 200
+            # Group subjects by semester under their courses
+            for subject in subjects:
+                course = courses_by_id.get(subject['course_id'])
+                if course is not None:
+                    course['subjects_by_semester'].setdefault(subject['semester'], []).append(subject)
+            
+            return {'academic_hierarchy': streams}
+            
+        return cached_json_response(academic_cache, build)
         
     except Exception as e:
         logger.error(f"Error fetching academic hierarchy: {e}")
@@ -298,16 +280,7 @@ def get_subject_books(subject_id):
     Get all books for a specific subject
     """
     try:
-        query = """
-            SELECT b.*, s.name as subject_name, c.name as course_name
-            FROM books b
-            JOIN subjects s ON b.subject_id = s.subject_id
-            JOIN courses c ON s.course_id = c.course_id
-            WHERE b.subject_id = %s
-            ORDER BY b.title
-        """
-        
-        books = execute_query(query, (subject_id,))
+        books = execute_query(SUBJECT_BOOKS, (subject_id,))
         return jsonify({'books': books}), 200
         
     except Exception as e:
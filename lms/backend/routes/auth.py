@@ -2,16 +2,33 @@
 Authentication routes for VREC Library Management System
 """
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
 import jwt
+import uuid
 from datetime import datetime, timedelta
-from backend.utils.db_helper import execute_query
-from backend.utils.jwt_helper import token_required
-from config import JWT_SECRET_KEY, JWT_ACCESS_TOKEN_EXPIRES
+from ..utils.db_helper import execute_query
+from ..utils.query_helper import LOGIN_USER
+from ..utils.jwt_helper import token_required
+from ..utils.password_helper import PasswordPoolBusy, hash_password, verify_password
+from ..utils.session_helper import create_session, rotate_session, revoke_session, revoke_user_sessions
+from ..config import JWT_SECRET_KEY, JWT_ACCESS_TOKEN_EXPIRES
 
 # Create blueprint
 auth_bp = Blueprint('auth', __name__)
 
+@auth_bp.errorhandler(PasswordPoolBusy)
+def password_pool_busy(error):
+    # Shed load instead of queueing more bcrypt work behind a login storm
+    return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
+
+def _access_token(user):
+    """Issues a short-lived access token for a user row"""
+    return jwt.encode({
+        'user_id': user['id'],
+        'email': user['email'],
+        'role': user['role'],
+        'exp': datetime.utcnow() + JWT_ACCESS_TOKEN_EXPIRES
+    }, JWT_SECRET_KEY)
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     try:
@@ -24,30 +41,94 @@ def login():
             return jsonify({'error': 'Missing required fields'}), 400
 
         # Query user from database
-        query = "SELECT * FROM users WHERE email = %s AND role = %s"
-        user = execute_query(query, (email, role), fetch_one=True)
+        users = execute_query(LOGIN_USER, (email, role))
+        user = users[0] if users else None
 
-        if not user or not check_password_hash(user['password'], password):
+        if not user or not verify_password(password, user['password']):
             return jsonify({'error': 'Invalid credentials'}), 401
 
-        # Generate JWT token
-        token = jwt.encode({
-            'user_id': user['user_id'],
-            'email': user['email'],
-            'role': user['role'],
-            'exp': datetime.utcnow() + JWT_ACCESS_TOKEN_EXPIRES
-        }, JWT_SECRET_KEY)
+        # Generate JWT token and a refresh token for later renewals
+        token = _access_token(user)
+        refresh_token = create_session(user['id'])
 
         return jsonify({
             'token': token,
+            'refresh_token': refresh_token,
             'user': {
-                'id': user['user_id'],
+                'id': user['id'],
                 'name': user['name'],
                 'email': user['email'],
                 'role': user['role']
             }
         }), 200
 
+    except PasswordPoolBusy:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@auth_bp.route('/refresh', methods=['POST'])
+def refresh():
+    """
+    Exchanges a refresh token for a new access token and refresh token
+    
+    The presented refresh token is revoked; reusing it later revokes every
+    token issued from the same login.
+    """
+    try:
+        data = request.get_json()
+        refresh_token = data.get('refresh_token') if data else None
+
+        if not refresh_token:
+            return jsonify({'error': 'Missing refresh token'}), 400
+
+        rotated = rotate_session(refresh_token)
+        if not rotated:
+            return jsonify({'error': 'Invalid or expired refresh token'}), 401
+        user, new_refresh_token = rotated
+
+        return jsonify({
+            'token': _access_token(user),
+            'refresh_token': new_refresh_token,
+            'user': {
+                'id': user['id'],
+                'name': user['name'],
+                'email': user['email'],
+                'role': user['role']
+            }
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@auth_bp.route('/logout', methods=['POST'])
+def logout():
+    """
+    Revokes the session a refresh token belongs to
+    """
+    try:
+        data = request.get_json()
+        refresh_token = data.get('refresh_token') if data else None
+
+        if not refresh_token:
+            return jsonify({'error': 'Missing refresh token'}), 400
+
+        revoke_session(refresh_token)
+        return jsonify({'message': 'Logged out'}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@auth_bp.route('/logout-all', methods=['POST'])
+@token_required
+def logout_all():
+    """
+    Revokes every refresh token of the current user
+    """
+    try:
+        revoked = revoke_user_sessions(request.user['user_id'])
+        return jsonify({'message': 'Logged out of all sessions', 'revoked': revoked}), 200
+
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -66,47 +147,56 @@ def register():
             return jsonify({'error': 'Missing required fields'}), 400
 
         # Check if user already exists
-        query = "SELECT * FROM users WHERE email = %s"
-        existing_user = execute_query(query, (email,), fetch_one=True)
+        query = "SELECT id FROM users WHERE email = %s"
+        existing_user = execute_query(query, (email,))
 
         if existing_user:
             return jsonify({'error': 'Email already registered'}), 409
 
         # Hash password
-        hashed_password = generate_password_hash(password)
+        hashed_password = hash_password(password)
 
         # Insert new user
         query = """
-            INSERT INTO users (name, email, password, role, stream_id, course_id) 
-            VALUES (%s, %s, %s, %s, %s, %s)
+            INSERT INTO users (id, name, email, password, role, stream, branch) 
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
         """
-        execute_query(query, (name, email, hashed_password, role, stream, branch))
+        execute_query(
+            query,
+            (str(uuid.uuid4()), name, email, hashed_password, role, stream, branch),
+            fetch=False
+        )
 
         return jsonify({'message': 'Registration successful'}), 201
 
+    except PasswordPoolBusy:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/profile', methods=['GET'])
 @token_required
-def get_profile(current_user):
+def get_profile():
     try:
+        current_user = request.user
+
         # Query user details including academic information
         query = """
             SELECT u.*, s.name as stream_name, c.name as course_name 
             FROM users u 
-            LEFT JOIN streams s ON u.stream_id = s.stream_id 
-            LEFT JOIN courses c ON u.course_id = c.course_id 
-            WHERE u.user_id = %s
+            LEFT JOIN streams s ON u.stream = s.stream_id 
+            LEFT JOIN courses c ON u.branch = c.course_id 
+            WHERE u.id = %s
         """
-        user = execute_query(query, (current_user['user_id'],), fetch_one=True)
+        users = execute_query(query, (current_user['user_id'],))
+        user = users[0] if users else None
 
         if not user:
             return jsonify({'error': 'User not found'}), 404
 
         return jsonify({
             'user': {
-                'id': user['user_id'],
+                'id': user['id'],
                 'name': user['name'],
                 'email': user['email'],
                 'role': user['role'],
@@ -120,7 +210,7 @@ def get_profile(current_user):
 
 @auth_bp.route('/profile', methods=['PUT'])
 @token_required
-def update_profile(current_user):
+def update_profile():
     try:
         data = request.get_json()
         name = data.get('name')
@@ -128,30 +218,40 @@ def update_profile(current_user):
         current_password = data.get('current_password')
         new_password = data.get('new_password')
 
+        users = execute_query(
+            "SELECT name, email, password FROM users WHERE id = %s",
+            (request.user['user_id'],)
+        )
+        if not users:
+            return jsonify({'error': 'User not found'}), 404
+        user = users[0]
+
         # Update basic information
         if name or email:
-            query = "UPDATE users SET name = %s, email = %s WHERE user_id = %s"
+            query = "UPDATE users SET name = %s, email = %s WHERE id = %s"
             execute_query(query, (
-                name or current_user['name'],
-                email or current_user['email'],
-                current_user['user_id']
-            ))
+                name or user['name'],
+                email or user['email'],
+                request.user['user_id']
+            ), fetch=False)
 
         # Update password if provided
         if current_password and new_password:
             # Verify current password
-            query = "SELECT password FROM users WHERE user_id = %s"
-            user = execute_query(query, (current_user['user_id'],), fetch_one=True)
-
-            if not check_password_hash(user['password'], current_password):
+            if not verify_password(current_password, user['password']):
                 return jsonify({'error': 'Current password is incorrect'}), 401
 
             # Update password
-            hashed_password = generate_password_hash(new_password)
-            query = "UPDATE users SET password = %s WHERE user_id = %s"
-            execute_query(query, (hashed_password, current_user['user_id']))
+            hashed_password = hash_password(new_password)
+            query = "UPDATE users SET password = %s WHERE id = %s"
+            execute_query(query, (hashed_password, request.user['user_id']), fetch=False)
+
+            # Refresh tokens issued under the old password must not outlive it
+            revoke_user_sessions(request.user['user_id'])
 
         return jsonify({'message': 'Profile updated successfully'}), 200
 
+    except PasswordPoolBusy:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -3,8 +3,25 @@ Book management routes for VREC Library Management System
 """
 from flask import Blueprint, request, jsonify
 from ..utils.jwt_helper import token_required
-from ..utils.db_helper import execute_query
-from ..config import BOOK_STATUS
+from ..utils.db_helper import execute_query, execute_many, run_transaction
+from ..utils.cache_helper import VersionedCache
+from ..utils.pagination_helper import (
+    PaginationError, parse_limit, parse_fields, select_clause, decode_cursor, paginate
+)
+from ..utils.query_helper import (
+    BOOK_FIELDS, GET_BOOK, BOOK_STATUS_QUERY, BOOK_BY_BARCODE, CLOSE_LOAN,
+    book_joins, book_filters, book_list_query
+)
+from ..utils.scheduler_helper import preorder_scheduler
+from ..config import (
+    BOOK_STATUS, LOAN_PERIOD_DAYS, PREORDER_EXPIRY_TIME, BULK_IMPORT_BATCH_SIZE,
+    CIRCULATION_BATCH_MAX_ITEMS, BARCODE_CACHE_MAX_ENTRIES, BARCODE_LOOKUP_CHUNK
+)
+import csv
+import io
+import json
+import re
+import sqlite3
 import uuid
 from datetime import datetime, timedelta
 import logging
@@ -16,11 +33,34 @@ logger = logging.getLogger(__name__)
 # Create blueprint
 books_bp = Blueprint('books', __name__)
 
+# LRU of recently scanned barcode -> book_id lookups; cleared when a write bumps the version
+book_cache = VersionedCache('books', max_entries=BARCODE_CACHE_MAX_ENTRIES)
+
+# bm25 weights for the books_fts columns: title, author, subject_name, course_name
+SEARCH_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+def _match_expression(search):
+    """
+    Turns free text from the search box into an FTS5 prefix query
+
+    Every word must match the start of a token in some indexed column,
+    so "data str" finds "Data Structures". Returns None when the text
+    has no searchable words.
+    """
+    terms = re.findall(r'\w+', search)
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
 @books_bp.route('/', methods=['GET'])
 @token_required
 def get_books():
     """
     Get list of books with optional filters
+    
+    Results are paginated with limit/after (keyset on book_id, or on
+    search rank then book_id when searching) and can be narrowed with
+    fields=title,author,... ; book_id is always returned.
     """
     try:
         # Get query parameters
@@ -28,39 +68,143 @@ def get_books():
         status = request.args.get('status')
         search = request.args.get('search')
         
-        # Base query
-        query = """
-            SELECT b.*, s.name as subject_name, c.name as course_name 
-            FROM books b
-            LEFT JOIN subjects s ON b.subject_id = s.subject_id
-            LEFT JOIN courses c ON s.course_id = c.course_id
-            WHERE 1=1
-        """
-        params = []
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            fields = parse_fields(request.args.get('fields'), BOOK_FIELDS, required=('book_id',))
+        except PaginationError as e:
+            return jsonify({'message': str(e)}), 400
         
-        # Add filters
-        if subject_id:
-            query += " AND b.subject_id = %s"
-            params.append(subject_id)
+        match = _match_expression(search) if search else None
+        after = request.args.get('after')
         
-        if status:
-            query += " AND b.status = %s"
-            params.append(status)
+        if match:
+            # Ranked full-text search; books_fts rows share the books rowid
+            weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+            filters, filter_params = book_filters(subject_id, status)
+            query = f"""
+                SELECT {select_clause(fields, BOOK_FIELDS)},
+                       bm25(books_fts, {weights}) as search_rank
+                FROM books_fts f
+                JOIN books b ON b.rowid = f.rowid
+                {book_joins(fields)}
+                WHERE books_fts MATCH %s
+            """ + filters
+            params = [match] + filter_params
             
-        if search:
-            query += " AND (b.title LIKE %s OR b.author LIKE %s)"
-            search_term = f"%{search}%"
-            params.extend([search_term, search_term])
+            # bm25 can only be evaluated in the result set, so page over it
+            query = f"SELECT * FROM ({query}) WHERE 1=1"
+            if after:
+                try:
+                    rank, book_id = decode_cursor(after, 2)
+                except PaginationError as e:
+                    return jsonify({'message': str(e)}), 400
+                query += " AND (search_rank > %s OR (search_rank = %s AND book_id > %s))"
+                params.extend([rank, rank, book_id])
+            query += " ORDER BY search_rank, book_id LIMIT %s"
+            params.append(limit + 1)
+        else:
+            if after:
+                try:
+                    after, = decode_cursor(after, 1)
+                except PaginationError as e:
+                    return jsonify({'message': str(e)}), 400
+            # Punctuation-only search text has nothing to match in the index,
+            # so book_list_query falls back to LIKE on title and author
+            query, params = book_list_query(
+                fields, limit + 1, subject_id=subject_id, status=status, search=search, after=after
+            )
             
         # Execute query
-        books = execute_query(query, tuple(params) if params else None)
+        books = execute_query(query, tuple(params))
         
-        return jsonify({'books': books}), 200
+        if match:
+            books, next_cursor = paginate(
+                books, limit, lambda book: [book['search_rank'], book['book_id']]
+            )
+            for book in books:
+                del book['search_rank']
+        else:
+            books, next_cursor = paginate(books, limit, lambda book: [book['book_id']])
+        
+        return jsonify({'books': books, 'next_cursor': next_cursor}), 200
         
     except Exception as e:
         logger.error(f"Error fetching books: {e}")
         return jsonify({'message': 'Internal server error'}), 500
 
+def _book_id_for_barcode(code):
+    """
+    Resolves a barcode through the LRU, falling back to the barcode index
+    
+    Returns:
+        str: The book_id, or None for an unknown barcode
+    """
+    def load():
+        rows = execute_query(BOOK_BY_BARCODE, (code,), row_mode='tuple')
+        return rows[0][0] if rows else None
+        
+    return book_cache.get(code, load)
+
+def _book_ids_for_barcodes(codes):
+    """
+    Resolves many barcodes with one indexed IN query per chunk
+    
+    Returns:
+        dict: barcode -> book_id for the barcodes that exist
+    """
+    found = {}
+    for start in range(0, len(codes), BARCODE_LOOKUP_CHUNK):
+        chunk = codes[start:start + BARCODE_LOOKUP_CHUNK]
+        placeholders = ', '.join(['%s'] * len(chunk))
+        found.update(execute_query(
+            f"SELECT barcode, book_id FROM books WHERE barcode IN ({placeholders})",
+            tuple(chunk),
+            row_mode='tuple'
+        ))
+    return found
+
+@books_bp.route('/by-barcode/<code>', methods=['GET'])
+@token_required
+def get_book_by_barcode(code):
+    """
+    Resolve a scanned barcode to its book_id
+    """
+    try:
+        book_id = _book_id_for_barcode(code)
+        
+        if book_id is None:
+            return jsonify({'message': 'Book not found'}), 404
+            
+        return jsonify({'barcode': code, 'book_id': book_id}), 200
+        
+    except Exception as e:
+        logger.error(f"Error looking up barcode: {e}")
+        return jsonify({'message': 'Internal server error'}), 500
+
+@books_bp.route('/by-barcode', methods=['POST'])
+@token_required
+def get_books_by_barcodes():
+    """
+    Resolve many scanned barcodes in one call
+    
+    Takes {"barcodes": [...]}; unknown barcodes map to null.
+    """
+    try:
+        data = request.get_json()
+        barcodes = data.get('barcodes') if data else None
+        
+        if not isinstance(barcodes, list):
+            return jsonify({'message': 'Missing barcodes'}), 400
+            
+        codes = list(dict.fromkeys(str(code) for code in barcodes))
+        found = _book_ids_for_barcodes(codes)
+        books = {code: found.get(code) for code in codes}
+        return jsonify({'books': books}), 200
+        
+    except Exception as e:
+        logger.error(f"Error looking up barcodes: {e}")
+        return jsonify({'message': 'Internal server error'}), 500
+
 @books_bp.route('/<book_id>', methods=['GET'])
 @token_required
 def get_book(book_id):
@@ -68,14 +212,7 @@ def get_book(book_id):
     Get single book details
     """
     try:
-        query = """
-            SELECT b.*, s.name as subject_name, c.name as course_name 
-            FROM books b
-            LEFT JOIN subjects s ON b.subject_id = s.subject_id
-            LEFT JOIN courses c ON s.course_id = c.course_id
-            WHERE b.book_id = %s
-        """
-        books = execute_query(query, (book_id,))
+        books = execute_query(GET_BOOK, (book_id,))
         
         if not books:
             return jsonify({'message': 'Book not found'}), 404
@@ -105,7 +242,7 @@ def add_book():
             
         # Check if barcode already exists
         existing = execute_query(
-            "SELECT book_id FROM books WHERE barcode = %s",
+            BOOK_BY_BARCODE,
             (data['barcode'],)
         )
         
@@ -130,6 +267,7 @@ def add_book():
             ),
             fetch=False
         )
+        book_cache.bump()
         
         return jsonify({
             'message': 'Book added successfully',
@@ -140,6 +278,146 @@ def add_book():
         logger.error(f"Error adding book: {e}")
         return jsonify({'message': 'Internal server error'}), 500
 
+INSERT_BOOK_QUERY = """
+    INSERT INTO books (book_id, title, author, subject_id, barcode, status)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+def _read_upload():
+    """
+    Returns the uploaded rows as an iterator of dicts
+    
+    Accepts a multipart file field named 'file' or a raw request body.
+    The format comes from the format parameter, the file extension or
+    the content type, defaulting to CSV. Rows are parsed as the stream
+    is read, never all at once.
+    """
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    
+    upload_format = request.args.get('format')
+    if not upload_format:
+        name = upload.filename if upload else ''
+        mimetype = upload.mimetype if upload else request.mimetype
+        ndjson = name.endswith(('.ndjson', '.jsonl')) or mimetype in (
+            'application/x-ndjson', 'application/jsonl'
+        )
+        upload_format = 'ndjson' if ndjson else 'csv'
+        
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if upload_format == 'csv':
+        return csv.DictReader(text)
+    if upload_format == 'ndjson':
+        return (json.loads(line) for line in text if line.strip())
+    raise ValueError('format must be csv or ndjson')
+
+def _insert_batch(batch, errors):
+    """
+    Inserts a batch of (row number, params) pairs
+    
+    The whole batch goes through execute_many in one transaction. If
+    that hits a constraint, the batch is retried row by row in a single
+    transaction so each failing row can be reported.
+    
+    Returns:
+        int: Number of books inserted
+    """
+    try:
+        execute_many(INSERT_BOOK_QUERY, [params for _, params in batch])
+        return len(batch)
+    except sqlite3.IntegrityError:
+        pass
+        
+    def insert_rows(transaction):
+        inserted = 0
+        for row_number, params in batch:
+            try:
+                transaction.execute(INSERT_BOOK_QUERY, params)
+                inserted += 1
+            except sqlite3.IntegrityError as e:
+                errors.append({'row': row_number, 'barcode': params[4], 'message': str(e)})
+        return inserted
+        
+    return run_transaction(insert_rows)
+
+@books_bp.route('/bulk', methods=['POST'])
+@token_required
+def bulk_add_books():
+    """
+    Add books in bulk from a CSV or NDJSON upload
+    
+    Each row needs title, author, subject_id and barcode. Valid rows are
+    inserted in batches of BULK_IMPORT_BATCH_SIZE; the response lists
+    every rejected row with its row number and reason.
+    """
+    try:
+        # Check if user is admin
+        if request.user['role'] != 'admin':
+            return jsonify({'message': 'Unauthorized'}), 403
+            
+        try:
+            rows = _read_upload()
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+            
+        required_fields = ['title', 'author', 'subject_id', 'barcode']
+        
+        # Load existing barcodes once instead of checking each row
+        barcodes = {row[0] for row in execute_query("SELECT barcode FROM books", row_mode='tuple')}
+        
+        inserted = 0
+        errors = []
+        batch = []
+        row_number = 0
+        
+        try:
+            for row_number, data in enumerate(rows, start=1):
+                if not isinstance(data, dict) or not all(data.get(field) for field in required_fields):
+                    errors.append({'row': row_number, 'message': 'Missing required fields'})
+                    continue
+                    
+                barcode = str(data['barcode']).strip()
+                if barcode in barcodes:
+                    errors.append({
+                        'row': row_number,
+                        'barcode': barcode,
+                        'message': 'Barcode already exists'
+                    })
+                    continue
+                barcodes.add(barcode)
+                
+                batch.append((row_number, (
+                    str(uuid.uuid4()),
+                    data['title'],
+                    data['author'],
+                    data['subject_id'],
+                    barcode,
+                    BOOK_STATUS['AVAILABLE']
+                )))
+                if len(batch) >= BULK_IMPORT_BATCH_SIZE:
+                    inserted += _insert_batch(batch, errors)
+                    batch = []
+        except (ValueError, csv.Error) as e:
+            # Malformed input stops the import; earlier batches stay committed
+            errors.append({'row': row_number + 1, 'message': f'Unreadable row: {e}'})
+            
+        if batch:
+            inserted += _insert_batch(batch, errors)
+            
+        if inserted:
+            book_cache.bump()
+            
+        return jsonify({
+            'message': f'Imported {inserted} books',
+            'inserted': inserted,
+            'failed': len(errors),
+            'errors': errors
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error importing books: {e}")
+        return jsonify({'message': 'Internal server error'}), 500
+
 @books_bp.route('/<book_id>', methods=['PUT'])
 @token_required
 def update_book(book_id):
@@ -172,6 +450,30 @@ def update_book(book_id):
         logger.error(f"Error updating book: {e}")
         return jsonify({'message': 'Internal server error'}), 500
 
+def _preorder_expiry(now):
+    """
+    Returns the next PREORDER_EXPIRY_TIME cutoff after now
+    """
+    hour, minute = (int(part) for part in PREORDER_EXPIRY_TIME.split(':'))
+    expiry = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if expiry <= now:
+        expiry += timedelta(days=1)
+    return expiry
+
+def _status_conflict(book_id, message):
+    """
+    Builds the error response for a conditional update that matched no row
+    """
+    books = execute_query(
+        BOOK_STATUS_QUERY,
+        (book_id,)
+    )
+    
+    if not books:
+        return jsonify({'message': 'Book not found'}), 404
+        
+    return jsonify({'message': message}), 400
+
 @books_bp.route('/allot', methods=['POST'])
 @token_required
 def allot_book():
@@ -185,47 +487,44 @@ def allot_book():
         if not all(field in data for field in required_fields):
             return jsonify({'message': 'Missing required fields'}), 400
             
-        # Check if book exists and is available
-        books = execute_query(
-            "SELECT status FROM books WHERE book_id = %s",
-            (data['book_id'],)
-        )
+        allotment_id = str(uuid.uuid4())
+        issue_date = datetime.now()
+        due_date = issue_date + timedelta(days=LOAN_PERIOD_DAYS)
         
-        if not books:
-            return jsonify({'message': 'Book not found'}), 404
+        def issue(transaction):
+            # Only an available copy can be issued; losing a race matches no row
+            updated = transaction.execute(
+                "UPDATE books SET status = %s WHERE book_id = %s AND status = %s",
+                (BOOK_STATUS['ISSUED'], data['book_id'], BOOK_STATUS['AVAILABLE'])
+            ).rowcount
             
-        if books[0]['status'] != BOOK_STATUS['AVAILABLE']:
-            return jsonify({'message': 'Book is not available'}), 400
+            if not updated:
+                return False
+                
+            transaction.execute(
+                """
+                INSERT INTO transactions 
+                (allotment_id, book_id, user_id, status, issue_date, due_date)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                """,
+                (
+                    allotment_id,
+                    data['book_id'],
+                    data['user_id'],
+                    'Issued',
+                    issue_date,
+                    due_date
+                )
+            )
+            return True
             
-        # Create transaction and update book status
-        allotment_id = str(uuid.uuid4())
-        
-        # Start transaction
-        execute_query(
-            "UPDATE books SET status = %s WHERE book_id = %s",
-            (BOOK_STATUS['ISSUED'], data['book_id']),
-            fetch=False
-        )
-        
-        execute_query(
-            """
-            INSERT INTO transactions 
-            (allotment_id, book_id, user_id, status, issue_date)
-            VALUES (%s, %s, %s, %s, %s)
-            """,
-            (
-                allotment_id,
-                data['book_id'],
-                data['user_id'],
-                'Issued',
-                datetime.now()
-            ),
-            fetch=False
-        )
+        if not run_transaction(issue):
+            return _status_conflict(data['book_id'], 'Book is not available')
         
         return jsonify({
             'message': 'Book allotted successfully',
-            'allotment_id': allotment_id
+            'allotment_id': allotment_id,
+            'due_date': due_date.isoformat()
         }), 200
         
     except Exception as e:
@@ -243,34 +542,23 @@ def return_book():
         if 'book_id' not in data:
             return jsonify({'message': 'Missing book_id'}), 400
             
-        # Check if book is issued
-        books = execute_query(
-            "SELECT status FROM books WHERE book_id = %s",
-            (data['book_id'],)
-        )
-        
-        if not books:
-            return jsonify({'message': 'Book not found'}), 404
+        def receive(transaction):
+            updated = transaction.execute(
+                "UPDATE books SET status = %s WHERE book_id = %s AND status = %s",
+                (BOOK_STATUS['AVAILABLE'], data['book_id'], BOOK_STATUS['ISSUED'])
+            ).rowcount
             
-        if books[0]['status'] != BOOK_STATUS['ISSUED']:
-            return jsonify({'message': 'Book is not issued'}), 400
+            if not updated:
+                return False
+                
+            transaction.execute(
+                CLOSE_LOAN,
+                ('Returned', datetime.now(), data['book_id'])
+            )
+            return True
             
-        # Update book status and transaction
-        execute_query(
-            "UPDATE books SET status = %s WHERE book_id = %s",
-            (BOOK_STATUS['AVAILABLE'], data['book_id']),
-            fetch=False
-        )
-        
-        execute_query(
-            """
-            UPDATE transactions 
-            SET status = %s, return_date = %s
-            WHERE book_id = %s AND status = 'Issued'
-            """,
-            ('Returned', datetime.now(), data['book_id']),
-            fetch=False
-        )
+        if not run_transaction(receive):
+            return _status_conflict(data['book_id'], 'Book is not issued')
         
         return jsonify({'message': 'Book returned successfully'}), 200
         
@@ -278,6 +566,158 @@ def return_book():
         logger.error(f"Error returning book: {e}")
         return jsonify({'message': 'Internal server error'}), 500
 
+def _batch_items(data):
+    """
+    Reads the book_ids or barcodes list of a batch request
+    
+    Returns:
+        tuple: (column name, de-duplicated keys in scan order)
+    """
+    if data.get('book_ids'):
+        column, keys = 'book_id', data['book_ids']
+    elif data.get('barcodes'):
+        column, keys = 'barcode', data['barcodes']
+    else:
+        raise ValueError('Missing book_ids or barcodes')
+        
+    if not isinstance(keys, list):
+        raise ValueError(f'{column}s must be a list')
+    keys = list(dict.fromkeys(str(key) for key in keys))
+    if len(keys) > CIRCULATION_BATCH_MAX_ITEMS:
+        raise ValueError(f'At most {CIRCULATION_BATCH_MAX_ITEMS} books per request')
+    return column, keys
+
+def _resolve_books(transaction, column, keys):
+    """Fetches all requested books with one IN query, keyed by column"""
+    placeholders = ', '.join(['%s'] * len(keys))
+    rows = transaction.execute(
+        f"SELECT book_id, barcode, status FROM books WHERE {column} IN ({placeholders})",
+        keys
+    ).fetchall()
+    return {row[column]: row for row in rows}
+
+def _batch_response(results):
+    """Builds the per-item report returned by the batch endpoints"""
+    succeeded = sum(1 for result in results if result['success'])
+    return jsonify({
+        'results': results,
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded
+    }), 200
+
+@books_bp.route('/allot/batch', methods=['POST'])
+@token_required
+def allot_books_batch():
+    """
+    Allot several books to one user in a single transaction
+    
+    Takes user_id plus book_ids or barcodes; reports the outcome per book.
+    """
+    try:
+        data = request.get_json()
+        if 'user_id' not in data:
+            return jsonify({'message': 'Missing user_id'}), 400
+            
+        try:
+            column, keys = _batch_items(data)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+            
+        issue_date = datetime.now()
+        due_date = issue_date + timedelta(days=LOAN_PERIOD_DAYS)
+        
+        def issue_all(transaction):
+            # Statuses read under BEGIN IMMEDIATE cannot change before commit
+            books = _resolve_books(transaction, column, keys)
+            results = []
+            issued = []
+            for key in keys:
+                book = books.get(key)
+                if book is None:
+                    results.append({column: key, 'success': False, 'message': 'Book not found'})
+                elif book['status'] != BOOK_STATUS['AVAILABLE']:
+                    results.append({column: key, 'success': False, 'message': 'Book is not available'})
+                else:
+                    allotment_id = str(uuid.uuid4())
+                    issued.append((allotment_id, book['book_id']))
+                    results.append({
+                        column: key,
+                        'success': True,
+                        'book_id': book['book_id'],
+                        'allotment_id': allotment_id
+                    })
+                    
+            transaction.executemany(
+                "UPDATE books SET status = %s WHERE book_id = %s",
+                [(BOOK_STATUS['ISSUED'], book_id) for _, book_id in issued]
+            )
+            transaction.executemany(
+                """
+                INSERT INTO transactions 
+                (allotment_id, book_id, user_id, status, issue_date, due_date)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                """,
+                [
+                    (allotment_id, book_id, data['user_id'], 'Issued', issue_date, due_date)
+                    for allotment_id, book_id in issued
+                ]
+            )
+            return results
+            
+        return _batch_response(run_transaction(issue_all))
+        
+    except Exception as e:
+        logger.error(f"Error allotting books: {e}")
+        return jsonify({'message': 'Internal server error'}), 500
+
+@books_bp.route('/return/batch', methods=['POST'])
+@token_required
+def return_books_batch():
+    """
+    Process several book returns in a single transaction
+    
+    Takes book_ids or barcodes; reports the outcome per book.
+    """
+    try:
+        data = request.get_json()
+        
+        try:
+            column, keys = _batch_items(data)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+            
+        return_date = datetime.now()
+        
+        def receive_all(transaction):
+            books = _resolve_books(transaction, column, keys)
+            results = []
+            returned = []
+            for key in keys:
+                book = books.get(key)
+                if book is None:
+                    results.append({column: key, 'success': False, 'message': 'Book not found'})
+                elif book['status'] != BOOK_STATUS['ISSUED']:
+                    results.append({column: key, 'success': False, 'message': 'Book is not issued'})
+                else:
+                    returned.append(book['book_id'])
+                    results.append({column: key, 'success': True, 'book_id': book['book_id']})
+                    
+            transaction.executemany(
+                "UPDATE books SET status = %s WHERE book_id = %s",
+                [(BOOK_STATUS['AVAILABLE'], book_id) for book_id in returned]
+            )
+            transaction.executemany(
+                CLOSE_LOAN,
+                [('Returned', return_date, book_id) for book_id in returned]
+            )
+            return results
+            
+        return _batch_response(run_transaction(receive_all))
+        
+    except Exception as e:
+        logger.error(f"Error returning books: {e}")
+        return jsonify({'message': 'Internal server error'}), 500
+
 @books_bp.route('/preorder', methods=['POST'])
 @token_required
 def preorder_book():
@@ -291,44 +731,39 @@ def preorder_book():
         if not all(field in data for field in required_fields):
             return jsonify({'message': 'Missing required fields'}), 400
             
-        # Check if book is available
-        books = execute_query(
-            "SELECT status FROM books WHERE book_id = %s",
-            (data['book_id'],)
-        )
+        preorder_id = str(uuid.uuid4())
+        user_id = request.user['user_id']
+        expiry_time = _preorder_expiry(datetime.now())
         
-        if not books:
-            return jsonify({'message': 'Book not found'}), 404
+        def reserve(transaction):
+            updated = transaction.execute(
+                "UPDATE books SET status = %s WHERE book_id = %s AND status = %s",
+                (BOOK_STATUS['PREORDERED'], data['book_id'], BOOK_STATUS['AVAILABLE'])
+            ).rowcount
             
-        if books[0]['status'] != BOOK_STATUS['AVAILABLE']:
-            return jsonify({'message': 'Book is not available'}), 400
+            if not updated:
+                return False
+                
+            transaction.execute(
+                """
+                INSERT INTO preorders 
+                (preorder_id, book_id, user_id, payment_status, expiry_time)
+                VALUES (%s, %s, %s, %s, %s)
+                """,
+                (
+                    preorder_id,
+                    data['book_id'],
+                    user_id,
+                    data['payment_status'],
+                    expiry_time
+                )
+            )
+            return True
             
-        # Create preorder
-        preorder_id = str(uuid.uuid4())
-        expiry_time = datetime.now() + timedelta(hours=8)  # Set to 3:30 PM
-        
-        execute_query(
-            """
-            INSERT INTO preorders 
-            (preorder_id, book_id, user_id, payment_status, expiry_time)
-            VALUES (%s, %s, %s, %s, %s)
-            """,
-            (
-                preorder_id,
-                data['book_id'],
-                request.user['user_id'],
-                data['payment_status'],
-                expiry_time
-            ),
-            fetch=False
-        )
-        
-        # Update book status
-        execute_query(
-            "UPDATE books SET status = %s WHERE book_id = %s",
-            (BOOK_STATUS['PREORDERED'], data['book_id']),
-            fetch=False
-        )
+        if not run_transaction(reserve):
+            return _status_conflict(data['book_id'], 'Book is not available')
+            
+        preorder_scheduler.schedule(preorder_id, expiry_time)
         
         return jsonify({
             'message': 'Book preordered successfully',
@@ -338,4 +773,4 @@ def preorder_book():
         
     except Exception as e:
         logger.error(f"Error preordering book: {e}")
-        return jsonify({'message': 'Internal server error'}), 500
\ No newline at end of file
+        return jsonify({'message': 'Internal server error'}), 500
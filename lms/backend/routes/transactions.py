@@ -1,10 +1,20 @@
 """
 Transaction management routes for VREC Library Management System
 """
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from ..utils.jwt_helper import token_required
-from ..utils.db_helper import execute_query
+from ..utils.db_helper import execute_query, iter_query
+from ..utils.json_helper import dumps
+from ..utils.pagination_helper import (
+    PaginationError, parse_limit, parse_fields, decode_cursor, paginate
+)
+from ..utils.query_helper import (
+    TRANSACTION_FIELDS, OVERDUE_BOOKS, USER_TRANSACTIONS, PENDING_OVERDUE_COUNT,
+    ACTIVE_USERS, POPULAR_BOOKS, transaction_list_query, transaction_export_query
+)
+from ..config import EXPORT_CHUNK_SIZE
 import csv
+import zlib
 from io import StringIO
 import logging
 from datetime import datetime
@@ -16,11 +26,27 @@ logger = logging.getLogger(__name__)
 # Create blueprint
 transactions_bp = Blueprint('transactions', __name__)
 
+# Columns written by the export, in order
+EXPORT_FIELDS = [
+    'allotment_id',
+    'book_title',
+    'book_barcode',
+    'user_name',
+    'user_email',
+    'status',
+    'issue_date',
+    'return_date'
+]
+
 @transactions_bp.route('/', methods=['GET'])
 @token_required
 def get_transactions():
     """
     Get transaction history with filters
+    
+    Results are paginated newest first with limit/after (keyset on
+    issue_date, allotment_id) and can be narrowed with fields=...;
+    allotment_id and issue_date are always returned.
     """
     try:
         # Get query parameters
@@ -30,55 +56,47 @@ def get_transactions():
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         
-        # Base query
-        query = """
-            SELECT t.*, 
-                   b.title as book_title,
-                   b.barcode as book_barcode,
-                   u.name as user_name,
-                   u.email as user_email
-            FROM transactions t
-            JOIN books b ON t.book_id = b.book_id
-            JOIN users u ON t.user_id = u.id
-            WHERE 1=1
-        """
-        params = []
-        
-        # Add filters
-        if user_id:
-            query += " AND t.user_id = %s"
-            params.append(user_id)
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            fields = parse_fields(
+                request.args.get('fields'),
+                TRANSACTION_FIELDS,
+                required=('allotment_id', 'issue_date')
+            )
+        except PaginationError as e:
+            return jsonify({'message': str(e)}), 400
         
-        if book_id:
-            query += " AND t.book_id = %s"
-            params.append(book_id)
-            
-        if status:
-            query += " AND t.status = %s"
-            params.append(status)
-            
-        if start_date:
-            query += " AND DATE(t.issue_date) >= %s"
-            params.append(start_date)
+        # Continue after the last row of the previous page
+        after = request.args.get('after')
+        if after:
+            try:
+                after = decode_cursor(after, 2)
+            except PaginationError as e:
+                return jsonify({'message': str(e)}), 400
             
-        if end_date:
-            query += " AND DATE(t.issue_date) <= %s"
-            params.append(end_date)
-            
-        # Add sorting
-        query += " ORDER BY t.issue_date DESC"
+        try:
+            query, params = transaction_list_query(
+                fields,
+                limit + 1,
+                after=after,
+                user_id=user_id,
+                book_id=book_id,
+                status=status,
+                start_date=start_date,
+                end_date=end_date
+            )
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         
         # Execute query
-        transactions = execute_query(query, tuple(params) if params else None)
-        
-        # Format dates for JSON response
-        for transaction in transactions:
-            if transaction.get('issue_date'):
-                transaction['issue_date'] = transaction['issue_date'].isoformat()
-            if transaction.get('return_date'):
-                transaction['return_date'] = transaction['return_date'].isoformat()
+        transactions = execute_query(query, tuple(params))
+        transactions, next_cursor = paginate(
+            transactions,
+            limit,
+            lambda transaction: [transaction['issue_date'], transaction['allotment_id']]
+        )
         
-        return jsonify({'transactions': transactions}), 200
+        return jsonify({'transactions': transactions, 'next_cursor': next_cursor}), 200
         
     except Exception as e:
         logger.error(f"Error fetching transactions: {e}")
@@ -88,7 +106,10 @@ def get_transactions():
 @token_required
 def export_transactions():
     """
-    Export transactions as CSV
+    Export transactions as CSV, or NDJSON with format=ndjson
+    
+    Rows are streamed from the cursor in chunks; compress=gzip gzips
+    the stream on the fly.
     """
     try:
         # Check if user is admin
@@ -102,89 +123,83 @@ def export_transactions():
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         
-        # Base query
-        query = """
-            SELECT 
-                t.allotment_id,
-                b.title as book_title,
-                b.barcode as book_barcode,
-                u.name as user_name,
-                u.email as user_email,
-                t.status,
-                t.issue_date,
-                t.return_date
-            FROM transactions t
-            JOIN books b ON t.book_id = b.book_id
-            JOIN users u ON t.user_id = u.id
-            WHERE 1=1
-        """
-        params = []
-        
-        # Add filters (same as get_transactions)
-        if user_id:
-            query += " AND t.user_id = %s"
-            params.append(user_id)
-        
-        if book_id:
-            query += " AND t.book_id = %s"
-            params.append(book_id)
-            
-        if status:
-            query += " AND t.status = %s"
-            params.append(status)
+        try:
+            query, params = transaction_export_query(
+                user_id=user_id,
+                book_id=book_id,
+                status=status,
+                start_date=start_date,
+                end_date=end_date
+            )
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
             
-        if start_date:
-            query += " AND DATE(t.issue_date) >= %s"
-            params.append(start_date)
+        export_format = request.args.get('format', 'csv')
+        if export_format not in ('csv', 'ndjson'):
+            return jsonify({'message': 'format must be csv or ndjson'}), 400
             
-        if end_date:
-            query += " AND DATE(t.issue_date) <= %s"
-            params.append(end_date)
+        compress = request.args.get('compress')
+        if compress not in (None, 'gzip'):
+            return jsonify({'message': 'compress must be gzip'}), 400
             
-        # Add sorting
-        query += " ORDER BY t.issue_date DESC"
-        
-        # Execute query
-        transactions = execute_query(query, tuple(params) if params else None)
-        
-        # Create CSV file
-        output = StringIO()
-        writer = csv.DictWriter(output, fieldnames=[
-            'allotment_id',
-            'book_title',
-            'book_barcode',
-            'user_name',
-            'user_email',
-            'status',
-            'issue_date',
-            'return_date'
-        ])
+        rows = iter_query(query, tuple(params), chunk_size=EXPORT_CHUNK_SIZE, row_mode='tuple')
+        encode = _csv_chunks(rows) if export_format == 'csv' else _ndjson_chunks(rows)
         
-        # Write header
-        writer.writeheader()
-        
-        # Write data
-        for transaction in transactions:
-            # Format dates
-            if transaction.get('issue_date'):
-                transaction['issue_date'] = transaction['issue_date'].strftime('%Y-%m-%d %H:%M:%S')
-            if transaction.get('return_date'):
-                transaction['return_date'] = transaction['return_date'].strftime('%Y-%m-%d %H:%M:%S')
-            writer.writerow(transaction)
-        
-        # Prepare response
-        output.seek(0)
-        return send_file(
-            StringIO(output.getvalue()),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'transactions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        filename = f'transactions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{export_format}'
+        mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+        if compress:
+            encode = _gzip_chunks(encode)
+            filename += '.gz'
+            mimetype = 'application/gzip'
+            
+        # No Content-Length is set, so the body goes out with chunked transfer
+        return Response(
+            stream_with_context(encode),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
         )
         
     except Exception as e:
         logger.error(f"Error exporting transactions: {e}")
         return jsonify({'message': 'Internal server error'}), 500
 
+def _export_rows(chunks):
+    """Yields chunks of export rows as lists in EXPORT_FIELDS order"""
+    try:
+        for rows in chunks:
+            positions = [rows.columns[field] for field in EXPORT_FIELDS]
+            # Timestamps are stored as YYYY-MM-DD HH:MM:SS and exported as is
+            yield [[row[position] for position in positions] for row in rows]
+    finally:
+        chunks.close()
+
+def _csv_chunks(chunks):
+    """Encodes chunks of export rows as CSV text, header first"""
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(EXPORT_FIELDS)
+    yield output.getvalue()
+    
+    for rows in _export_rows(chunks):
+        output.seek(0)
+        output.truncate()
+        writer.writerows(rows)
+        yield output.getvalue()
+
+def _ndjson_chunks(chunks):
+    """Encodes chunks of export rows as newline-delimited JSON"""
+    for rows in _export_rows(chunks):
+        yield ''.join(dumps(dict(zip(EXPORT_FIELDS, row))) + '\n' for row in rows)
+
+def _gzip_chunks(chunks):
+    """Compresses a stream of text chunks into a gzip stream"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
 @transactions_bp.route('/overdue', methods=['GET'])
 @token_required
 def get_overdue_books():
@@ -196,32 +211,13 @@ def get_overdue_books():
         if request.user['role'] != 'admin':
             return jsonify({'message': 'Unauthorized'}), 403
             
-        query = """
-            SELECT t.*,
-                   b.title as book_title,
-                   b.barcode as book_barcode,
-                   u.name as user_name,
-                   u.email as user_email
-            FROM transactions t
-            JOIN books b ON t.book_id = b.book_id
-            JOIN users u ON t.user_id = u.id
-            WHERE t.status = 'Issued'
-            AND DATEDIFF(CURRENT_DATE, t.issue_date) > 14
-            ORDER BY t.issue_date ASC
-        """
-        
-        overdue_books = execute_query(query)
+        now = datetime.now()
+        overdue_books = execute_query(OVERDUE_BOOKS, (now,))
         
-        # Format dates for JSON response
+        # Calculate days overdue
         for book in overdue_books:
-            if book.get('issue_date'):
-                book['issue_date'] = book['issue_date'].isoformat()
-            if book.get('return_date'):
-                book['return_date'] = book['return_date'].isoformat()
-            # Calculate days overdue
-            issue_date = datetime.fromisoformat(book['issue_date'])
-            days_overdue = (datetime.now() - issue_date).days - 14
-            book['days_overdue'] = max(0, days_overdue)
+            due_date = datetime.fromisoformat(str(book['due_date']))
+            book['days_overdue'] = max(0, (now - due_date).days)
         
         return jsonify({'overdue_books': overdue_books}), 200
         
@@ -240,24 +236,7 @@ def get_user_transactions(user_id):
         if request.user['role'] != 'admin' and request.user['user_id'] != user_id:
             return jsonify({'message': 'Unauthorized'}), 403
             
-        query = """
-            SELECT t.*,
-                   b.title as book_title,
-                   b.barcode as book_barcode
-            FROM transactions t
-            JOIN books b ON t.book_id = b.book_id
-            WHERE t.user_id = %s
-            ORDER BY t.issue_date DESC
-        """
-        
-        transactions = execute_query(query, (user_id,))
-        
-        # Format dates for JSON response
-        for transaction in transactions:
-            if transaction.get('issue_date'):
-                transaction['issue_date'] = transaction['issue_date'].isoformat()
-            if transaction.get('return_date'):
-                transaction['return_date'] = transaction['return_date'].isoformat()
+        transactions = execute_query(USER_TRANSACTIONS, (user_id,))
         
         return jsonify({'transactions': transactions}), 200
         
@@ -276,52 +255,26 @@ def get_transaction_stats():
         if request.user['role'] != 'admin':
             return jsonify({'message': 'Unauthorized'}), 403
             
-        # Get total books issued
-        total_issued_query = """
-            SELECT COUNT(*) as count
-            FROM transactions
-            WHERE status = 'Issued'
-        """
-        total_issued = execute_query(total_issued_query)[0]['count']
-        
-        # Get total books returned
-        total_returned_query = """
-            SELECT COUNT(*) as count
-            FROM transactions
-            WHERE status = 'Returned'
-        """
-        total_returned = execute_query(total_returned_query)[0]['count']
+        # Per-status totals are maintained by triggers on transactions
+        counts = {
+            row['status']: row['count']
+            for row in execute_query("SELECT status, count FROM circulation_counts")
+        }
+        total_issued = counts.get('Issued', 0) + counts.get('Overdue', 0)
+        total_returned = counts.get('Returned', 0)
         
-        # Get total overdue books
-        total_overdue_query = """
-            SELECT COUNT(*) as count
-            FROM transactions
-            WHERE status = 'Issued'
-            AND DATEDIFF(CURRENT_DATE, issue_date) > 14
-        """
-        total_overdue = execute_query(total_overdue_query)[0]['count']
+        # Count loans that fell due since the last overdue sweep
+        pending_overdue = execute_query(
+            PENDING_OVERDUE_COUNT,
+            (datetime.now(),)
+        )[0]['count']
+        total_overdue = counts.get('Overdue', 0) + pending_overdue
         
-        # Get most active users
-        active_users_query = """
-            SELECT u.name, u.email, COUNT(*) as transaction_count
-            FROM transactions t
-            JOIN users u ON t.user_id = u.id
-            GROUP BY t.user_id
-            ORDER BY transaction_count DESC
-            LIMIT 5
-        """
-        active_users = execute_query(active_users_query)
+        # Get most active users (top-k from the counter index)
+        active_users = execute_query(ACTIVE_USERS)
         
         # Get most borrowed books
-        popular_books_query = """
-            SELECT b.title, COUNT(*) as borrow_count
-            FROM transactions t
-            JOIN books b ON t.book_id = b.book_id
-            GROUP BY t.book_id
-            ORDER BY borrow_count DESC
-            LIMIT 5
-        """
-        popular_books = execute_query(popular_books_query)
+        popular_books = execute_query(POPULAR_BOOKS)
         
         return jsonify({
             'total_issued': total_issued,
@@ -0,0 +1,178 @@
+"""
+Versioned read-through cache for rarely changing reference data
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from .db_helper import execute_query
+from ..config import CACHE_VERSION_TTL, CACHE_MAX_ENTRIES
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class _Load:
+    """A loader call in flight, shared by every concurrent miss on its key"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class VersionedCache:
+    """
+    In-process cache of rendered responses, invalidated by a version counter
+    
+    The counter lives in the cache_versions table so every gunicorn
+    worker sees a bump. Each worker re-reads it at most once per
+    CACHE_VERSION_TTL seconds; in between, hits and 304s never touch
+    the database. Writers call bump() after changing the data.
+    Concurrent misses on a key share a single loader call.
+    
+    Args:
+        namespace (str): Row in cache_versions guarding this data
+        version_ttl (float): Seconds to trust the last version read
+        max_entries (int): Cached entries kept before evicting the oldest
+    """
+
+    def __init__(self, namespace, version_ttl=CACHE_VERSION_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.namespace = namespace
+        self.version_ttl = version_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._loads = {}
+        self._version = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def version(self):
+        """
+        Returns the current version, re-reading it once the TTL has passed
+        """
+        if self._version is not None and time.monotonic() - self._checked_at < self.version_ttl:
+            return self._version
+            
+        rows = execute_query(
+            "SELECT version FROM cache_versions WHERE namespace = %s",
+            (self.namespace,)
+        )
+        version = rows[0]['version'] if rows else 0
+        
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+            self._version = version
+            self._checked_at = time.monotonic()
+        return version
+
+    def etag(self, key, version=None):
+        """
+        Builds the strong ETag for a key at a version
+        """
+        if version is None:
+            version = self.version()
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return f"{self.namespace}-{version}-{digest}"
+
+    def get(self, key, loader, version=None):
+        """
+        Returns the cached value for key, calling loader() on a miss
+        
+        Args:
+            key (str): Cache key
+            loader (callable): Produces the value from the database
+            version (int): Version already read by the caller, if any
+        """
+        if version is None:
+            version = self.version()
+            
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            load = self._loads.get((key, version))
+            leader = load is None
+            if leader:
+                load = self._loads[(key, version)] = _Load()
+                
+        if not leader:
+            # Another thread is already loading this key; wait for its result
+            load.done.wait()
+            if load.error is not None:
+                raise load.error
+            return load.value
+            
+        # The version was read before loading, so the value is never older than it
+        try:
+            load.value = loader()
+        except BaseException as e:
+            load.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._loads[(key, version)]
+                if load.error is None and version == self._version:
+                    self._entries[key] = (version, load.value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            load.done.set()
+        return load.value
+
+    def bump(self):
+        """
+        Invalidates the namespace in every worker
+        """
+        execute_query(
+            """
+            INSERT INTO cache_versions (namespace, version) VALUES (%s, 1)
+            ON CONFLICT(namespace) DO UPDATE SET version = version + 1
+            """,
+            (self.namespace,),
+            fetch=False
+        )
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def stats(self):
+        """Returns hit/miss counters and the number of cached entries"""
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+def cached_json_response(cache, build):
+    """
+    Serves a JSON view from cache with ETag / If-None-Match support
+    
+    The rendered body is cached per request path and query string, so a
+    hit skips both the database and JSON encoding, and a matching
+    If-None-Match gets 304 Not Modified.
+    
+    Args:
+        cache (VersionedCache): Cache guarding the view's data
+        build (callable): Returns the payload dict on a cache miss
+        
+    Returns:
+        Response: 200 with the JSON body, or 304
+    """
+    from flask import current_app, request, jsonify
+    
+    key = request.full_path
+    version = cache.version()
+    etag = cache.etag(key, version)
+    
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+        
+    body = cache.get(key, lambda: jsonify(build()).get_data(), version)
+    response = current_app.response_class(body, status=200, mimetype='application/json')
+    response.set_etag(etag)
+    return response
@@ -1,15 +1,47 @@
 """
 Database helper utilities for SQLite connections and operations
 """
+import hashlib
+import os
+import queue
+import re
 import sqlite3
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache, partial
 from sqlite3 import Error
-from ..config import DATABASE_PATH
+from ..config import (
+    DATABASE_PATH, TIMESTAMP_FORMAT, DB_POOL_SIZE, DB_POOL_HEALTH_CHECK_INTERVAL,
+    DB_JOURNAL_MODE, DB_SYNCHRONOUS, DB_MMAP_SIZE, DB_CACHE_SIZE, DB_BUSY_TIMEOUT
+)
+from .migration_helper import run_migrations
+from .metrics_helper import metrics
+from .slow_query_helper import SlowQueryLog
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Matches quoted SQL literals (left untouched) and %s placeholders
+_PLACEHOLDER_PATTERN = re.compile(r"'(?:[^']|'')*'|%s")
+
+# Literals and placeholders collapsed by normalize_query
+_LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s|\?")
+_IN_LIST_PATTERN = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+def format_timestamp(value):
+    """Formats a datetime the way timestamp columns store it, like CURRENT_TIMESTAMP"""
+    return value.strftime(TIMESTAMP_FORMAT)
+
+# datetime parameters are bound as 'YYYY-MM-DD HH:MM:SS' text, so range
+# predicates on timestamp columns compare like with like and use indexes
+sqlite3.register_adapter(datetime, format_timestamp)
+
 def dict_factory(cursor, row):
     """Convert SQLite row to dictionary"""
     d = {}
@@ -17,19 +49,323 @@ def dict_factory(cursor, row):
         d[col[0]] = row[idx]
     return d
 
+class Rows(list):
+    """
+    Plain tuple rows sharing one column index
+
+    Returned by row_mode='tuple'. columns maps each column name to its
+    position, so row[rows.columns['title']] reads a field without a
+    per-row dict.
+    """
+    __slots__ = ('columns',)
+
+    def __init__(self, rows, columns):
+        super().__init__(rows)
+        self.columns = columns
+
+@lru_cache(maxsize=256)
+def record_type(columns):
+    """Returns the namedtuple record class for a tuple of column names"""
+    return namedtuple('Record', columns, rename=True)
+
+# Row modes accepted by execute_query and iter_query, from the default to
+# the leanest in memory (see benchmarks.bench_row_modes):
+#   'dict'   - the default; a dict per row, the heaviest to build, but
+#              routes can hand it to jsonify without converting it
+#   'row'    - sqlite3.Row, indexable by name or position, built in C
+#   'record' - namedtuple per row, attribute access, no per-row dict
+#   'tuple'  - plain tuples in a Rows list carrying the column index;
+#              the smallest rows, for code that reads columns by position
+ROW_MODES = ('dict', 'row', 'record', 'tuple')
+
+def _set_row_mode(cursor, row_mode):
+    """Installs the row factory for row_mode on a cursor that has just executed"""
+    if row_mode not in ROW_MODES:
+        raise ValueError(f"Unknown row mode: {row_mode}")
+    if row_mode == 'dict':
+        # The column names are read once per statement instead of once per row
+        columns = tuple(description[0] for description in cursor.description or ())
+        cursor.row_factory = lambda cursor, row: dict(zip(columns, row))
+    elif row_mode == 'row':
+        cursor.row_factory = sqlite3.Row
+    else:
+        cursor.row_factory = None
+
+def _wrap_rows(cursor, rows, row_mode):
+    """Turns fetched tuples into records, or attaches the column index in 'tuple' mode"""
+    if row_mode == 'record':
+        # tuple.__new__ builds each record in C, without a per-row Python call
+        record = record_type(tuple(description[0] for description in cursor.description))
+        return list(map(partial(tuple.__new__, record), rows))
+    if row_mode == 'tuple':
+        return Rows(rows, {description[0]: index for index, description in enumerate(cursor.description)})
+    return rows
+
+@lru_cache(maxsize=512)
+def prepare_query(query):
+    """
+    Rewrites the %s placeholders used by the routes into SQLite's ? style
+
+    The result is memoized so each distinct statement is only scanned once.
+    """
+    return _PLACEHOLDER_PATTERN.sub(
+        lambda match: '?' if match.group(0) == '%s' else match.group(0),
+        query
+    )
+
+@lru_cache(maxsize=512)
+def normalize_query(query):
+    """
+    Returns the statement shape of a query: literals and placeholders
+    become ?, IN lists collapse to (?, ...) and whitespace is squeezed
+    """
+    normalized = _LITERAL_PATTERN.sub('?', query)
+    normalized = _IN_LIST_PATTERN.sub('(?, ...)', normalized)
+    return ' '.join(normalized.split())
+
+@lru_cache(maxsize=512)
+def query_fingerprint(query):
+    """Returns a short stable hash of the normalized statement"""
+    return hashlib.sha1(normalize_query(query).encode('utf-8')).hexdigest()[:12]
+
+def explain_query(query, params=None):
+    """
+    Returns the EXPLAIN QUERY PLAN detail lines for a statement
+
+    The statement itself is not run, so writes can be explained too.
+    """
+    with connection_pool.connection() as connection:
+        rows = connection.execute("EXPLAIN QUERY PLAN " + prepare_query(query), params or ()).fetchall()
+    return [row['detail'] for row in rows]
+
+slow_query_log = SlowQueryLog(explain_query)
+
+def _record_query(query, seconds, params=None, rows=None, explain=True):
+    """Reports one database call to the metrics subsystem and the slow-query log"""
+    fingerprint = query_fingerprint(query)
+    normalized = normalize_query(query)
+    metrics.observe_query(fingerprint, normalized, seconds)
+    slow_query_log.observe(query, normalized, fingerprint, params, seconds, rows, explain=explain)
+
+def configure_connection(connection):
+    """
+    Applies the storage engine PRAGMAs from config to a new connection
+    """
+    connection.execute(f"PRAGMA busy_timeout = {int(DB_BUSY_TIMEOUT)}")
+    connection.execute(f"PRAGMA journal_mode = {DB_JOURNAL_MODE}")
+    connection.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+    connection.execute(f"PRAGMA mmap_size = {int(DB_MMAP_SIZE)}")
+    connection.execute(f"PRAGMA cache_size = {int(DB_CACHE_SIZE)}")
+
 def get_db_connection():
     """
     Creates and returns a connection to the SQLite database
     """
     try:
-        connection = sqlite3.connect(DATABASE_PATH)
+        connection = sqlite3.connect(
+            DATABASE_PATH,
+            timeout=DB_BUSY_TIMEOUT / 1000,
+            check_same_thread=False
+        )
         connection.row_factory = dict_factory
+        configure_connection(connection)
         return connection
     except Error as e:
         logger.error(f"Error connecting to SQLite database: {e}")
         raise
 
-def execute_query(query, params=None, fetch=True):
+class ConnectionPool:
+    """
+    Keeps warm SQLite connections for reuse inside a worker process
+
+    Idle connections are handed out most-recently-used first, so a busy
+    thread keeps getting the connection whose schema and page cache are
+    already loaded. Connections idle for longer than the health check
+    interval are validated before reuse. The pool remembers the pid it
+    was created in and starts empty again after a fork, so gunicorn
+    workers never share a connection inherited from the master.
+
+    Args:
+        size (int): Maximum number of idle connections to keep (0 disables pooling)
+        health_check_interval (float): Idle seconds before a connection is re-validated
+    """
+
+    def __init__(self, size=DB_POOL_SIZE, health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL):
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self._lock = threading.Lock()
+        self._idle = deque()
+        self._pid = os.getpid()
+
+    def _check_fork(self):
+        """Drop connections inherited from a parent process"""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # Never close these: the parent still owns them
+                    self._idle = deque()
+                    self._pid = os.getpid()
+
+    def _is_healthy(self, connection):
+        """Check that an idle connection can still run a statement"""
+        try:
+            connection.execute("SELECT 1").fetchone()
+            return True
+        except Error as e:
+            logger.error(f"Discarding unhealthy pooled connection: {e}")
+            return False
+
+    def acquire(self):
+        """
+        Returns a connection from the pool, opening a new one if none is idle
+        """
+        self._check_fork()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection, last_used = self._idle.pop()
+
+            if (time.monotonic() - last_used < self.health_check_interval
+                    or self._is_healthy(connection)):
+                return connection
+            self._close(connection)
+
+        return get_db_connection()
+
+    def release(self, connection):
+        """
+        Returns a connection to the pool, closing it if the pool is full
+        """
+        if connection.in_transaction:
+            connection.rollback()
+
+        if self._pid == os.getpid():
+            with self._lock:
+                if len(self._idle) < self.size:
+                    self._idle.append((connection, time.monotonic()))
+                    return
+        self._close(connection)
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Error as e:
+            logger.error(f"Error closing pooled connection: {e}")
+
+    def close_all(self):
+        """Closes every idle connection held by this process"""
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for connection, _ in idle:
+            self._close(connection)
+
+    def stats(self):
+        """Returns the pool size and number of idle connections"""
+        return {'size': self.size, 'idle': len(self._idle)}
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager yielding a pooled connection
+        """
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+class WriterQueue:
+    """
+    Serializes every write in the process through one dedicated connection
+
+    Work items are callables taking the writer connection. They run in
+    submission order on a single background thread, so request threads
+    never contend with each other for SQLite's write lock and pooled read
+    connections are never blocked behind a writer. Contention with other
+    worker processes is absorbed by the busy timeout. The thread is
+    started lazily and restarted after a fork.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run,
+                    args=(self._queue,),
+                    name='sqlite-writer',
+                    daemon=True
+                )
+                self._thread.start()
+
+    def _run(self, work_queue):
+        connection = None
+        try:
+            while True:
+                work, future = work_queue.get()
+                if work is None:
+                    break
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    if connection is None:
+                        connection = get_db_connection()
+                    result = work(connection)
+                except BaseException as e:
+                    if connection is not None and connection.in_transaction:
+                        connection.rollback()
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+        finally:
+            if connection is not None:
+                connection.close()
+
+    def submit(self, work):
+        """
+        Runs work(connection) on the writer thread and returns its result
+
+        Args:
+            work (callable): Function receiving the writer connection
+
+        Returns:
+            Whatever work returns; exceptions are re-raised in the caller
+        """
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("Writes cannot be submitted from the writer thread")
+
+        self._ensure_started()
+        future = Future()
+        self._queue.put((work, future))
+        return future.result()
+
+    def stats(self):
+        """Returns the number of writes waiting for the writer thread"""
+        return {'pending': self._queue.qsize()}
+
+    def stop(self):
+        """Stops the writer thread after pending writes finish"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None and self._pid == os.getpid():
+                self._queue.put((None, None))
+                thread.join()
+
+# Process-wide pool used for reads and queue used for writes
+connection_pool = ConnectionPool()
+writer_queue = WriterQueue()
+
+def execute_query(query, params=None, fetch=True, row_mode='dict'):
     """
     Executes a SQL query and returns the result
     
@@ -37,37 +373,51 @@ def execute_query(query, params=None, fetch=True):
         query (str): SQL query to execute
         params (tuple): Parameters for the query
         fetch (bool): Whether to fetch and return results
+        row_mode (str): Shape of fetched rows, one of ROW_MODES
     
     Returns:
         list: Query results if fetch is True, else None
     """
-    connection = None
+    started = time.perf_counter()
+    rows = None
+    try:
+        if not fetch:
+            return writer_queue.submit(
+                lambda connection: _execute(connection, query, params, fetch)
+            )
+
+        with connection_pool.connection() as connection:
+            rows = _execute(connection, query, params, fetch, row_mode)
+            return rows
+    finally:
+        _record_query(
+            query, time.perf_counter() - started, params, len(rows) if rows is not None else None
+        )
+
+def _execute(connection, query, params, fetch, row_mode='dict'):
     cursor = None
     try:
-        connection = get_db_connection()
         cursor = connection.cursor()
         
         if params:
-            cursor.execute(query, params)
+            cursor.execute(prepare_query(query), params)
         else:
-            cursor.execute(query)
+            cursor.execute(prepare_query(query))
             
         if fetch:
-            return cursor.fetchall()
+            _set_row_mode(cursor, row_mode)
+            return _wrap_rows(cursor, cursor.fetchall(), row_mode)
         else:
             connection.commit()
             return cursor.lastrowid
             
     except Error as e:
         logger.error(f"Error executing query: {e}")
-        if connection:
-            connection.rollback()
+        connection.rollback()
         raise
     finally:
         if cursor:
             cursor.close()
-        if connection:
-            connection.close()
 
 def execute_many(query, params_list):
     """
@@ -77,25 +427,153 @@ def execute_many(query, params_list):
         query (str): SQL query to execute
         params_list (list): List of parameter tuples
     """
-    connection = None
+    started = time.perf_counter()
+    try:
+        writer_queue.submit(lambda connection: _execute_many(connection, query, params_list))
+    finally:
+        # The first parameter tuple stands in for the batch in the slow-query log
+        _record_query(query, time.perf_counter() - started, params_list[0] if params_list else None)
+
+def _execute_many(connection, query, params_list):
     cursor = None
     try:
-        connection = get_db_connection()
         cursor = connection.cursor()
         
-        cursor.executemany(query, params_list)
+        cursor.executemany(prepare_query(query), params_list)
         connection.commit()
         
     except Error as e:
         logger.error(f"Error executing multiple queries: {e}")
-        if connection:
-            connection.rollback()
+        connection.rollback()
         raise
     finally:
         if cursor:
             cursor.close()
-        if connection:
-            connection.close()
+
+def iter_query(query, params=None, chunk_size=1000, row_mode='dict'):
+    """
+    Executes a SQL query and yields its rows in chunks
+    
+    The pooled connection is held until the generator is exhausted or
+    closed, so only chunk_size rows are in memory at a time.
+    
+    Args:
+        query (str): SQL query to execute
+        params (tuple): Parameters for the query
+        chunk_size (int): Rows fetched per round trip
+        row_mode (str): Shape of fetched rows, one of ROW_MODES
+    
+    Yields:
+        list: Up to chunk_size rows
+    """
+    with connection_pool.connection() as connection:
+        cursor = None
+        # Only time spent in SQLite counts, not time the consumer holds a chunk
+        elapsed = 0.0
+        fetched = 0
+        try:
+            started = time.perf_counter()
+            cursor = connection.cursor()
+            cursor.execute(prepare_query(query), params or ())
+            _set_row_mode(cursor, row_mode)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                elapsed += time.perf_counter() - started
+                if not rows:
+                    break
+                fetched += len(rows)
+                yield _wrap_rows(cursor, rows, row_mode)
+                started = time.perf_counter()
+        except Error as e:
+            logger.error(f"Error iterating query: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+            _record_query(query, elapsed, params, fetched)
+
+class Transaction:
+    """
+    Unit of work bound to the writer connection
+
+    Passed to the callable given to run_transaction; every statement run
+    through it is part of the same BEGIN IMMEDIATE ... COMMIT block.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, params=None):
+        """
+        Executes a statement inside the transaction
+
+        Returns:
+            sqlite3.Cursor: Cursor for fetching rows or reading rowcount
+        """
+        return self.connection.execute(prepare_query(query), params or ())
+
+    def executemany(self, query, params_list):
+        """Executes a statement once per parameter tuple inside the transaction"""
+        return self.connection.executemany(prepare_query(query), params_list)
+
+def run_transaction(work):
+    """
+    Runs work(transaction) atomically with a single commit
+
+    The write lock is taken up front with BEGIN IMMEDIATE, so conditional
+    updates such as "UPDATE ... WHERE status = 'Available'" cannot race
+    with another writer. Any exception rolls the whole unit back.
+
+    Args:
+        work (callable): Function receiving a Transaction
+
+    Returns:
+        Whatever work returns
+    """
+    def unit(connection):
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            result = work(Transaction(connection))
+            connection.commit()
+            return result
+        except Error as e:
+            logger.error(f"Error executing transaction: {e}")
+            raise
+        finally:
+            if connection.in_transaction:
+                connection.rollback()
+
+    started = time.perf_counter()
+    try:
+        return writer_queue.submit(unit)
+    finally:
+        _record_query(f"TRANSACTION {work.__qualname__}", time.perf_counter() - started, explain=False)
+
+def _rebuild_circulation_counters(cursor):
+    cursor.execute("DELETE FROM circulation_counts")
+    cursor.execute("DELETE FROM user_borrow_counts")
+    cursor.execute("DELETE FROM book_borrow_counts")
+    cursor.execute('''
+        INSERT INTO circulation_counts (status, count)
+        SELECT status, COUNT(*) FROM transactions GROUP BY status
+    ''')
+    cursor.execute('''
+        INSERT INTO user_borrow_counts (user_id, count)
+        SELECT user_id, COUNT(*) FROM transactions GROUP BY user_id
+    ''')
+    cursor.execute('''
+        INSERT INTO book_borrow_counts (book_id, count)
+        SELECT book_id, COUNT(*) FROM transactions GROUP BY book_id
+    ''')
+
+def rebuild_circulation_counters():
+    """
+    Recomputes the circulation counter tables from the transactions table
+    
+    The counters are normally kept current by triggers; this repairs them
+    after bulk edits made with the triggers bypassed.
+    """
+    run_transaction(lambda transaction: _rebuild_circulation_counters(transaction.connection))
 
 def init_db():
     """Initialize the database with schema"""
@@ -173,6 +651,7 @@ def init_db():
                 user_id TEXT NOT NULL,
                 status TEXT CHECK(status IN ('Issued', 'Returned', 'Overdue')) NOT NULL,
                 issue_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                due_date TIMESTAMP,
                 return_date TIMESTAMP,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (book_id) REFERENCES books(book_id) ON DELETE CASCADE,
@@ -188,12 +667,160 @@ def init_db():
                 user_id TEXT NOT NULL,
                 payment_status TEXT CHECK(payment_status IN ('Pending', 'Completed')) DEFAULT 'Pending',
                 expiry_time TIMESTAMP NOT NULL,
+                released_at TIMESTAMP,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (book_id) REFERENCES books(book_id) ON DELETE CASCADE,
                 FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
             )
         ''')
 
+        # Create leadership lease table for background jobs
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scheduler_leases (
+                name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+
+        # Create cache version table shared by all workers
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS cache_versions (
+                namespace TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+
+        # Create full-text search index over the book catalog, keyed by books.rowid
+        fts_exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books_fts'"
+        ).fetchone()
+
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+                title,
+                author,
+                subject_name,
+                course_name,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+        ''')
+
+        # Keep the search index in sync with books, subjects and courses
+        cursor.executescript('''
+            CREATE TRIGGER IF NOT EXISTS books_fts_insert AFTER INSERT ON books
+            BEGIN
+                INSERT INTO books_fts (rowid, title, author, subject_name, course_name)
+                SELECT new.rowid, new.title, new.author, s.name, c.name
+                FROM (SELECT 1)
+                LEFT JOIN subjects s ON s.subject_id = new.subject_id
+                LEFT JOIN courses c ON c.course_id = s.course_id;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS books_fts_update
+            AFTER UPDATE OF title, author, subject_id ON books
+            BEGIN
+                DELETE FROM books_fts WHERE rowid = old.rowid;
+                INSERT INTO books_fts (rowid, title, author, subject_name, course_name)
+                SELECT new.rowid, new.title, new.author, s.name, c.name
+                FROM (SELECT 1)
+                LEFT JOIN subjects s ON s.subject_id = new.subject_id
+                LEFT JOIN courses c ON c.course_id = s.course_id;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS books_fts_delete AFTER DELETE ON books
+            BEGIN
+                DELETE FROM books_fts WHERE rowid = old.rowid;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS subjects_fts_update
+            AFTER UPDATE OF name, course_id ON subjects
+            BEGIN
+                UPDATE books_fts
+                SET subject_name = new.name,
+                    course_name = (SELECT name FROM courses WHERE course_id = new.course_id)
+                WHERE rowid IN (SELECT rowid FROM books WHERE subject_id = new.subject_id);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS courses_fts_update AFTER UPDATE OF name ON courses
+            BEGIN
+                UPDATE books_fts
+                SET course_name = new.name
+                WHERE rowid IN (
+                    SELECT b.rowid FROM books b
+                    JOIN subjects s ON b.subject_id = s.subject_id
+                    WHERE s.course_id = new.course_id
+                );
+            END;
+        ''')
+
+        # Index books that existed before the search index was created
+        if not fts_exists:
+            cursor.execute('''
+                INSERT INTO books_fts (rowid, title, author, subject_name, course_name)
+                SELECT b.rowid, b.title, b.author, s.name, c.name
+                FROM books b
+                LEFT JOIN subjects s ON b.subject_id = s.subject_id
+                LEFT JOIN courses c ON s.course_id = c.course_id
+            ''')
+
+        # Create circulation counters maintained by triggers on transactions
+        counters_exist = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'circulation_counts'"
+        ).fetchone()
+
+        cursor.executescript('''
+            CREATE TABLE IF NOT EXISTS circulation_counts (
+                status TEXT PRIMARY KEY,
+                count INTEGER NOT NULL DEFAULT 0
+            );
+
+            CREATE TABLE IF NOT EXISTS user_borrow_counts (
+                user_id TEXT PRIMARY KEY,
+                count INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_user_borrow_counts_count
+                ON user_borrow_counts(count);
+
+            CREATE TABLE IF NOT EXISTS book_borrow_counts (
+                book_id TEXT PRIMARY KEY,
+                count INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_book_borrow_counts_count
+                ON book_borrow_counts(count);
+
+            CREATE TRIGGER IF NOT EXISTS transactions_counts_insert AFTER INSERT ON transactions
+            BEGIN
+                INSERT INTO circulation_counts (status, count) VALUES (new.status, 1)
+                ON CONFLICT(status) DO UPDATE SET count = count + 1;
+                INSERT INTO user_borrow_counts (user_id, count) VALUES (new.user_id, 1)
+                ON CONFLICT(user_id) DO UPDATE SET count = count + 1;
+                INSERT INTO book_borrow_counts (book_id, count) VALUES (new.book_id, 1)
+                ON CONFLICT(book_id) DO UPDATE SET count = count + 1;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS transactions_counts_update
+            AFTER UPDATE OF status ON transactions
+            WHEN old.status != new.status
+            BEGIN
+                UPDATE circulation_counts SET count = count - 1 WHERE status = old.status;
+                INSERT INTO circulation_counts (status, count) VALUES (new.status, 1)
+                ON CONFLICT(status) DO UPDATE SET count = count + 1;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS transactions_counts_delete AFTER DELETE ON transactions
+            BEGIN
+                UPDATE circulation_counts SET count = count - 1 WHERE status = old.status;
+                UPDATE user_borrow_counts SET count = count - 1 WHERE user_id = old.user_id;
+                UPDATE book_borrow_counts SET count = count - 1 WHERE book_id = old.book_id;
+            END;
+        ''')
+
+        # Count transactions recorded before the counters existed
+        if not counters_exist:
+            _rebuild_circulation_counters(cursor)
+
         # Insert default admin account if it doesn't exist
         cursor.execute('''
             INSERT OR IGNORE INTO users (id, name, role, email, password)
@@ -227,6 +854,10 @@ def init_db():
         ])
 
         connection.commit()
+
+        # Bring columns and indexes up to the latest schema version
+        run_migrations(connection)
+
         logger.info("Database initialized successfully")
 
     except Error as e:
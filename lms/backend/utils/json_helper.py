@@ -0,0 +1,91 @@
+"""
+JSON serialization for API responses
+
+Uses orjson when it is installed and falls back to the standard library
+otherwise. Both backends write datetimes, dates and times as ISO 8601, so
+routes can return rows from the database without converting them first.
+"""
+import dataclasses
+import decimal
+import json
+import sqlite3
+import uuid
+from datetime import date, datetime, time
+from ..config import JSON_BACKEND
+import logging
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _default(obj):
+    """Converts values neither backend serializes on its own"""
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, sqlite3.Row):
+        return dict(zip(obj.keys(), obj))
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _orjson_dumps(obj, indent=None, sort_keys=False):
+    option = orjson.OPT_NON_STR_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return orjson.dumps(obj, default=_default, option=option).decode('utf-8')
+
+def _stdlib_dumps(obj, indent=None, sort_keys=False):
+    separators = None if indent else (',', ':')
+    return json.dumps(
+        obj, default=_default, indent=indent, sort_keys=sort_keys,
+        separators=separators, ensure_ascii=False
+    )
+
+def select_backend(name=JSON_BACKEND):
+    """
+    Returns the dumps function for a backend name
+
+    Args:
+        name (str): 'orjson', 'stdlib', or 'auto' for orjson when installed
+
+    Returns:
+        callable: dumps(obj, indent=None, sort_keys=False) -> str
+    """
+    if name == 'stdlib':
+        return _stdlib_dumps
+    if name in ('auto', 'orjson'):
+        if orjson is not None:
+            return _orjson_dumps
+        if name == 'orjson':
+            logger.warning("orjson is not installed; using the stdlib JSON encoder")
+        return _stdlib_dumps
+    raise ValueError(f"Unknown JSON backend: {name}")
+
+dumps = select_backend()
+
+class JSONEncoder(json.JSONEncoder):
+    """
+    Encoder for app.json_encoder that hands whole documents to dumps
+
+    Flask's jsonify instantiates the encoder and calls encode(); the
+    configured backend then serializes the payload in one call.
+    """
+
+    def default(self, obj):
+        return _default(obj)
+
+    def encode(self, obj):
+        return dumps(obj, indent=self.indent, sort_keys=self.sort_keys)
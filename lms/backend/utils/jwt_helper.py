@@ -2,8 +2,12 @@
 JWT helper utilities for token generation and validation
 """
 import jwt
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
-from ..config import JWT_SECRET_KEY, JWT_ACCESS_TOKEN_EXPIRES
+from ..config import JWT_SECRET_KEY, JWT_ACCESS_TOKEN_EXPIRES, TOKEN_CACHE_MAX_ENTRIES
 import logging
 
 # Configure logging
@@ -52,6 +56,83 @@ def decode_token(token):
         logger.error(f"Invalid token: {e}")
         raise
 
+class TokenCache:
+    """
+    Bounded LRU of verified token payloads, keyed by the token's SHA-256 digest
+    
+    An entry lives until the token's exp claim, so an expired token always
+    misses and goes back through jwt.decode, which rejects it.
+    """
+    
+    def __init__(self, max_entries=TOKEN_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+        
+    def get(self, token):
+        """
+        Returns the cached payload for token, or None if it must be verified
+        """
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+            self.misses += 1
+        return None
+        
+    def put(self, token, payload):
+        """
+        Stores a verified payload until its exp claim
+        """
+        expires_at = payload.get('exp')
+        if self.max_entries <= 0 or expires_at is None:
+            return
+            
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                
+    def clear(self):
+        """Drops every cached token"""
+        with self._lock:
+            self._entries.clear()
+            
+    def stats(self):
+        """Returns hit/miss counters and the number of cached tokens"""
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+token_cache = TokenCache()
+
+def verify_token(token):
+    """
+    Returns the payload of a valid token, consulting the verified-token cache first
+    
+    Args:
+        token (str): JWT token to verify
+        
+    Returns:
+        dict: Decoded token payload (a copy; callers may modify it)
+    """
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = decode_token(token)
+        token_cache.put(token, payload)
+    return dict(payload)
+
 def token_required(f):
     """
     Decorator for protecting routes with JWT
@@ -76,7 +157,7 @@ def token_required(f):
             
         try:
             # Decode token
-            payload = decode_token(token)
+            payload = verify_token(token)
             request.user = payload
         except Exception as e:
             return jsonify({'message': str(e)}), 401
@@ -0,0 +1,376 @@
+"""
+Process-shared metrics in the Prometheus text exposition format
+
+Every worker process appends its counters to its own memory-mapped file
+in METRICS_DIR, so recording a sample never takes a lock shared with
+other workers. A scrape of /metrics, served by whichever worker gets the
+request, reads every file and sums the values. Gauges carry a pid label
+and are skipped once their process has exited.
+"""
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from bisect import bisect_left
+from ..config import METRICS_ENABLED, METRICS_DIR, METRICS_GAUGE_INTERVAL
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the queries-per-request histogram buckets
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+HISTOGRAM_BUCKETS = {
+    'lms_http_request_duration_seconds': LATENCY_BUCKETS,
+    'lms_http_request_queries': QUERY_COUNT_BUCKETS,
+}
+
+METRIC_HELP = {
+    'lms_http_request_duration_seconds': ('histogram', 'Request latency by endpoint'),
+    'lms_http_requests_total': ('counter', 'Responses by endpoint and status code'),
+    'lms_http_request_queries': ('histogram', 'Database calls made per request, by endpoint'),
+    'lms_http_request_query_seconds_total': ('counter', 'Time spent in database calls, by endpoint'),
+    'lms_db_queries_total': ('counter', 'Database calls by statement fingerprint'),
+    'lms_db_query_seconds_total': ('counter', 'Time spent in database calls by statement fingerprint'),
+    'lms_db_statement_info': ('gauge', 'Normalized SQL of each statement fingerprint'),
+}
+
+_INITIAL_FILE_SIZE = 64 * 1024
+_HEADER = struct.Struct('<q')
+_LENGTH = struct.Struct('<i')
+_VALUE = struct.Struct('<d')
+
+def _encode_key(name, labels):
+    return json.dumps([name, labels], sort_keys=True, separators=(',', ':'))
+
+class ValueFile:
+    """
+    Append-only key -> float64 map in a memory-mapped file
+
+    Layout: an 8-byte count of used bytes, then entries of a 4-byte key
+    length, the UTF-8 key padded to 8-byte alignment and an 8-byte value.
+    Entries are written before the used count is advanced, so a reader
+    in another process never sees a half-written entry.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a+b')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _INITIAL_FILE_SIZE:
+            self._file.truncate(_INITIAL_FILE_SIZE)
+            size = _INITIAL_FILE_SIZE
+        self._capacity = size
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._positions = {}
+        self._used = _HEADER.unpack_from(self._map, 0)[0]
+        if self._used == 0:
+            self._used = _HEADER.size
+            _HEADER.pack_into(self._map, 0, self._used)
+        for key, _, position in _read_entries(self._map, self._used):
+            self._positions[key] = position
+
+    def _position(self, key):
+        position = self._positions.get(key)
+        if position is not None:
+            return position
+
+        encoded = key.encode('utf-8')
+        padding = (8 - (_LENGTH.size + len(encoded)) % 8) % 8
+        entry = _LENGTH.pack(len(encoded)) + encoded + b' ' * padding + _VALUE.pack(0.0)
+        while self._used + len(entry) > self._capacity:
+            self._capacity *= 2
+            self._map.close()
+            self._file.truncate(self._capacity)
+            self._map = mmap.mmap(self._file.fileno(), self._capacity)
+
+        self._map[self._used:self._used + len(entry)] = entry
+        self._used += len(entry)
+        _HEADER.pack_into(self._map, 0, self._used)
+        position = self._used - _VALUE.size
+        self._positions[key] = position
+        return position
+
+    def add(self, key, amount):
+        position = self._position(key)
+        _VALUE.pack_into(self._map, position, _VALUE.unpack_from(self._map, position)[0] + amount)
+
+    def set(self, key, value):
+        _VALUE.pack_into(self._map, self._position(key), value)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+def _read_entries(buffer, used):
+    """Yields (key, value, value_position) for each entry of a value file"""
+    position = _HEADER.size
+    while position < used:
+        length = _LENGTH.unpack_from(buffer, position)[0]
+        key_start = position + _LENGTH.size
+        key = bytes(buffer[key_start:key_start + length]).decode('utf-8')
+        value_position = key_start + length + (8 - (_LENGTH.size + length) % 8) % 8
+        yield key, _VALUE.unpack_from(buffer, value_position)[0], value_position
+        position = value_position + _VALUE.size
+
+def _read_file(path):
+    """Returns the entries of another process's value file"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < _HEADER.size:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            used = _HEADER.unpack_from(buffer, 0)[0]
+            return [(key, value) for key, value, _ in _read_entries(buffer, used)]
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class Metrics:
+    """
+    Records request and query metrics into this process's value file
+
+    Threads of one worker share the file behind a process-local lock;
+    workers never contend with each other.
+    """
+
+    def __init__(self, directory=METRICS_DIR, enabled=METRICS_ENABLED,
+                 gauge_interval=METRICS_GAUGE_INTERVAL):
+        self.directory = directory
+        self.enabled = enabled
+        self.gauge_interval = gauge_interval
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._values = None
+        self._pid = None
+        self._gauge_sources = []
+        self._gauges_updated = 0.0
+        self._statements = set()
+
+    def _file(self):
+        # Caller holds the lock
+        if self._values is None or self._pid != os.getpid():
+            os.makedirs(self.directory, exist_ok=True)
+            self._pid = os.getpid()
+            self._values = ValueFile(os.path.join(self.directory, f'{self._pid}.metrics'))
+            self._statements = set()
+        return self._values
+
+    def _observe(self, name, labels, value, buckets):
+        """Adds one histogram sample; caller holds the lock"""
+        values = self._file()
+        index = bisect_left(buckets, value)
+        bound = '+Inf' if index == len(buckets) else _bound(buckets[index])
+        values.add(_encode_key(f'{name}_bucket', dict(labels, le=bound)), 1)
+        values.add(_encode_key(f'{name}_sum', labels), value)
+        values.add(_encode_key(f'{name}_count', labels), 1)
+
+    def begin_request(self):
+        """Starts counting database calls for the current thread's request"""
+        self._local.queries = 0
+        self._local.query_seconds = 0.0
+
+    def request_stats(self):
+        """
+        Database calls made so far by the current thread's request
+
+        Calls made while a streamed response body is read still count
+        until the next begin_request.
+        """
+        return {
+            'queries': getattr(self._local, 'queries', None) or 0,
+            'query_seconds': getattr(self._local, 'query_seconds', None) or 0.0,
+        }
+
+    def observe_query(self, fingerprint, statement, seconds):
+        """
+        Records one database call
+
+        Args:
+            fingerprint (str): Short hash identifying the normalized statement
+            statement (str): Normalized SQL, exported once per fingerprint
+            seconds (float): Wall time the caller spent in the call
+        """
+        if not self.enabled:
+            return
+        if getattr(self._local, 'queries', None) is not None:
+            self._local.queries += 1
+            self._local.query_seconds += seconds
+
+        labels = {'fingerprint': fingerprint}
+        with self._lock:
+            values = self._file()
+            values.add(_encode_key('lms_db_queries_total', labels), 1)
+            values.add(_encode_key('lms_db_query_seconds_total', labels), seconds)
+            if fingerprint not in self._statements:
+                self._statements.add(fingerprint)
+                values.set(_encode_key('lms_db_statement_info', dict(labels, statement=statement)), 1)
+
+    def end_request(self, endpoint, status, seconds):
+        """
+        Records a finished request and the database calls it made
+
+        Args:
+            endpoint (str): Flask endpoint, e.g. 'books.get_books'
+            status (int): Response status code
+            seconds (float): Request latency
+        """
+        if not self.enabled:
+            return
+        stats = self.request_stats()
+        queries, query_seconds = stats['queries'], stats['query_seconds']
+
+        labels = {'endpoint': endpoint}
+        with self._lock:
+            self._observe('lms_http_request_duration_seconds', labels, seconds, LATENCY_BUCKETS)
+            self._observe('lms_http_request_queries', labels, queries, QUERY_COUNT_BUCKETS)
+            values = self._file()
+            values.add(_encode_key('lms_http_requests_total', dict(labels, status=str(status))), 1)
+            values.add(_encode_key('lms_http_request_query_seconds_total', labels), query_seconds)
+        self.update_gauges()
+
+    def register_gauges(self, source):
+        """
+        Adds a gauge source
+
+        Args:
+            source (callable): Returns {(name, labels_dict): value}; called
+                at most once per gauge interval and on every scrape
+        """
+        self._gauge_sources.append(source)
+
+    def update_gauges(self, force=False):
+        """Writes this worker's gauges, at most once per gauge interval unless forced"""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if not force and now - self._gauges_updated < self.gauge_interval:
+            return
+        self._gauges_updated = now
+
+        samples = {}
+        for source in self._gauge_sources:
+            try:
+                samples.update(source())
+            except Exception as e:
+                logger.error(f"Error collecting gauges: {e}")
+        with self._lock:
+            values = self._file()
+            for (name, labels), value in samples.items():
+                values.set(_encode_key(name, dict(labels, pid=str(self._pid))), value)
+
+    def collect(self):
+        """
+        Merges every worker's value file
+
+        Returns:
+            dict: {(name, labels_tuple): value}
+        """
+        merged = {}
+        for path in glob.glob(os.path.join(self.directory, '*.metrics')):
+            try:
+                pid = int(os.path.basename(path).split('.')[0])
+                alive = pid == os.getpid() or _pid_alive(pid)
+                entries = _read_file(path)
+            except (OSError, ValueError) as e:
+                logger.error(f"Skipping metrics file {path}: {e}")
+                continue
+            for key, value in entries:
+                name, labels = json.loads(key)
+                if 'pid' in labels and not alive:
+                    continue
+                if name == 'lms_db_statement_info':
+                    merged[(name, tuple(sorted(labels.items())))] = 1
+                    continue
+                sample = (name, tuple(sorted(labels.items())))
+                merged[sample] = merged.get(sample, 0.0) + value
+        return merged
+
+    def render(self):
+        """Returns all metrics in the Prometheus text exposition format"""
+        self.update_gauges(force=True)
+
+        families = {}
+        for (name, labels), value in self.collect().items():
+            family = name
+            for suffix in ('_bucket', '_sum', '_count'):
+                if name.endswith(suffix) and name[:-len(suffix)] in HISTOGRAM_BUCKETS:
+                    family = name[:-len(suffix)]
+            families.setdefault(family, {})[(name, labels)] = value
+
+        lines = []
+        for family in sorted(families):
+            metric_type, description = METRIC_HELP.get(family, ('gauge', family.replace('_', ' ')))
+            lines.append(f'# HELP {family} {description}')
+            lines.append(f'# TYPE {family} {metric_type}')
+            samples = families[family]
+            if family in HISTOGRAM_BUCKETS:
+                samples = _cumulative_buckets(family, samples)
+            for (name, labels), value in sorted(samples.items(), key=_sample_order):
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        """Deletes every value file; used when a deployment restarts"""
+        with self._lock:
+            if self._values is not None:
+                self._values.close()
+                self._values = None
+            for path in glob.glob(os.path.join(self.directory, '*.metrics')):
+                os.remove(path)
+
+def _bound(bucket):
+    return repr(float(bucket))
+
+def _cumulative_buckets(family, samples):
+    """Turns per-bucket counts into Prometheus' cumulative le buckets"""
+    counts = {}
+    result = {}
+    for (name, labels), value in samples.items():
+        if name != f'{family}_bucket':
+            result[(name, labels)] = value
+            continue
+        labels = dict(labels)
+        bound = labels.pop('le')
+        counts.setdefault(tuple(sorted(labels.items())), {})[bound] = value
+
+    for labels, by_bound in counts.items():
+        total = 0.0
+        for bound in [_bound(bucket) for bucket in HISTOGRAM_BUCKETS[family]] + ['+Inf']:
+            total += by_bound.get(bound, 0.0)
+            result[(f'{family}_bucket', labels + (('le', bound),))] = total
+    return result
+
+def _sample_order(sample):
+    (name, labels), _ = sample
+    # Buckets of one series sort by their numeric upper bound, +Inf last
+    bound = dict(labels).get('le')
+    return name, tuple(label for label in labels if label[0] != 'le'), float(bound) if bound else 0.0
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+def _format_value(value):
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+metrics = Metrics()
@@ -0,0 +1,259 @@
+"""
+Versioned schema migrations and query plan checks for the SQLite database
+"""
+from datetime import datetime
+from .query_helper import (
+    BOOK_FIELDS, TRANSACTION_FIELDS, GET_BOOK, BOOK_STATUS_QUERY, BOOK_BY_BARCODE, SUBJECT_BOOKS,
+    CLOSE_LOAN, USER_TRANSACTIONS, OVERDUE_BOOKS, PENDING_OVERDUE_COUNT, ACTIVE_USERS,
+    POPULAR_BOOKS, OVERDUE_SWEEP, EXPIRED_PREORDERS, SESSION_BY_TOKEN, SESSION_SWEEP, LOGIN_USER,
+    book_list_query, transaction_list_query, transaction_export_query,
+    course_list_query, subject_list_query
+)
+from ..config import LOAN_PERIOD_DAYS, TIMESTAMP_FORMAT
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _add_column(cursor, table, column, declaration):
+    """Adds a column unless the table was created with it"""
+    columns = [row['name'] for row in cursor.execute(f"PRAGMA table_info({table})")]
+    if column in columns:
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+    return True
+
+def _loan_due_dates(cursor):
+    if _add_column(cursor, 'transactions', 'due_date', 'TIMESTAMP'):
+        cursor.execute(
+            "UPDATE transactions SET due_date = datetime(issue_date, ?)",
+            (f'+{LOAN_PERIOD_DAYS} days',)
+        )
+    # Overdue detection is a range scan over (status, due_date)
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_status_due_date
+        ON transactions(status, due_date)
+    ''')
+
+def _preorder_release(cursor):
+    _add_column(cursor, 'preorders', 'released_at', 'TIMESTAMP')
+    # Pending expiries are read in deadline order; released rows drop out of the index
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_preorders_expiry_time
+        ON preorders(expiry_time) WHERE released_at IS NULL
+    ''')
+
+# Timestamp columns rewritten by the normalize_timestamps migration
+TIMESTAMP_COLUMNS = {
+    'users': ['created_at'],
+    'streams': ['created_at'],
+    'courses': ['created_at'],
+    'subjects': ['created_at'],
+    'books': ['created_at'],
+    'transactions': ['issue_date', 'due_date', 'return_date', 'created_at'],
+    'preorders': ['expiry_time', 'released_at', 'created_at'],
+    'sessions': ['created_at', 'expires_at', 'revoked_at'],
+}
+
+def _normalize_timestamps(cursor):
+    # Older rows hold whatever str(datetime) gave: microseconds, or a 'T' separator
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        for column in columns:
+            cursor.execute(f'''
+                UPDATE {table} SET {column} = strftime(?, {column})
+                WHERE typeof({column}) = 'text'
+                  AND (length({column}) != 19 OR substr({column}, 11, 1) != ' ')
+                  AND strftime(?, {column}) IS NOT NULL
+            ''', (TIMESTAMP_FORMAT, TIMESTAMP_FORMAT))
+
+# Each migration runs once, in version order. Steps are SQL statements or
+# callables taking a cursor. Append new migrations; never edit applied ones.
+MIGRATIONS = [
+    (1, 'loan_due_dates', [_loan_due_dates]),
+    (2, 'preorder_release', [_preorder_release]),
+    (3, 'route_indexes', [
+        # get_books: status filter paged by book_id
+        "CREATE INDEX IF NOT EXISTS idx_books_status_book_id ON books(status, book_id)",
+        # get_books subject filter and get_subject_books ORDER BY title
+        "CREATE INDEX IF NOT EXISTS idx_books_subject_title ON books(subject_id, title)",
+        # get_transactions / export: newest first, keyset on (issue_date, allotment_id)
+        "CREATE INDEX IF NOT EXISTS idx_transactions_issue_date "
+        "ON transactions(issue_date, allotment_id)",
+        # get_user_transactions and the user_id filter, ordered by issue_date
+        "CREATE INDEX IF NOT EXISTS idx_transactions_user_issue_date "
+        "ON transactions(user_id, issue_date)",
+        # return_book closes the open loan of a book; book_id filter
+        "CREATE INDEX IF NOT EXISTS idx_transactions_book_status "
+        "ON transactions(book_id, status)",
+        # get_subjects and the hierarchy: subjects of a course by semester
+        "CREATE INDEX IF NOT EXISTS idx_subjects_course_semester "
+        "ON subjects(course_id, semester, name)",
+        # get_courses: courses of a stream by name
+        "CREATE INDEX IF NOT EXISTS idx_courses_stream_name ON courses(stream_id, name)",
+        # login looks users up by email and role
+        "CREATE INDEX IF NOT EXISTS idx_users_email_role ON users(email, role)",
+    ]),
+    (4, 'sessions', [
+        # Refresh token sessions; only the HMAC of each token is stored
+        """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            family_id TEXT NOT NULL,
+            token_hash TEXT NOT NULL UNIQUE,
+            created_at TIMESTAMP NOT NULL,
+            expires_at TIMESTAMP NOT NULL,
+            revoked_at TIMESTAMP,
+            replaced_by TEXT,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+        """,
+        # refresh looks sessions up by token_hash (UNIQUE); logout-all by user
+        "CREATE INDEX IF NOT EXISTS idx_sessions_user_id ON sessions(user_id)",
+        # reuse detection revokes a whole family
+        "CREATE INDEX IF NOT EXISTS idx_sessions_family_id ON sessions(family_id)",
+        # the sweeper deletes by expiry
+        "CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions(expires_at)",
+    ]),
+    (5, 'normalize_timestamps', [_normalize_timestamps, "ANALYZE transactions"]),
+]
+
+def run_migrations(connection):
+    """
+    Applies pending migrations, each in its own transaction
+    
+    Args:
+        connection (sqlite3.Connection): Connection to migrate
+        
+    Returns:
+        list: Versions applied by this call
+    """
+    cursor = connection.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+        )
+    ''')
+    connection.commit()
+    
+    applied = {row['version'] for row in cursor.execute("SELECT version FROM schema_migrations")}
+    newly_applied = []
+    
+    for version, name, steps in MIGRATIONS:
+        if version in applied:
+            continue
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            # Another worker may have applied it while we waited for the lock
+            if cursor.execute(
+                "SELECT 1 FROM schema_migrations WHERE version = ?", (version,)
+            ).fetchone():
+                connection.rollback()
+                continue
+            for step in steps:
+                if callable(step):
+                    step(cursor)
+                else:
+                    cursor.execute(step)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                (version, name, datetime.now())
+            )
+            connection.commit()
+        except Exception as e:
+            logger.error(f"Error applying migration {version} ({name}): {e}")
+            connection.rollback()
+            raise
+        logger.info(f"Applied migration {version} ({name})")
+        newly_applied.append(version)
+        
+    return newly_applied
+
+# Sample parameters for planning; their values do not change the plan
+_SAMPLE_TIME = datetime(2025, 1, 1)
+_SAMPLE_PAGE = 51
+
+# The hot route statements, built by the same query_helper calls the routes
+# make, with (SQL, parameters). None of them may need a full scan of a table.
+HOT_QUERIES = {
+    'get_books first page': book_list_query(list(BOOK_FIELDS), _SAMPLE_PAGE),
+    'get_books next page': book_list_query(list(BOOK_FIELDS), _SAMPLE_PAGE, after='book'),
+    'get_books by status': book_list_query(list(BOOK_FIELDS), _SAMPLE_PAGE, status='Available'),
+    'get_books by subject': book_list_query(
+        list(BOOK_FIELDS), _SAMPLE_PAGE, subject_id='subject', after='book'
+    ),
+    'get_book': (GET_BOOK, ('book',)),
+    'get_subject_books': (SUBJECT_BOOKS, ('subject',)),
+    'book status check': (BOOK_STATUS_QUERY, ('book',)),
+    'barcode lookup': (BOOK_BY_BARCODE, ('barcode',)),
+    'get_transactions first page': transaction_list_query(list(TRANSACTION_FIELDS), _SAMPLE_PAGE),
+    'get_transactions next page': transaction_list_query(
+        list(TRANSACTION_FIELDS), _SAMPLE_PAGE, after=(_SAMPLE_TIME, 'allotment')
+    ),
+    'get_transactions by user': transaction_list_query(
+        list(TRANSACTION_FIELDS), _SAMPLE_PAGE, user_id='user'
+    ),
+    'get_transactions date range': transaction_list_query(
+        list(TRANSACTION_FIELDS), _SAMPLE_PAGE, start_date='2025-01-01', end_date='2025-01-07'
+    ),
+    'get_transactions by user and date range': transaction_list_query(
+        list(TRANSACTION_FIELDS), _SAMPLE_PAGE,
+        user_id='user', start_date='2025-01-01', end_date='2025-01-07'
+    ),
+    'export date range': transaction_export_query(start_date='2025-01-01', end_date='2025-01-07'),
+    'get_user_transactions': (USER_TRANSACTIONS, ('user',)),
+    'return_book close loan': (CLOSE_LOAN, ('Returned', _SAMPLE_TIME, 'book')),
+    'get_overdue_books': (OVERDUE_BOOKS, (_SAMPLE_TIME,)),
+    'stats pending overdue': (PENDING_OVERDUE_COUNT, (_SAMPLE_TIME,)),
+    'stats active users': (ACTIVE_USERS, ()),
+    'stats popular books': (POPULAR_BOOKS, ()),
+    'overdue sweep': (OVERDUE_SWEEP, (_SAMPLE_TIME, 1000)),
+    'refresh session': (SESSION_BY_TOKEN, ('token',)),
+    'session sweep': (SESSION_SWEEP, (_SAMPLE_TIME, 1000)),
+    'expired preorders': (EXPIRED_PREORDERS, (_SAMPLE_TIME, 1000)),
+    'get_courses by stream': course_list_query('stream'),
+    'get_subjects by course': subject_list_query('course', 1),
+    'login': (LOGIN_USER, ('user@example.com', 'student')),
+}
+
+# Top-k queries that may walk an index in sort order, stopping after LIMIT rows
+ORDERED_SCANS = {
+    'get_books first page', 'get_transactions first page',
+    'stats active users', 'stats popular books'
+}
+
+def _is_full_scan(detail, ordered_scan_allowed):
+    """True for a plan step that reads a whole table or index"""
+    if not detail.startswith('SCAN ') or 'VIRTUAL TABLE' in detail:
+        return False
+    return not (ordered_scan_allowed and 'USING' in detail)
+
+def check_query_plans(connection, queries=HOT_QUERIES):
+    """
+    Runs EXPLAIN QUERY PLAN over the hot route queries
+    
+    Args:
+        connection (sqlite3.Connection): Connection to a migrated database
+        queries (dict): Query name to (SQL with %s placeholders, parameters)
+        
+    Returns:
+        dict: Query name to the full-scan plan steps it contains; empty when all pass
+    """
+    # db_helper imports this module for its migrations
+    from .db_helper import prepare_query
+    
+    failures = {}
+    for name, (query, params) in queries.items():
+        plan = connection.execute(
+            f"EXPLAIN QUERY PLAN {prepare_query(query)}", tuple(params or ())
+        ).fetchall()
+        scans = [
+            row['detail'] for row in plan
+            if _is_full_scan(row['detail'], name in ORDERED_SCANS)
+        ]
+        if scans:
+            failures[name] = scans
+    return failures
@@ -0,0 +1,104 @@
+"""
+Pagination helpers for keyset (cursor-based) listing endpoints
+"""
+import base64
+import json
+from ..config import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
+
+class PaginationError(ValueError):
+    """Raised for a malformed limit, cursor or fields parameter"""
+
+def parse_limit(value):
+    """
+    Parses the limit query parameter
+    
+    Args:
+        value (str): Raw parameter value, may be None
+        
+    Returns:
+        int: Page size between 1 and PAGE_SIZE_MAX
+    """
+    if value is None:
+        return PAGE_SIZE_DEFAULT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise PaginationError('limit must be an integer')
+    if limit < 1:
+        raise PaginationError('limit must be positive')
+    return min(limit, PAGE_SIZE_MAX)
+
+def encode_cursor(values):
+    """
+    Encodes the sort key of the last row on a page as an opaque cursor
+    
+    Args:
+        values (list): Sort key values of the last row
+        
+    Returns:
+        str: URL-safe cursor string
+    """
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, size):
+    """
+    Decodes a cursor produced by encode_cursor
+    
+    Args:
+        cursor (str): Cursor from the after query parameter
+        size (int): Number of sort key values the endpoint expects
+        
+    Returns:
+        list: Sort key values
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise PaginationError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise PaginationError('Invalid cursor')
+    return values
+
+def parse_fields(value, allowed, required=()):
+    """
+    Parses the fields projection parameter
+    
+    Args:
+        value (str): Comma separated field names, may be None for all fields
+        allowed (dict): Mapping of field name to SQL expression
+        required (tuple): Fields always returned (sort keys)
+        
+    Returns:
+        list: Field names to select, in allowed order
+    """
+    if not value:
+        return list(allowed)
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise PaginationError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    requested.update(required)
+    return [name for name in allowed if name in requested]
+
+def select_clause(fields, allowed):
+    """Builds the SELECT column list for a projection"""
+    return ', '.join(f"{allowed[name]} as {name}" for name in fields)
+
+def paginate(rows, limit, key):
+    """
+    Splits a limit + 1 row fetch into a page and the cursor for the next one
+    
+    Args:
+        rows (list): Rows fetched with LIMIT limit + 1
+        limit (int): Page size
+        key (callable): Returns the sort key values of a row
+        
+    Returns:
+        tuple: (page rows, next cursor or None)
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(key(page[-1]))
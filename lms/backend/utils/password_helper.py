@@ -0,0 +1,136 @@
+"""
+Password hashing helpers for VREC Library Management System
+
+bcrypt is deliberately slow, so hashing and verification run in a small
+process pool instead of on request threads. Admission is bounded: when the
+pool already has PASSWORD_POOL_MAX_PENDING jobs, new ones are turned away
+with PasswordPoolBusy rather than queueing behind a login storm.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import threading
+import bcrypt
+from werkzeug.security import check_password_hash
+from ..config import (
+    PASSWORD_HASH_ROUNDS, PASSWORD_POOL_WORKERS, PASSWORD_POOL_MAX_PENDING, PASSWORD_POOL_TIMEOUT
+)
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Pool processes must not be forked from a worker that already runs threads
+# (request threads, background jobs), which can leave locks held in the child
+POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+class PasswordPoolBusy(Exception):
+    """Raised when the hashing pool has no room for another job"""
+
+def _hash(password, rounds):
+    """Hashes a password with bcrypt (runs in a pool process)"""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def _verify(password, hashed):
+    """Checks a password against a stored hash (runs in a pool process)"""
+    if hashed.startswith('$2'):
+        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    # Hashes written by werkzeug's generate_password_hash before bcrypt was used
+    return check_password_hash(hashed, password)
+
+class PasswordPool:
+    """
+    Bounded process pool for bcrypt work
+
+    The executor is created lazily and recreated after a fork, so each
+    gunicorn worker gets its own processes. With zero workers the work runs
+    inline on the calling thread but is still subject to admission control.
+    A job holds its admission slot until it finishes, even if the caller
+    gave up waiting for it.
+    """
+
+    def __init__(self, workers=PASSWORD_POOL_WORKERS, max_pending=PASSWORD_POOL_MAX_PENDING,
+                 timeout=PASSWORD_POOL_TIMEOUT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(POOL_START_METHOD)
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def run(self, func, *args):
+        """
+        Runs func(*args) in the pool and returns its result
+
+        Raises:
+            PasswordPoolBusy: If max_pending jobs are already admitted
+        """
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise PasswordPoolBusy("Too many concurrent password operations")
+
+        if self.workers <= 0:
+            try:
+                return func(*args)
+            finally:
+                self._slots.release()
+
+        try:
+            future = self._get_executor().submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # A timed out job keeps running in the pool, so it keeps its slot until done
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result(timeout=self.timeout)
+
+    def shutdown(self):
+        """Stops the pool processes owned by this worker"""
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=True)
+            self._executor = None
+            self._pid = None
+
+password_pool = PasswordPool()
+
+def hash_password(password, rounds=PASSWORD_HASH_ROUNDS):
+    """
+    Hashes a password with bcrypt at the configured work factor
+
+    Args:
+        password (str): Plain-text password
+        rounds (int): bcrypt cost (log2 of the iteration count)
+
+    Returns:
+        str: bcrypt hash
+    """
+    return password_pool.run(_hash, password, rounds)
+
+def verify_password(password, hashed):
+    """
+    Checks a plain-text password against a stored hash
+
+    Args:
+        password (str): Plain-text password
+        hashed (str): Stored bcrypt or werkzeug hash
+
+    Returns:
+        bool: True if the password matches
+    """
+    if not hashed:
+        return False
+    return password_pool.run(_verify, password, hashed)
@@ -0,0 +1,353 @@
+"""
+SQL for the hot route queries
+
+The routes and background jobs build their statements here, and
+migration_helper.HOT_QUERIES plans the same statements, so the query
+plan check cannot drift from the SQL that actually runs.
+"""
+from datetime import datetime, timedelta
+from .pagination_helper import select_clause
+
+# Fields selectable with ?fields= on the books listing and their SQL expressions
+BOOK_FIELDS = {
+    'book_id': 'b.book_id',
+    'subject_id': 'b.subject_id',
+    'title': 'b.title',
+    'author': 'b.author',
+    'barcode': 'b.barcode',
+    'status': 'b.status',
+    'created_at': 'b.created_at',
+    'subject_name': 's.name',
+    'course_name': 'c.name'
+}
+
+# Fields selectable with ?fields= on the transactions listing and their SQL expressions
+TRANSACTION_FIELDS = {
+    'allotment_id': 't.allotment_id',
+    'book_id': 't.book_id',
+    'user_id': 't.user_id',
+    'status': 't.status',
+    'issue_date': 't.issue_date',
+    'return_date': 't.return_date',
+    'created_at': 't.created_at',
+    'book_title': 'b.title',
+    'book_barcode': 'b.barcode',
+    'user_name': 'u.name',
+    'user_email': 'u.email'
+}
+
+GET_BOOK = """
+    SELECT b.*, s.name as subject_name, c.name as course_name
+    FROM books b
+    LEFT JOIN subjects s ON b.subject_id = s.subject_id
+    LEFT JOIN courses c ON s.course_id = c.course_id
+    WHERE b.book_id = %s
+"""
+
+BOOK_STATUS_QUERY = "SELECT status FROM books WHERE book_id = %s"
+
+BOOK_BY_BARCODE = "SELECT book_id FROM books WHERE barcode = %s"
+
+SUBJECT_BOOKS = """
+    SELECT b.*, s.name as subject_name, c.name as course_name
+    FROM books b
+    JOIN subjects s ON b.subject_id = s.subject_id
+    JOIN courses c ON s.course_id = c.course_id
+    WHERE b.subject_id = %s
+    ORDER BY b.title
+"""
+
+CLOSE_LOAN = """
+    UPDATE transactions
+    SET status = %s, return_date = %s
+    WHERE book_id = %s AND status IN ('Issued', 'Overdue')
+"""
+
+USER_TRANSACTIONS = """
+    SELECT t.*,
+           b.title as book_title,
+           b.barcode as book_barcode
+    FROM transactions t
+    JOIN books b ON t.book_id = b.book_id
+    WHERE t.user_id = %s
+    ORDER BY t.issue_date DESC
+"""
+
+# Loans already swept to Overdue, plus any that fell due since the last sweep.
+# Each arm is a (status, due_date) range scan, so the cost follows open
+# loans rather than history, and the merge keeps due_date order.
+OVERDUE_BOOKS = """
+    SELECT t.*,
+           b.title as book_title,
+           b.barcode as book_barcode,
+           u.name as user_name,
+           u.email as user_email
+    FROM (
+        SELECT * FROM transactions WHERE status = 'Overdue'
+        UNION ALL
+        SELECT * FROM transactions WHERE status = 'Issued' AND due_date < %s
+    ) t
+    JOIN books b ON t.book_id = b.book_id
+    JOIN users u ON t.user_id = u.id
+    ORDER BY t.due_date ASC
+"""
+
+PENDING_OVERDUE_COUNT = """
+    SELECT COUNT(*) as count
+    FROM transactions
+    WHERE status = 'Issued'
+    AND due_date < %s
+"""
+
+# Top-k from the counter indexes
+ACTIVE_USERS = """
+    SELECT u.name, u.email, ubc.count as transaction_count
+    FROM user_borrow_counts ubc
+    JOIN users u ON ubc.user_id = u.id
+    ORDER BY ubc.count DESC
+    LIMIT 5
+"""
+
+POPULAR_BOOKS = """
+    SELECT b.title, bbc.count as borrow_count
+    FROM book_borrow_counts bbc
+    JOIN books b ON bbc.book_id = b.book_id
+    ORDER BY bbc.count DESC
+    LIMIT 5
+"""
+
+OVERDUE_SWEEP = """
+    UPDATE transactions SET status = 'Overdue'
+    WHERE rowid IN (
+        SELECT rowid FROM transactions
+        WHERE status = 'Issued' AND due_date < %s
+        LIMIT %s
+    )
+"""
+
+EXPIRED_PREORDERS = """
+    SELECT preorder_id, book_id FROM preorders
+    WHERE released_at IS NULL AND expiry_time <= %s
+    ORDER BY expiry_time
+    LIMIT %s
+"""
+
+SESSION_BY_TOKEN = """
+    SELECT s.session_id, s.family_id, s.expires_at, s.revoked_at,
+           u.id, u.name, u.email, u.role
+    FROM sessions s
+    JOIN users u ON u.id = s.user_id
+    WHERE s.token_hash = %s
+"""
+
+SESSION_SWEEP = """
+    DELETE FROM sessions
+    WHERE rowid IN (
+        SELECT rowid FROM sessions WHERE expires_at < %s LIMIT %s
+    )
+"""
+
+LOGIN_USER = "SELECT * FROM users WHERE email = %s AND role = %s"
+
+def book_joins(fields):
+    """Subjects and courses are only joined when their names are requested"""
+    if 'subject_name' in fields or 'course_name' in fields:
+        return """
+            LEFT JOIN subjects s ON b.subject_id = s.subject_id
+            LEFT JOIN courses c ON s.course_id = c.course_id
+        """
+    return ""
+
+def book_filters(subject_id=None, status=None):
+    """
+    Builds the subject/status filters shared by the listing and search
+
+    Returns:
+        tuple: (SQL fragment, parameters)
+    """
+    clause = ''
+    params = []
+    if subject_id:
+        clause += " AND b.subject_id = %s"
+        params.append(subject_id)
+    if status:
+        clause += " AND b.status = %s"
+        params.append(status)
+    return clause, params
+
+def book_list_query(fields, limit, subject_id=None, status=None, search=None, after=None):
+    """
+    Builds one page of the books listing, keyset on book_id
+
+    Args:
+        fields (list): Field names from BOOK_FIELDS
+        limit (int): Rows to fetch
+        subject_id (str): Optional subject filter
+        status (str): Optional status filter
+        search (str): Optional text matched with LIKE against title and author
+        after (str): book_id of the last row of the previous page
+
+    Returns:
+        tuple: (SQL, parameters)
+    """
+    filters, params = book_filters(subject_id, status)
+    query = f"""
+        SELECT {select_clause(fields, BOOK_FIELDS)}
+        FROM books b
+        {book_joins(fields)}
+        WHERE 1=1
+    """ + filters
+
+    if search:
+        query += " AND (b.title LIKE %s OR b.author LIKE %s)"
+        search_term = f"%{search}%"
+        params.extend([search_term, search_term])
+
+    if after:
+        query += " AND b.book_id > %s"
+        params.append(after)
+
+    query += " ORDER BY b.book_id LIMIT %s"
+    params.append(limit)
+    return query, params
+
+def transaction_filters(user_id=None, book_id=None, status=None, start_date=None, end_date=None):
+    """
+    Builds the filters shared by the transactions listing and export
+
+    start_date/end_date (YYYY-MM-DD, inclusive) become a half-open range
+    on the bare issue_date column, so the (issue_date) and
+    (user_id, issue_date) indexes can serve it.
+
+    Returns:
+        tuple: (SQL fragment, parameters)
+
+    Raises:
+        ValueError: If a date is not YYYY-MM-DD
+    """
+    clause = ''
+    params = []
+    if user_id:
+        clause += " AND t.user_id = %s"
+        params.append(user_id)
+    if book_id:
+        clause += " AND t.book_id = %s"
+        params.append(book_id)
+    if status:
+        clause += " AND t.status = %s"
+        params.append(status)
+    try:
+        if start_date:
+            clause += " AND t.issue_date >= %s"
+            params.append(datetime.strptime(start_date, '%Y-%m-%d'))
+        if end_date:
+            clause += " AND t.issue_date < %s"
+            params.append(datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1))
+    except ValueError:
+        raise ValueError('start_date and end_date must be YYYY-MM-DD')
+    return clause, params
+
+def transaction_list_query(fields, limit, after=None, **filters):
+    """
+    Builds one page of the transactions listing, newest first
+
+    Args:
+        fields (list): Field names from TRANSACTION_FIELDS
+        limit (int): Rows to fetch
+        after (tuple): (issue_date, allotment_id) of the last row of the previous page
+        **filters: Passed to transaction_filters
+
+    Returns:
+        tuple: (SQL, parameters)
+
+    Raises:
+        ValueError: If a date filter is not YYYY-MM-DD
+    """
+    clause, params = transaction_filters(**filters)
+    query = f"""
+        SELECT {select_clause(fields, TRANSACTION_FIELDS)}
+        FROM transactions t
+        JOIN books b ON t.book_id = b.book_id
+        JOIN users u ON t.user_id = u.id
+        WHERE 1=1
+    """ + clause
+
+    if after:
+        # Row-value comparison, so the planner range-searches (issue_date, allotment_id)
+        query += " AND (t.issue_date, t.allotment_id) < (%s, %s)"
+        params.extend(after)
+
+    query += " ORDER BY t.issue_date DESC, t.allotment_id DESC LIMIT %s"
+    params.append(limit)
+    return query, params
+
+def transaction_export_query(**filters):
+    """
+    Builds the export query, newest first
+
+    Returns:
+        tuple: (SQL, parameters)
+
+    Raises:
+        ValueError: If a date filter is not YYYY-MM-DD
+    """
+    clause, params = transaction_filters(**filters)
+    query = """
+        SELECT
+            t.allotment_id,
+            b.title as book_title,
+            b.barcode as book_barcode,
+            u.name as user_name,
+            u.email as user_email,
+            t.status,
+            t.issue_date,
+            t.return_date
+        FROM transactions t
+        JOIN books b ON t.book_id = b.book_id
+        JOIN users u ON t.user_id = u.id
+        WHERE 1=1
+    """ + clause + " ORDER BY t.issue_date DESC"
+    return query, params
+
+def course_list_query(stream_id=None):
+    """
+    Builds the courses listing with an optional stream filter
+
+    Returns:
+        tuple: (SQL, parameters or None)
+    """
+    query = """
+        SELECT c.*, s.name as stream_name
+        FROM courses c
+        JOIN streams s ON c.stream_id = s.stream_id
+    """
+    params = None
+    if stream_id:
+        query += " WHERE c.stream_id = %s"
+        params = (stream_id,)
+    query += " ORDER BY s.name, c.name"
+    return query, params
+
+def subject_list_query(course_id=None, semester=None):
+    """
+    Builds the subjects listing with optional course and semester filters
+
+    Returns:
+        tuple: (SQL, parameters or None)
+    """
+    query = """
+        SELECT s.*, c.name as course_name, st.name as stream_name
+        FROM subjects s
+        JOIN courses c ON s.course_id = c.course_id
+        JOIN streams st ON c.stream_id = st.stream_id
+        WHERE 1=1
+    """
+    params = []
+    if course_id:
+        query += " AND s.course_id = %s"
+        params.append(course_id)
+    if semester:
+        query += " AND s.semester = %s"
+        params.append(semester)
+    query += " ORDER BY st.name, c.name, s.semester, s.name"
+    return query, tuple(params) if params else None
@@ -0,0 +1,330 @@
+"""
+Background job helpers for periodic maintenance work
+"""
+import heapq
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from .db_helper import execute_query, run_transaction
+from .query_helper import OVERDUE_SWEEP, EXPIRED_PREORDERS
+from .session_helper import sweep_expired_sessions
+from ..config import (
+    OVERDUE_SWEEP_INTERVAL, OVERDUE_SWEEP_BATCH_SIZE, PREORDER_RELEASE_BATCH_SIZE,
+    SCHEDULER_LEASE_TTL, SCHEDULER_LEASE_RENEW_INTERVAL, SESSION_SWEEP_INTERVAL
+)
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class LeaderLease:
+    """
+    Time-limited leadership lease stored in the scheduler_leases table
+    
+    Every worker runs the background threads, but only the lease holder
+    does the work. The holder renews the lease on each acquire(); if it
+    dies, another worker takes over once the lease expires.
+    
+    Args:
+        name (str): Lease row name
+        ttl (float): Seconds the lease stays valid without renewal
+    """
+
+    def __init__(self, name, ttl=SCHEDULER_LEASE_TTL):
+        self.name = name
+        self.ttl = ttl
+        self._owner = None
+        self._pid = None
+
+    @property
+    def owner(self):
+        """Identity of this worker, regenerated after a fork"""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._owner = f"{socket.gethostname()}:{self._pid}:{uuid.uuid4().hex[:8]}"
+        return self._owner
+
+    def acquire(self):
+        """
+        Takes or renews the lease
+        
+        Returns:
+            bool: True if this worker holds the lease
+        """
+        owner = self.owner
+        now = time.time()
+        
+        def claim(transaction):
+            transaction.execute(
+                """
+                INSERT INTO scheduler_leases (name, owner, expires_at) VALUES (%s, %s, %s)
+                ON CONFLICT(name) DO UPDATE
+                SET owner = excluded.owner, expires_at = excluded.expires_at
+                WHERE scheduler_leases.owner = excluded.owner
+                OR scheduler_leases.expires_at < %s
+                """,
+                (self.name, owner, now + self.ttl, now)
+            )
+            row = transaction.execute(
+                "SELECT owner FROM scheduler_leases WHERE name = %s",
+                (self.name,)
+            ).fetchone()
+            return row is not None and row['owner'] == owner
+            
+        return run_transaction(claim)
+
+    def release(self):
+        """Gives up the lease if this worker holds it"""
+        execute_query(
+            "DELETE FROM scheduler_leases WHERE name = %s AND owner = %s",
+            (self.name, self.owner),
+            fetch=False
+        )
+
+# One lease for all jobs, so a single worker runs the schedule
+scheduler_lease = LeaderLease('scheduler')
+
+class PeriodicJob:
+    """
+    Runs a function every interval seconds on a daemon thread
+    
+    Errors are logged and the job keeps its schedule. The thread belongs
+    to the process that started it; start() in a forked worker starts a
+    fresh one.
+    
+    Args:
+        name (str): Thread name, used in logs
+        interval (float): Seconds between runs
+        func (callable): Work to run, takes no arguments
+        lease (LeaderLease): Only run while this worker holds the lease
+    """
+
+    def __init__(self, name, interval, func, lease=None):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.lease = lease
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        """Starts the job thread if it is not running in this process"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        self._stop = threading.Event()
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the job thread after the current run"""
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if self.lease is None or self.lease.acquire():
+                    self.func()
+            except Exception as e:
+                logger.error(f"Error running job {self.name}: {e}")
+
+def sweep_overdue_transactions(batch_size=OVERDUE_SWEEP_BATCH_SIZE):
+    """
+    Marks issued transactions past their due date as Overdue
+    
+    Works in batches of batch_size rows, one short write transaction
+    each, so checkouts queued behind the sweep are not held up.
+    
+    Returns:
+        int: Number of transactions marked Overdue
+    """
+    now = datetime.now()
+    total = 0
+    while True:
+        marked = run_transaction(lambda transaction: transaction.execute(
+            OVERDUE_SWEEP, (now, batch_size)
+        ).rowcount)
+        total += marked
+        if marked < batch_size:
+            break
+    if total:
+        logger.info(f"Marked {total} transactions overdue")
+    return total
+
+def release_expired_preorders(batch_size=PREORDER_RELEASE_BATCH_SIZE):
+    """
+    Returns books held by expired preorders to Available
+    
+    Each batch marks up to batch_size preorders released and frees their
+    books in one transaction.
+    
+    Returns:
+        int: Number of preorders released
+    """
+    now = datetime.now()
+    
+    def release(transaction):
+        expired = transaction.execute(EXPIRED_PREORDERS, (now, batch_size)).fetchall()
+        
+        transaction.executemany(
+            "UPDATE books SET status = 'Available' WHERE book_id = %s AND status = 'Preordered'",
+            [(row['book_id'],) for row in expired]
+        )
+        transaction.executemany(
+            "UPDATE preorders SET released_at = %s WHERE preorder_id = %s",
+            [(now, row['preorder_id']) for row in expired]
+        )
+        return len(expired)
+        
+    total = 0
+    while True:
+        released = run_transaction(release)
+        total += released
+        if released < batch_size:
+            break
+    if total:
+        logger.info(f"Released {total} expired preorders")
+    return total
+
+class PreorderExpiryScheduler:
+    """
+    Releases expired preorders at their deadlines
+    
+    Deadlines are kept in a min-heap, so the thread sleeps until exactly
+    the next expiry. The leader rebuilds the heap from the index on
+    preorders(expiry_time) when it starts and on every lease renewal,
+    which also picks up preorders taken in other workers. Preorders made
+    in the leader are pushed with schedule() right away; other workers
+    leave them to the leader's next rebuild.
+    
+    Args:
+        lease (LeaderLease): Lease that decides which worker releases
+        resync_interval (float): Seconds between lease renewals and heap rebuilds
+    """
+
+    def __init__(self, lease, resync_interval=SCHEDULER_LEASE_RENEW_INTERVAL):
+        self.lease = lease
+        self.resync_interval = resync_interval
+        self._heap = []
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._is_leader = False
+        self._thread = None
+        self._pid = None
+
+    def _running(self):
+        """True if the scheduler thread was started by this process and is alive"""
+        return self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    def start(self):
+        """Starts the scheduler thread if it is not running in this process"""
+        if self._running():
+            return
+        self._stopping = False
+        self._is_leader = False
+        self._heap = []
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='preorder-expiry', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the scheduler thread"""
+        with self._condition:
+            self._stopping = True
+            self._is_leader = False
+            self._condition.notify()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join()
+        self._thread = None
+
+    def schedule(self, preorder_id, expiry_time):
+        """
+        Adds a preorder deadline to the heap
+        
+        Only the lease holder with a running scheduler thread keeps a
+        heap; anywhere else the push would never be popped, so it is
+        skipped and the leader picks the preorder up on its next rebuild.
+        
+        Args:
+            preorder_id (str): Preorder to release
+            expiry_time (datetime): When it expires
+        """
+        if not self._running():
+            return
+        with self._condition:
+            if not self._is_leader:
+                return
+            heapq.heappush(self._heap, (expiry_time, preorder_id))
+            self._condition.notify()
+
+    def _load(self):
+        rows = execute_query(
+            """
+            SELECT preorder_id, expiry_time FROM preorders
+            WHERE released_at IS NULL
+            ORDER BY expiry_time
+            """,
+            row_mode='record'
+        )
+        # Rows arrive in deadline order, which is already a valid heap
+        heap = [(datetime.fromisoformat(str(row.expiry_time)), row.preorder_id) for row in rows]
+        with self._condition:
+            self._heap = heap
+
+    def _run(self):
+        is_leader = False
+        next_sync = 0.0
+        while not self._stopping:
+            try:
+                if time.monotonic() >= next_sync:
+                    is_leader = self.lease.acquire()
+                    if is_leader:
+                        self._load()
+                    next_sync = time.monotonic() + self.resync_interval
+                    
+                with self._condition:
+                    self._is_leader = is_leader
+                    if not is_leader:
+                        self._heap = []
+                    due = False
+                    while self._heap and self._heap[0][0] <= datetime.now():
+                        heapq.heappop(self._heap)
+                        due = True
+                        
+                if due:
+                    release_expired_preorders()
+                    continue
+                    
+                with self._condition:
+                    timeout = next_sync - time.monotonic()
+                    if self._heap:
+                        until_expiry = (self._heap[0][0] - datetime.now()).total_seconds()
+                        timeout = min(timeout, until_expiry)
+                    if not self._stopping and timeout > 0:
+                        self._condition.wait(timeout)
+            except Exception as e:
+                logger.error(f"Error in preorder expiry scheduler: {e}")
+                with self._condition:
+                    self._condition.wait(self.resync_interval)
+
+overdue_sweeper = PeriodicJob(
+    'overdue-sweeper', OVERDUE_SWEEP_INTERVAL, sweep_overdue_transactions, lease=scheduler_lease
+)
+preorder_scheduler = PreorderExpiryScheduler(scheduler_lease)
+session_sweeper = PeriodicJob(
+    'session-sweeper', SESSION_SWEEP_INTERVAL, sweep_expired_sessions, lease=scheduler_lease
+)
+
+def start_background_jobs():
+    """Starts every background job in the current worker process"""
+    overdue_sweeper.start()
+    preorder_scheduler.start()
+    session_sweeper.start()
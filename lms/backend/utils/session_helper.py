@@ -0,0 +1,148 @@
+"""
+Refresh token sessions for VREC Library Management System
+
+Refresh tokens are opaque random strings. Only their HMAC-SHA256 under
+JWT_SECRET_KEY is stored, so a leaked sessions table cannot be replayed.
+Each refresh rotates the token: the presented session is revoked and a new
+one is issued in the same family. Presenting an already rotated token means
+it was stolen or replayed, and revokes the whole family.
+"""
+import hashlib
+import hmac
+import secrets
+import uuid
+from datetime import datetime
+from .db_helper import format_timestamp, run_transaction
+from .query_helper import SESSION_BY_TOKEN, SESSION_SWEEP
+from ..config import JWT_SECRET_KEY, JWT_REFRESH_TOKEN_EXPIRES, SESSION_SWEEP_BATCH_SIZE
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _token_hash(refresh_token):
+    return hmac.new(
+        JWT_SECRET_KEY.encode('utf-8'), refresh_token.encode('utf-8'), hashlib.sha256
+    ).hexdigest()
+
+def _insert_session(transaction, user_id, family_id, now):
+    refresh_token = secrets.token_urlsafe(32)
+    session_id = str(uuid.uuid4())
+    transaction.execute(
+        """
+        INSERT INTO sessions (session_id, user_id, family_id, token_hash, created_at, expires_at)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        """,
+        (session_id, user_id, family_id, _token_hash(refresh_token), now, now + JWT_REFRESH_TOKEN_EXPIRES)
+    )
+    return session_id, refresh_token
+
+def create_session(user_id):
+    """
+    Starts a new session family for a user who just logged in
+
+    Args:
+        user_id (str): ID of the authenticated user
+
+    Returns:
+        str: Refresh token to hand to the client
+    """
+    now = datetime.now()
+    family_id = str(uuid.uuid4())
+    _, refresh_token = run_transaction(
+        lambda transaction: _insert_session(transaction, user_id, family_id, now)
+    )
+    return refresh_token
+
+def rotate_session(refresh_token):
+    """
+    Exchanges a refresh token for a new one
+
+    Args:
+        refresh_token (str): Token presented by the client
+
+    Returns:
+        tuple: (user, new_refresh_token) with user holding id, name, email
+        and role, or None if the token is unknown, expired or revoked
+    """
+    token_hash = _token_hash(refresh_token)
+    now = datetime.now()
+
+    def work(transaction):
+        session = transaction.execute(SESSION_BY_TOKEN, (token_hash,)).fetchone()
+
+        if not session:
+            return None
+
+        if session['revoked_at'] is not None:
+            # A rotated token came back: treat the whole family as compromised
+            transaction.execute(
+                "UPDATE sessions SET revoked_at = %s WHERE family_id = %s AND revoked_at IS NULL",
+                (now, session['family_id'])
+            )
+            logger.warning(f"Refresh token reuse detected for user {session['id']}")
+            return None
+
+        # expires_at is stored as TIMESTAMP_FORMAT text; compare it in the same format
+        if session['expires_at'] <= format_timestamp(now):
+            return None
+
+        session_id, new_token = _insert_session(transaction, session['id'], session['family_id'], now)
+        transaction.execute(
+            "UPDATE sessions SET revoked_at = %s, replaced_by = %s WHERE session_id = %s",
+            (now, session_id, session['session_id'])
+        )
+        user = {key: session[key] for key in ('id', 'name', 'email', 'role')}
+        return user, new_token
+
+    return run_transaction(work)
+
+def revoke_session(refresh_token):
+    """
+    Revokes the session family a refresh token belongs to (logout)
+
+    Returns:
+        int: Number of sessions revoked
+    """
+    return run_transaction(lambda transaction: transaction.execute(
+        """
+        UPDATE sessions SET revoked_at = %s
+        WHERE revoked_at IS NULL AND family_id = (
+            SELECT family_id FROM sessions WHERE token_hash = %s
+        )
+        """,
+        (datetime.now(), _token_hash(refresh_token))
+    ).rowcount)
+
+def revoke_user_sessions(user_id):
+    """
+    Revokes every session of a user (logout everywhere)
+
+    Returns:
+        int: Number of sessions revoked
+    """
+    return run_transaction(lambda transaction: transaction.execute(
+        "UPDATE sessions SET revoked_at = %s WHERE user_id = %s AND revoked_at IS NULL",
+        (datetime.now(), user_id)
+    ).rowcount)
+
+def sweep_expired_sessions(batch_size=SESSION_SWEEP_BATCH_SIZE):
+    """
+    Deletes sessions past their expiry in batches of batch_size rows
+
+    Returns:
+        int: Number of sessions deleted
+    """
+    now = datetime.now()
+    total = 0
+    while True:
+        deleted = run_transaction(lambda transaction: transaction.execute(
+            SESSION_SWEEP, (now, batch_size)
+        ).rowcount)
+        total += deleted
+        if deleted < batch_size:
+            break
+    if total:
+        logger.info(f"Deleted {total} expired sessions")
+    return total
@@ -0,0 +1,156 @@
+"""
+Slow-query log for database calls made through db_helper
+
+Calls slower than SLOW_QUERY_THRESHOLD_MS are sampled at
+SLOW_QUERY_SAMPLE_RATE and written as JSON lines: normalized SQL,
+parameter types (never values), duration, rows returned and the
+EXPLAIN QUERY PLAN output. Each worker writes its own rotating file, so
+workers never rotate a file another one is appending to.
+"""
+import glob
+import json
+import logging
+import os
+import random
+import threading
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from ..config import (
+    SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_SAMPLE_RATE, SLOW_QUERY_LOG_DIR,
+    SLOW_QUERY_LOG_MAX_BYTES, SLOW_QUERY_LOG_BACKUPS
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def param_shape(params):
+    """Describes query parameters by type only, so no values reach the log"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+class SlowQueryLog:
+    """
+    Samples slow database calls into a per-process rotating JSONL file
+
+    Args:
+        explain (callable): explain(query, params) -> list of plan lines
+        threshold_ms (float): Calls at or above this duration are candidates (None disables)
+        sample_rate (float): Fraction of candidates written
+        directory (str): Directory holding the log files
+    """
+
+    def __init__(self, explain, threshold_ms=SLOW_QUERY_THRESHOLD_MS,
+                 sample_rate=SLOW_QUERY_SAMPLE_RATE, directory=SLOW_QUERY_LOG_DIR,
+                 max_bytes=SLOW_QUERY_LOG_MAX_BYTES, backups=SLOW_QUERY_LOG_BACKUPS):
+        self.explain = explain
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+        self._handler = None
+        self._pid = None
+
+    def _get_handler(self):
+        with self._lock:
+            if self._handler is None or self._pid != os.getpid():
+                os.makedirs(self.directory, exist_ok=True)
+                self._pid = os.getpid()
+                self._handler = RotatingFileHandler(
+                    os.path.join(self.directory, f'slow_queries-{self._pid}.jsonl'),
+                    maxBytes=self.max_bytes,
+                    backupCount=self.backups,
+                    encoding='utf-8'
+                )
+                self._handler.setFormatter(logging.Formatter('%(message)s'))
+            return self._handler
+
+    def observe(self, query, normalized, fingerprint, params, seconds, rows=None, explain=True):
+        """
+        Logs a database call if it is slow and selected by sampling
+
+        Args:
+            query (str): SQL as passed to db_helper
+            normalized (str): Normalized SQL
+            fingerprint (str): Statement fingerprint
+            params: Parameters the call ran with, used for EXPLAIN only
+            seconds (float): Duration of the call
+            rows (int): Rows returned, None for writes
+            explain (bool): Whether the call is a single statement EXPLAIN can plan
+        """
+        duration_ms = seconds * 1000
+        if self.threshold_ms is None or duration_ms < self.threshold_ms:
+            return
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+
+        plan = None
+        if explain:
+            try:
+                plan = self.explain(query, params)
+            except Exception as e:
+                plan = [f'EXPLAIN failed: {e}']
+
+        entry = {
+            'time': datetime.now().isoformat(timespec='milliseconds'),
+            'fingerprint': fingerprint,
+            'sql': normalized,
+            'params': param_shape(params),
+            'duration_ms': round(duration_ms, 3),
+            'rows': rows,
+            'plan': plan,
+        }
+        record = logging.LogRecord(__name__, logging.WARNING, __file__, 0, json.dumps(entry), None, None)
+        try:
+            self._get_handler().handle(record)
+        except Exception as e:
+            logger.error(f"Error writing slow query log: {e}")
+
+def slow_query_report(directory=SLOW_QUERY_LOG_DIR, top=20, order_by='total_ms'):
+    """
+    Aggregates every worker's slow-query log by statement fingerprint
+
+    Args:
+        directory (str): Directory holding the log files
+        top (int): Number of statements to return
+        order_by (str): 'total_ms', 'count', 'max_ms' or 'mean_ms'
+
+    Returns:
+        list: One dict per statement, worst first
+    """
+    statements = {}
+    for path in glob.glob(os.path.join(directory, 'slow_queries-*.jsonl*')):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                stats = statements.setdefault(entry['fingerprint'], {
+                    'fingerprint': entry['fingerprint'],
+                    'sql': entry['sql'],
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'rows': 0,
+                    'plan': entry['plan'],
+                    'last_seen': entry['time'],
+                })
+                stats['count'] += 1
+                stats['total_ms'] += entry['duration_ms']
+                stats['rows'] += entry['rows'] or 0
+                if entry['duration_ms'] >= stats['max_ms']:
+                    stats['max_ms'] = entry['duration_ms']
+                if entry['time'] >= stats['last_seen']:
+                    stats['last_seen'] = entry['time']
+                    stats['plan'] = entry['plan']
+
+    for stats in statements.values():
+        stats['mean_ms'] = stats['total_ms'] / stats['count']
+        stats['mean_rows'] = stats.pop('rows') / stats['count']
+    return sorted(statements.values(), key=lambda stats: stats[order_by], reverse=True)[:top]
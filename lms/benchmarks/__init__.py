@@ -0,0 +1,3 @@
+"""
+Benchmarks for VREC Library Management System
+"""
@@ -0,0 +1,94 @@
+"""
+Benchmark GET /api/academic/hierarchy as the catalog grows
+
+Builds streams x courses x subjects at several scales and reports the
+latency and number of SQL statements per request, which should stay
+constant as the hierarchy grows.
+
+Usage (from the lms directory):
+    python -m benchmarks.bench_academic_hierarchy --scales 2x4x8 10x10x20 20x20x40
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from flask import Flask
+
+from backend.routes import academic
+from backend.utils import db_helper
+from backend.utils.jwt_helper import generate_token
+
+class QueryCounter:
+    """Wraps execute_query to count the statements a route issues"""
+
+    def __init__(self, execute_query):
+        self.execute_query = execute_query
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+        return self.execute_query(*args, **kwargs)
+
+def seed_hierarchy(streams, courses, subjects):
+    """Replaces the academic tables with a generated hierarchy"""
+    for table in ('subjects', 'courses', 'streams'):
+        db_helper.execute_query(f"DELETE FROM {table}", fetch=False)
+    db_helper.execute_many(
+        "INSERT INTO streams (stream_id, name) VALUES (%s, %s)",
+        [(f's{i}', f'Stream {i}') for i in range(streams)]
+    )
+    db_helper.execute_many(
+        "INSERT INTO courses (course_id, name, stream_id, semesters) VALUES (%s, %s, %s, %s)",
+        [(f's{i}c{j}', f'Course {j}', f's{i}', 8) for i in range(streams) for j in range(courses)]
+    )
+    db_helper.execute_many(
+        "INSERT INTO subjects (subject_id, name, course_id, semester) VALUES (%s, %s, %s, %s)",
+        [
+            (f's{i}c{j}x{k}', f'Subject {k}', f's{i}c{j}', k % 8 + 1)
+            for i in range(streams) for j in range(courses) for k in range(subjects)
+        ]
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--scales', nargs='+', default=['2x4x8', '10x10x20', '20x20x40'],
+                        help='streams x courses per stream x subjects per course')
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+
+    counter = QueryCounter(academic.execute_query)
+    academic.execute_query = counter
+    # Measure the query path rather than the response cache
+    academic.academic_cache.max_entries = 0
+
+    app = Flask(__name__)
+    app.register_blueprint(academic.academic_bp, url_prefix='/api/academic')
+    client = app.test_client()
+    token = generate_token({'id': 'admin-001', 'role': 'admin'})
+    headers = {'Authorization': f'Bearer {token}'}
+
+    print(f"{'scale':>12} {'subjects':>9} {'ms/request':>11} {'queries':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_helper.DATABASE_PATH = os.path.join(tmp, 'bench.db')
+        db_helper.init_db()
+
+        for scale in args.scales:
+            streams, courses, subjects = (int(n) for n in scale.split('x'))
+            seed_hierarchy(streams, courses, subjects)
+
+            counter.count = 0
+            start = time.perf_counter()
+            for _ in range(args.requests):
+                response = client.get('/api/academic/hierarchy', headers=headers)
+                assert response.status_code == 200, response.get_data(as_text=True)
+            elapsed = (time.perf_counter() - start) / args.requests * 1000
+
+            total = streams * courses * subjects
+            print(f"{scale:>12} {total:9d} {elapsed:11.2f} {counter.count / args.requests:8.1f}")
+
+        db_helper.writer_queue.stop()
+        db_helper.connection_pool.close_all()
+
+if __name__ == '__main__':
+    main()
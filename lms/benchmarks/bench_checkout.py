@@ -0,0 +1,137 @@
+"""
+Benchmark checkout throughput and check for double issues
+
+Compares the old read-then-write checkout (SELECT, UPDATE and INSERT,
+each committed separately) with the single run_transaction unit of work
+used by allot_book, then has several processes race to issue the same
+copies and verifies each copy was issued exactly once.
+
+Usage (from the lms directory):
+    python -m benchmarks.bench_checkout --checkouts 2000 --synchronous FULL
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from backend.utils import db_helper
+from benchmarks.bench_helper import seed_database
+
+INSERT_TRANSACTION = """
+    INSERT INTO transactions (allotment_id, book_id, user_id, status, issue_date)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+def legacy_checkout(book_id):
+    """The pre-unit-of-work allot_book: three round trips, two commits"""
+    books = db_helper.execute_query("SELECT status FROM books WHERE book_id = %s", (book_id,))
+    if books[0]['status'] != 'Available':
+        return False
+    db_helper.execute_query(
+        "UPDATE books SET status = %s WHERE book_id = %s", ('Issued', book_id), fetch=False
+    )
+    db_helper.execute_query(
+        INSERT_TRANSACTION,
+        (str(uuid.uuid4()), book_id, 'user-bench', 'Issued', datetime.now()),
+        fetch=False
+    )
+    return True
+
+def atomic_checkout(book_id):
+    """The allot_book unit of work: conditional update and insert, one commit"""
+    def issue(transaction):
+        updated = transaction.execute(
+            "UPDATE books SET status = %s WHERE book_id = %s AND status = %s",
+            ('Issued', book_id, 'Available')
+        ).rowcount
+        if not updated:
+            return False
+        transaction.execute(
+            INSERT_TRANSACTION,
+            (str(uuid.uuid4()), book_id, 'user-bench', 'Issued', datetime.now())
+        )
+        return True
+
+    return db_helper.run_transaction(issue)
+
+def reset_books():
+    db_helper.execute_query("UPDATE books SET status = 'Available'", fetch=False)
+    db_helper.execute_query("DELETE FROM transactions", fetch=False)
+
+def throughput(checkout, count):
+    start = time.perf_counter()
+    for i in range(count):
+        assert checkout(f'book-{i}')
+    return count / (time.perf_counter() - start)
+
+def racer(database_path, checkout_name, book_count, start_at, results):
+    """Tries to issue every copy; returns how many attempts succeeded"""
+    db_helper.DATABASE_PATH = database_path
+    checkout = globals()[checkout_name]
+    while time.time() < start_at:
+        time.sleep(0.001)
+    wins = 0
+    for i in range(book_count):
+        try:
+            wins += bool(checkout(f'book-{i}'))
+        except Exception:
+            pass
+    results.put(wins)
+
+def race(checkout_name, processes, book_count):
+    """Returns the number of copies that ended up with more than one issue"""
+    reset_books()
+    results = multiprocessing.Queue()
+    start_at = time.time() + 0.5
+    workers = [
+        multiprocessing.Process(
+            target=racer,
+            args=(db_helper.DATABASE_PATH, checkout_name, book_count, start_at, results)
+        )
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for _ in workers:
+        results.get()
+    for worker in workers:
+        worker.join()
+    rows = db_helper.execute_query(
+        "SELECT COUNT(*) as doubles FROM "
+        "(SELECT book_id FROM transactions GROUP BY book_id HAVING COUNT(*) > 1)"
+    )
+    return rows[0]['doubles']
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--checkouts', type=int, default=2000)
+    parser.add_argument('--racers', type=int, default=4)
+    parser.add_argument('--race-books', type=int, default=200)
+    parser.add_argument('--synchronous', default=db_helper.DB_SYNCHRONOUS)
+    args = parser.parse_args()
+
+    db_helper.DB_SYNCHRONOUS = args.synchronous
+    with tempfile.TemporaryDirectory() as tmp:
+        db_helper.DATABASE_PATH = os.path.join(tmp, 'bench.db')
+        seed_database(max(args.checkouts, args.race_books))
+
+        print(f"synchronous={args.synchronous}")
+        rates = {}
+        for name, checkout in (('legacy', legacy_checkout), ('atomic', atomic_checkout)):
+            reset_books()
+            rates[name] = throughput(checkout, args.checkouts)
+            print(f"{name:>8}: {rates[name]:8.1f} checkouts/s")
+        print(f" speedup: {rates['atomic'] / rates['legacy']:8.2f}x")
+
+        for name in ('legacy_checkout', 'atomic_checkout'):
+            doubles = race(name, args.racers, args.race_books)
+            print(f"{name:>16}: {doubles} of {args.race_books} copies double-issued")
+
+        db_helper.writer_queue.stop()
+        db_helper.connection_pool.close_all()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark GET /api/books/ with and without the connection pool
+
+Usage (from the lms directory):
+    python -m benchmarks.bench_connection_pool --books 2000 --requests 500
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from backend.utils import db_helper
+from backend.utils.jwt_helper import generate_token
+from benchmarks.bench_helper import create_app, seed_database
+
+def run(client, headers, request_count):
+    """Issues request_count list requests and returns requests per second"""
+    start = time.perf_counter()
+    for _ in range(request_count):
+        response = client.get('/api/books/?status=Available', headers=headers)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    return request_count / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--books', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--pool-size', type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_helper.DATABASE_PATH = os.path.join(tmp, 'bench.db')
+        seed_database(args.books)
+
+        client = create_app('books').test_client()
+        token = generate_token({'id': 'admin-001', 'role': 'admin'})
+        headers = {'Authorization': f'Bearer {token}'}
+
+        results = {}
+        for label, size in (('connect-per-query', 0), ('pooled', args.pool_size)):
+            db_helper.connection_pool.close_all()
+            db_helper.connection_pool.size = size
+            run(client, headers, min(50, args.requests))  # warm up
+            results[label] = run(client, headers, args.requests)
+        db_helper.connection_pool.close_all()
+
+    for label, rps in results.items():
+        print(f"{label:>18}: {rps:8.1f} req/s")
+    print(f"{'speedup':>18}: {results['pooled'] / results['connect-per-query']:8.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Compare DATE(issue_date) filters with half-open issue_date ranges
+
+Runs the get_transactions page query and the export query over 1, 7 and
+30 day windows ending at the newest transaction and half a year earlier,
+with and without a user filter, once with the old
+DATE(t.issue_date) predicates and once with the range predicates the
+routes use now. Prints the best time of --repeat runs and the plan of each.
+
+Usage (from the lms directory):
+    python -m benchmarks.datagen --db /tmp/lms.db --transactions 5000000
+    python -m benchmarks.bench_date_range --db /tmp/lms.db --repeat 5
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from backend.utils import db_helper
+from benchmarks import datagen
+
+SELECT = """
+    SELECT t.allotment_id, t.issue_date, t.status, b.title, u.name
+    FROM transactions t
+    JOIN books b ON t.book_id = b.book_id
+    JOIN users u ON t.user_id = u.id
+    WHERE 1=1
+"""
+
+PAGE = " ORDER BY t.issue_date DESC, t.allotment_id DESC LIMIT 51"
+EXPORT = " ORDER BY t.issue_date DESC"
+
+WINDOWS = [1, 7, 30]
+
+# Windows end this many days before the newest transaction
+AGES = [0, 180]
+
+def queries(user_id, start, end):
+    """(label, legacy SQL, legacy params, range SQL, range params) per case"""
+    legacy = " AND DATE(t.issue_date) >= %s AND DATE(t.issue_date) <= %s"
+    legacy_params = [start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')]
+    ranged = " AND t.issue_date >= %s AND t.issue_date < %s"
+    ranged_params = [start, end + timedelta(days=1)]
+    user = " AND t.user_id = %s"
+
+    return [
+        ('page', SELECT + legacy + PAGE, legacy_params, SELECT + ranged + PAGE, ranged_params),
+        ('page, user', SELECT + user + legacy + PAGE, [user_id] + legacy_params,
+         SELECT + user + ranged + PAGE, [user_id] + ranged_params),
+        ('export', SELECT + legacy + EXPORT, legacy_params, SELECT + ranged + EXPORT, ranged_params),
+        ('export, user', SELECT + user + legacy + EXPORT, [user_id] + legacy_params,
+         SELECT + user + ranged + EXPORT, [user_id] + ranged_params),
+    ]
+
+def best_time(query, params, repeat):
+    """Returns (best milliseconds, rows) over repeat runs"""
+    best = float('inf')
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(db_helper.execute_query(query, tuple(params), row_mode='tuple'))
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db', help='Database generated by benchmarks.datagen (default: a temporary one)')
+    parser.add_argument('--transactions', type=int, default=5000000, help='Rows to generate without --db')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.db:
+            db_helper.DATABASE_PATH = os.path.abspath(args.db)
+            db_helper.init_db()
+        else:
+            db_helper.DATABASE_PATH = os.path.join(tmp, 'bench.db')
+            print(f"Generating {args.transactions} transactions")
+            datagen.generate(users=50000, books=500000, transactions=args.transactions)
+
+        count, latest = db_helper.execute_query(
+            "SELECT COUNT(*), MAX(issue_date) FROM transactions", row_mode='tuple'
+        )[0]
+        # The busiest borrower, so the user filter still has rows to return
+        user_id = db_helper.execute_query(
+            "SELECT user_id FROM user_borrow_counts ORDER BY count DESC LIMIT 1", row_mode='tuple'
+        )[0][0]
+        end = datetime.fromisoformat(str(latest)).replace(hour=0, minute=0, second=0)
+        print(f"{count} transactions, latest {latest}, user {user_id}\n")
+
+        print(f"{'ending':>7}{'window':>7}  {'query':<14}{'rows':>8}{'DATE() ms':>12}{'range ms':>11}{'speedup':>9}")
+        plans = {}
+        for age in AGES:
+            window_end = end - timedelta(days=age)
+            for days in WINDOWS:
+                start = window_end - timedelta(days=days - 1)
+                for label, legacy, legacy_params, ranged, ranged_params in queries(user_id, start, window_end):
+                    legacy_ms, rows = best_time(legacy, legacy_params, args.repeat)
+                    ranged_ms, ranged_rows = best_time(ranged, ranged_params, args.repeat)
+                    assert rows == ranged_rows, f"{label}: {rows} != {ranged_rows} rows"
+                    print(f"{-age:>6}d{days:>6}d  {label:<14}{rows:>8}{legacy_ms:>12.2f}{ranged_ms:>11.2f}"
+                          f"{legacy_ms / ranged_ms:>8.1f}x")
+                    plans[label] = (db_helper.explain_query(legacy, legacy_params),
+                                    db_helper.explain_query(ranged, ranged_params))
+
+        for label, (legacy_plan, ranged_plan) in plans.items():
+            print(f"\n{label}\n  DATE(): {'; '.join(legacy_plan)}\n  range:  {'; '.join(ranged_plan)}")
+
+        db_helper.writer_queue.stop()
+        db_helper.connection_pool.close_all()
+
+if __name__ == '__main__':
+    main()
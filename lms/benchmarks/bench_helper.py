@@ -0,0 +1,65 @@
+"""
+Fixtures shared by the micro-benchmarks: a seeded scratch database,
+a minimal app and latency percentiles
+"""
+import importlib
+
+from backend.utils import db_helper
+
+# Borrower used by benchmarks that need one account
+BENCH_USER = ('user-bench', 'Bench Student', 'student', 'bench@vrec', 'x')
+
+# Subject every seeded book belongs to, under the course created by init_db
+BENCH_SUBJECT = ('subject-bench', 'Data Structures', 'course-001', 3)
+
+def seed_database(book_count, users=(BENCH_USER,)):
+    """
+    Initializes a fresh database with users and a catalog
+
+    Books are book-0 .. book-{book_count - 1}, all Available, with
+    barcodes BC00000000 upwards and fifty distinct authors.
+
+    Args:
+        book_count (int): Book copies to create
+        users (list): (id, name, role, email, password) rows to insert
+    """
+    db_helper.init_db()
+    db_helper.execute_many(
+        "INSERT OR IGNORE INTO users (id, name, role, email, password) VALUES (%s, %s, %s, %s, %s)",
+        list(users)
+    )
+    db_helper.execute_query(
+        "INSERT OR IGNORE INTO subjects (subject_id, name, course_id, semester) VALUES (%s, %s, %s, %s)",
+        BENCH_SUBJECT,
+        fetch=False
+    )
+    db_helper.execute_many(
+        "INSERT INTO books (book_id, subject_id, title, author, barcode) VALUES (%s, %s, %s, %s, %s)",
+        [
+            (f'book-{i}', BENCH_SUBJECT[0], f'Book {i}', f'Author {i % 50}', f'BC{i:08d}')
+            for i in range(book_count)
+        ]
+    )
+
+def create_app(*blueprints):
+    """
+    Builds a minimal app with only the named route modules registered
+
+    Args:
+        *blueprints (str): Modules under backend.routes, e.g. 'books';
+            each is mounted at /api/<name>
+    """
+    from flask import Flask
+
+    app = Flask(__name__)
+    for name in blueprints:
+        module = importlib.import_module(f'backend.routes.{name}')
+        app.register_blueprint(getattr(module, f'{name}_bp'), url_prefix=f'/api/{name}')
+    return app
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not samples:
+        return 0.0
+    index = max(0, min(len(samples) - 1, int(round(fraction * len(samples) + 0.5)) - 1))
+    return samples[index]
@@ -0,0 +1,94 @@
+"""
+Compare JSON serialization time for large transaction and book payloads
+
+Usage (from the lms directory):
+    python -m benchmarks.bench_json_encoder --rows 10000 --repeat 20
+"""
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from backend.utils import json_helper
+
+def transaction_rows(count):
+    """Builds rows shaped like get_transactions results"""
+    issued = datetime(2024, 1, 1, 9, 30)
+    return [
+        {
+            'allotment_id': str(uuid.uuid4()),
+            'book_id': str(uuid.uuid4()),
+            'user_id': f'student-{i % 500}',
+            'issue_date': issued + timedelta(minutes=i),
+            'due_date': issued + timedelta(days=14, minutes=i),
+            'return_date': None if i % 3 else issued + timedelta(days=7, minutes=i),
+            'status': ('Issued', 'Returned', 'Overdue')[i % 3],
+            'book_title': f'Introduction to Algorithms, volume {i % 7}',
+            'user_name': f'Student {i % 500}',
+        }
+        for i in range(count)
+    ]
+
+def book_rows(count):
+    """Builds rows shaped like get_books results"""
+    return [
+        {
+            'book_id': str(uuid.uuid4()),
+            'subject_id': f'subject-{i % 40}',
+            'title': f'Book {i}',
+            'author': f'Author {i % 50}',
+            'barcode': f'BC{i:08d}',
+            'status': 'Available',
+            'created_at': '2024-01-01 09:30:00',
+            'subject_name': 'Data Structures',
+            'course_name': 'B.Tech CSE',
+        }
+        for i in range(count)
+    ]
+
+def legacy_dumps(payload):
+    """The old path: isoformat every datetime, then Flask-style sorted stdlib dumps"""
+    for row in payload['rows']:
+        for key, value in row.items():
+            if isinstance(value, datetime):
+                row[key] = value.isoformat()
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'))
+
+def measure(dumps, make_payload, repeat):
+    """Returns the best wall time in ms over repeat runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        payload = make_payload()
+        start = time.perf_counter()
+        dumps(payload)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    encoders = {
+        'legacy (isoformat + stdlib)': legacy_dumps,
+        'stdlib': json_helper.select_backend('stdlib'),
+    }
+    if json_helper.orjson is not None:
+        encoders['orjson'] = json_helper.select_backend('orjson')
+    else:
+        print("orjson is not installed; only the stdlib backends are measured")
+
+    for label, make_rows in (('transactions', transaction_rows), ('books', book_rows)):
+        rows = make_rows(args.rows)
+        print(f"{args.rows} {label} rows")
+        baseline = None
+        for name, dumps in encoders.items():
+            # Each run gets fresh rows because the legacy path converts them in place
+            elapsed = measure(dumps, lambda: {'rows': [dict(row) for row in rows]}, args.repeat)
+            baseline = baseline or elapsed
+            print(f"  {name:>28}: {elapsed:8.2f} ms  ({baseline / elapsed:5.2f}x)")
+
+if __name__ == '__main__':
+    main()
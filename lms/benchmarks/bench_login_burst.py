@@ -0,0 +1,114 @@
+"""
+Measure GET /api/books/ latency while a burst of logins hashes passwords
+
+Usage (from the lms directory):
+    python -m benchmarks.bench_login_burst --logins 200 --login-threads 16
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from backend.utils import db_helper
+from backend.utils.jwt_helper import generate_token
+from backend.utils.password_helper import hash_password, password_pool
+from benchmarks.bench_helper import create_app, seed_database
+
+def login_burst(app, user_count, logins, threads, statuses):
+    """Fires logins from several threads; records response status codes"""
+    def worker(offset):
+        client = app.test_client()
+        for i in range(offset, logins, threads):
+            response = client.post('/api/auth/login', json={
+                'email': f'student{i % user_count}@vrec.edu',
+                'password': 'class-of-2025',
+                'role': 'student'
+            })
+            statuses.append(response.status_code)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    return workers
+
+def probe(app, headers, stop, interval=0.01):
+    """Times list requests until stop is set; returns latencies in ms"""
+    client = app.test_client()
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = client.get('/api/books/?limit=20', headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        time.sleep(interval)
+    return latencies
+
+def run(app, headers, args, burst):
+    """Probes latency for a fixed window, optionally during a login burst"""
+    statuses = []
+    stop = threading.Event()
+    result = {}
+    prober = threading.Thread(target=lambda: result.setdefault('latencies', probe(app, headers, stop)))
+    prober.start()
+
+    start = time.perf_counter()
+    if burst:
+        for thread in login_burst(app, args.users, args.logins, args.login_threads, statuses):
+            thread.join()
+    else:
+        time.sleep(args.baseline_seconds)
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    prober.join()
+    return result['latencies'], statuses, elapsed
+
+def summarize(label, latencies, statuses, elapsed):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    line = f"{label:>22}: p50 {statistics.median(latencies):7.1f} ms  p99 {p99:7.1f} ms"
+    if statuses:
+        ok = statuses.count(200)
+        shed = statuses.count(503)
+        line += f"  logins {ok} ok / {shed} shed in {elapsed:.1f}s"
+    print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--books', type=int, default=2000)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--login-threads', type=int, default=16)
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--baseline-seconds', type=float, default=3.0)
+    args = parser.parse_args()
+
+    workers = password_pool.workers
+    with tempfile.TemporaryDirectory() as tmp:
+        db_helper.DATABASE_PATH = os.path.join(tmp, 'bench.db')
+        hashed = hash_password('class-of-2025', args.rounds)
+        seed_database(args.books, users=[
+            (f'student-{i}', f'Student {i}', 'student', f'student{i}@vrec.edu', hashed)
+            for i in range(args.users)
+        ])
+
+        app = create_app('auth', 'books')
+        token = generate_token({'id': 'admin-001', 'role': 'admin'})
+        headers = {'Authorization': f'Bearer {token}'}
+
+        summarize('idle', *run(app, headers, args, burst=False))
+
+        password_pool.workers = 0
+        summarize('burst (inline hashing)', *run(app, headers, args, burst=True))
+
+        password_pool.workers = workers
+        summarize('burst (process pool)', *run(app, headers, args, burst=True))
+
+        password_pool.shutdown()
+        db_helper.writer_queue.stop()
+        db_helper.connection_pool.close_all()
+
+if __name__ == '__main__':
+    main()
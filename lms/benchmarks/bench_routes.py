@@ -0,0 +1,373 @@
+"""
+Drive every API route through the Flask test client and record a baseline
+
+Each scenario sends --iterations requests and records latency percentiles
+and database calls per request. A scenario that gets an unexpected status
+stops and is reported as failed, so an error path is never timed as the
+route. Results go to a JSON baseline; --compare prints the change against
+an earlier one.
+
+Without --db a small dataset is generated into a temporary directory. An
+existing --db must come from benchmarks.datagen, which creates the admin
+account and user ids the scenarios use. Write scenarios modify it.
+
+Usage (from the lms directory):
+    python -m benchmarks.bench_routes --iterations 200 --output baseline.json
+    python -m benchmarks.bench_routes --db /tmp/lms.db --compare baseline.json
+"""
+import argparse
+import gzip
+import io
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from backend.utils import db_helper
+from backend.utils.jwt_helper import generate_token
+from backend.utils.metrics_helper import metrics
+from backend.utils.pagination_helper import encode_cursor
+from backend.utils.session_helper import create_session
+from backend.utils.slow_query_helper import SlowQueryLog
+from benchmarks import datagen
+from benchmarks.bench_helper import percentile
+
+# Dataset generated when --db is not given
+SMALL_DATASET = {'users': 500, 'books': 5000, 'transactions': 50000}
+
+# Books per allot/batch and return/batch request
+BATCH_BOOKS = 10
+
+class Scenario:
+    """
+    One route exercised with a request built per iteration
+
+    Args:
+        name (str): Label in the report, '<blueprint>.<action>'
+        method (str): HTTP method
+        build (callable): build(i) -> (path, test client keyword arguments)
+        expect (int): Status a successful request returns
+    """
+
+    def __init__(self, name, method, build, expect=200):
+        self.name = name
+        self.method = method
+        self.build = build
+        self.expect = expect
+
+def load_fixtures(iterations):
+    """Ids the scenarios need, taken from the dataset"""
+    def column(query, params=()):
+        return [row[0] for row in db_helper.execute_query(query, params, row_mode='tuple')]
+
+    students = column("SELECT id FROM users WHERE role = 'student' ORDER BY id LIMIT 2")
+    if len(students) < 2 or not column("SELECT id FROM users WHERE id = %s", (datagen.ADMIN['id'],)):
+        raise SystemExit("The database was not generated by benchmarks.datagen")
+
+    # Allot, allot/batch and preorder each take books nobody has borrowed
+    needed = iterations * (BATCH_BOOKS + 2)
+    available = db_helper.execute_query(
+        "SELECT book_id, barcode FROM books WHERE status = 'Available' ORDER BY book_id LIMIT %s",
+        (needed,), row_mode='tuple'
+    )
+    if len(available) < needed:
+        raise SystemExit(f"Need {needed} available books, the database has {len(available)}")
+
+    # Cursors to later pages, one per iteration, each a page deeper than the last
+    transaction_keys = db_helper.execute_query(
+        "SELECT issue_date, allotment_id FROM transactions ORDER BY issue_date DESC, allotment_id DESC LIMIT %s",
+        (iterations * 50,), row_mode='tuple'
+    )
+    book_keys = column("SELECT book_id FROM books ORDER BY book_id LIMIT %s", (iterations * 50,))
+
+    latest = column("SELECT MAX(issue_date) FROM transactions")[0]
+    return {
+        'transaction_cursors': [encode_cursor(list(key)) for key in transaction_keys[49::50]],
+        'book_cursors': [encode_cursor([key]) for key in book_keys[49::50]],
+        'student': students[0],
+        'borrower': students[1],
+        'books': column("SELECT book_id FROM books ORDER BY book_id LIMIT %s", (iterations,)),
+        'barcodes': column("SELECT barcode FROM books ORDER BY book_id LIMIT %s", (iterations * 50,)),
+        'available': available,
+        'subjects': column("SELECT subject_id FROM subjects ORDER BY subject_id"),
+        'courses': column("SELECT course_id FROM courses ORDER BY course_id"),
+        'streams': column("SELECT stream_id FROM streams ORDER BY stream_id"),
+        'latest': datetime.fromisoformat(str(latest)) if latest else datetime.now(),
+    }
+
+def build_scenarios(fixtures, iterations, admin, student):
+    """Every route in the auth, books, transactions and academic blueprints"""
+    admin_headers = {'Authorization': f'Bearer {admin}'}
+    student_headers = {'Authorization': f'Bearer {student}'}
+    run_id = f'{os.getpid()}-{int(time.time())}'
+
+    books = fixtures['books']
+    barcodes = fixtures['barcodes']
+    subjects = fixtures['subjects']
+    available = fixtures['available']
+    allot = available[:iterations]
+    preorder = available[iterations:iterations * 2]
+    batches = [
+        available[iterations * 2 + i * BATCH_BOOKS:iterations * 2 + (i + 1) * BATCH_BOOKS]
+        for i in range(iterations)
+    ]
+    last_week = (fixtures['latest'] - timedelta(days=7)).strftime('%Y-%m-%d')
+    last_month = (fixtures['latest'] - timedelta(days=30)).strftime('%Y-%m-%d')
+    today = fixtures['latest'].strftime('%Y-%m-%d')
+
+    # Sessions are single-use, so refresh and logout each get their own
+    refresh_tokens = [create_session(fixtures['student']) for _ in range(iterations)]
+    logout_tokens = [create_session(fixtures['student']) for _ in range(iterations)]
+
+    def get(path, headers=admin_headers):
+        return lambda i: (path(i) if callable(path) else path, {'headers': headers})
+
+    def post(path, body, headers=admin_headers):
+        return lambda i: (path, {'headers': headers, 'json': body(i)})
+
+    def bulk_upload(i):
+        lines = ['title,author,subject_id,barcode']
+        lines += [f'Bench Import {i}.{n},Bench Author,{subjects[n % len(subjects)]},BULK-{run_id}-{i}-{n}'
+                  for n in range(100)]
+        upload = (io.BytesIO('\n'.join(lines).encode('utf-8')), 'books.csv')
+        return '/api/books/bulk', {'headers': admin_headers, 'data': {'file': upload},
+                                   'content_type': 'multipart/form-data'}
+
+    return [
+        # Books
+        Scenario('books.list', 'GET', get('/api/books/?limit=50')),
+        Scenario('books.list_next_page', 'GET', get(
+            lambda i: f"/api/books/?limit=50&after={fixtures['book_cursors'][i]}"
+        )),
+        Scenario('books.list_filtered', 'GET', get(
+            lambda i: f'/api/books/?status=Available&subject_id={subjects[i % len(subjects)]}&limit=50'
+        )),
+        Scenario('books.search', 'GET', get(
+            lambda i: f'/api/books/?search={datagen.TOPICS[i % len(datagen.TOPICS)]}&limit=20'
+        )),
+        Scenario('books.by_barcode', 'GET', get(lambda i: f'/api/books/by-barcode/{barcodes[i]}')),
+        Scenario('books.by_barcodes', 'POST', post(
+            '/api/books/by-barcode', lambda i: {'barcodes': barcodes[i * 50:(i + 1) * 50]}
+        )),
+        Scenario('books.get', 'GET', get(lambda i: f'/api/books/{books[i % len(books)]}')),
+        Scenario('books.add', 'POST', post('/api/books/', lambda i: {
+            'title': f'Bench Book {i}', 'author': 'Bench Author',
+            'subject_id': subjects[i % len(subjects)], 'barcode': f'ADD-{run_id}-{i}',
+        }), expect=201),
+        Scenario('books.bulk', 'POST', bulk_upload),
+        Scenario('books.update', 'PUT', lambda i: (
+            f'/api/books/{books[i % len(books)]}',
+            {'headers': admin_headers, 'json': {'author': f'Revised Author {i}'}}
+        )),
+        Scenario('books.allot', 'POST', post(
+            '/api/books/allot', lambda i: {'book_id': allot[i][0], 'user_id': fixtures['borrower']}
+        )),
+        Scenario('books.return', 'POST', post('/api/books/return', lambda i: {'book_id': allot[i][0]})),
+        Scenario('books.allot_batch', 'POST', post('/api/books/allot/batch', lambda i: {
+            'user_id': fixtures['borrower'], 'barcodes': [barcode for _, barcode in batches[i]],
+        })),
+        Scenario('books.return_batch', 'POST', post(
+            '/api/books/return/batch', lambda i: {'barcodes': [barcode for _, barcode in batches[i]]}
+        )),
+        Scenario('books.preorder', 'POST', post(
+            '/api/books/preorder', lambda i: {'book_id': preorder[i][0], 'payment_status': 'Pending'},
+            headers=student_headers
+        )),
+
+        # Transactions
+        Scenario('transactions.list', 'GET', get('/api/transactions/?limit=50')),
+        Scenario('transactions.list_next_page', 'GET', get(
+            lambda i: f"/api/transactions/?limit=50&after={fixtures['transaction_cursors'][i]}"
+        )),
+        Scenario('transactions.list_user_range', 'GET', get(
+            f"/api/transactions/?user_id={fixtures['student']}&start_date={last_month}&end_date={today}"
+        )),
+        Scenario('transactions.export_csv', 'GET', get(
+            f'/api/transactions/export?start_date={last_week}&end_date={today}'
+        )),
+        Scenario('transactions.export_ndjson_gzip', 'GET', get(
+            f'/api/transactions/export?format=ndjson&compress=gzip&start_date={last_week}&end_date={today}'
+        )),
+        Scenario('transactions.overdue', 'GET', get('/api/transactions/overdue')),
+        Scenario('transactions.user', 'GET', get(
+            f"/api/transactions/user/{fixtures['student']}", headers=student_headers
+        )),
+        Scenario('transactions.stats', 'GET', get('/api/transactions/stats')),
+
+        # Academic
+        Scenario('academic.streams', 'GET', get('/api/academic/streams', headers=student_headers)),
+        Scenario('academic.add_stream', 'POST', post(
+            '/api/academic/streams', lambda i: {'name': f'Bench Stream {run_id}-{i}'}
+        ), expect=201),
+        Scenario('academic.courses', 'GET', get(
+            lambda i: f"/api/academic/courses?stream_id={fixtures['streams'][i % len(fixtures['streams'])]}",
+            headers=student_headers
+        )),
+        Scenario('academic.add_course', 'POST', post('/api/academic/courses', lambda i: {
+            'name': f'Bench Course {run_id}-{i}',
+            'stream_id': fixtures['streams'][i % len(fixtures['streams'])], 'semesters': 8,
+        }), expect=201),
+        Scenario('academic.subjects', 'GET', get(
+            lambda i: f"/api/academic/subjects?course_id={fixtures['courses'][i % len(fixtures['courses'])]}",
+            headers=student_headers
+        )),
+        Scenario('academic.add_subject', 'POST', post('/api/academic/subjects', lambda i: {
+            'name': f'Bench Subject {run_id}-{i}',
+            'course_id': fixtures['courses'][i % len(fixtures['courses'])], 'semester': 1 + i % 8,
+        }), expect=201),
+        Scenario('academic.hierarchy', 'GET', get('/api/academic/hierarchy', headers=student_headers)),
+        Scenario('academic.subject_books', 'GET', get(
+            lambda i: f'/api/academic/subjects/{subjects[i % len(subjects)]}/books', headers=student_headers
+        )),
+
+        # Auth
+        Scenario('auth.login', 'POST', post('/api/auth/login', lambda i: {
+            'email': datagen.ADMIN['email'], 'password': datagen.DEFAULT_PASSWORD, 'role': 'admin',
+        }, headers={})),
+        Scenario('auth.refresh', 'POST', post(
+            '/api/auth/refresh', lambda i: {'refresh_token': refresh_tokens[i]}, headers={}
+        )),
+        Scenario('auth.logout', 'POST', post(
+            '/api/auth/logout', lambda i: {'refresh_token': logout_tokens[i]}, headers={}
+        )),
+        Scenario('auth.logout_all', 'POST', post(
+            '/api/auth/logout-all', lambda i: None, headers=student_headers
+        )),
+        Scenario('auth.register', 'POST', post('/api/auth/register', lambda i: {
+            'name': f'Bench Register {i}', 'email': f'register-{run_id}-{i}@vrec.edu',
+            'password': datagen.DEFAULT_PASSWORD, 'role': 'student',
+            'stream': fixtures['streams'][0], 'branch': fixtures['courses'][0],
+        }, headers={}), expect=201),
+        Scenario('auth.profile', 'GET', get('/api/auth/profile', headers=student_headers)),
+        Scenario('auth.update_profile', 'PUT', lambda i: (
+            '/api/auth/profile', {'headers': student_headers, 'json': {'name': f'Bench Student {i}'}}
+        )),
+    ]
+
+def run_scenario(client, scenario, iterations, warmup):
+    """
+    Returns the scenario's latency and query summary; warmup requests are not recorded
+
+    The first response with a status other than scenario.expect ends the
+    scenario, and the summary then holds only the failure.
+    """
+    latencies = []
+    queries = []
+    for i in range(warmup + iterations):
+        path, kwargs = scenario.build(i)
+        start = time.perf_counter()
+        response = client.open(path, method=scenario.method, **kwargs)
+        body = response.get_data()
+        elapsed = time.perf_counter() - start
+        if response.status_code != scenario.expect:
+            if body[:2] == b'\x1f\x8b':
+                body = gzip.decompress(body)
+            return {
+                'requests': max(0, i - warmup),
+                'failed': f"{scenario.method} {path}: {response.status_code} {body[:200].decode('utf-8', 'replace')}",
+            }
+        if i < warmup:
+            continue
+        latencies.append(elapsed * 1000)
+        queries.append(metrics.request_stats()['queries'])
+
+    latencies.sort()
+    return {
+        'requests': iterations,
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'queries_per_request': round(statistics.fmean(queries), 2),
+        'max_queries': max(queries),
+    }
+
+def compare(results, baseline_path):
+    """Prints p50/p99/query changes against an earlier baseline"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)['routes']
+    print(f"\n{'route':<36}{'p50 ms':>18}{'p99 ms':>18}{'queries':>14}")
+    for name, current in results.items():
+        before = baseline.get(name)
+        if 'failed' in current:
+            print(f"{name:<36}{'FAILED':>18}")
+            continue
+        if before is None or 'failed' in before:
+            print(f"{name:<36}{'(no baseline)':>18}")
+            continue
+        p50 = (current['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0.0
+        p99 = (current['p99_ms'] - before['p99_ms']) / before['p99_ms'] * 100 if before['p99_ms'] else 0.0
+        print(f"{name:<36}{current['p50_ms']:>9.2f} {p50:+6.1f}%{current['p99_ms']:>10.2f} {p99:+6.1f}%"
+              f"{before['queries_per_request']:>7.1f}->{current['queries_per_request']:<5.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db', help='Database generated by benchmarks.datagen (default: a small temporary one)')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=5, help='Unrecorded requests before each scenario')
+    parser.add_argument('--only', help='Comma-separated scenario name prefixes, e.g. books,auth.login')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Print changes against a baseline written by --output')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep metrics and slow-query files of the run out of the working tree
+        metrics.directory = os.path.join(tmp, 'metrics')
+        db_helper.slow_query_log = SlowQueryLog(db_helper.explain_query, directory=os.path.join(tmp, 'logs'))
+
+        if args.db:
+            db_helper.DATABASE_PATH = os.path.abspath(args.db)
+            db_helper.init_db()
+        else:
+            db_helper.DATABASE_PATH = os.path.join(tmp, 'bench.db')
+            print(f"Generating {SMALL_DATASET}")
+            datagen.generate(**SMALL_DATASET)
+
+        from backend import app as app_module
+        # Background jobs would write to the database mid-measurement
+        app_module.SCHEDULER_ENABLED = False
+        client = app_module.app.test_client()
+
+        fixtures = load_fixtures(args.iterations + args.warmup)
+        admin = generate_token({'id': datagen.ADMIN['id'], 'role': 'admin'})
+        student = generate_token({'id': fixtures['student'], 'role': 'student'})
+        scenarios = build_scenarios(fixtures, args.iterations + args.warmup, admin, student)
+        if args.only:
+            prefixes = tuple(args.only.split(','))
+            scenarios = [scenario for scenario in scenarios if scenario.name.startswith(prefixes)]
+
+        results = {}
+        print(f"{'route':<36}{'p50 ms':>10}{'p99 ms':>10}{'queries':>10}")
+        for scenario in scenarios:
+            stats = run_scenario(client, scenario, args.iterations, args.warmup)
+            results[scenario.name] = stats
+            if 'failed' in stats:
+                print(f"{scenario.name:<36}  FAILED after {stats['requests']} requests: {stats['failed']}")
+                continue
+            print(f"{scenario.name:<36}{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+                  f"{stats['queries_per_request']:>10.1f}")
+
+        db_helper.writer_queue.stop()
+        db_helper.connection_pool.close_all()
+
+    if args.compare:
+        compare(results, args.compare)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'database': args.db or SMALL_DATASET,
+                'iterations': args.iterations,
+                'routes': results,
+            }, f, indent=2)
+        print(f"Baseline written to {args.output}")
+
+    failed = [name for name, stats in results.items() if 'failed' in stats]
+    if failed:
+        raise SystemExit(f"{len(failed)} scenarios failed: {', '.join(failed)}")
+
+if __name__ == '__main__':
+    main()
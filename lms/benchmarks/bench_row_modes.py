@@ -0,0 +1,82 @@
+"""
+Measure fetch time and memory of each execute_query row mode over 100k transactions
+
+Usage (from the lms directory):
+    python -m benchmarks.bench_row_modes --transactions 100000 --repeat 5
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from backend.utils import db_helper
+from benchmarks.bench_helper import seed_database
+
+QUERY = "SELECT * FROM transactions"
+
+def seed_transactions(transaction_count):
+    """Initializes a fresh database with 1000 books and transaction_count returned loans"""
+    seed_database(1000)
+    issued = datetime(2024, 1, 1, 9, 30)
+    db_helper.execute_many(
+        """
+        INSERT INTO transactions (allotment_id, book_id, user_id, status, issue_date, due_date)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        """,
+        [
+            (f'txn-{i:08d}', f'book-{i % 1000}', 'user-bench', 'Returned',
+             issued + timedelta(minutes=i), issued + timedelta(days=14, minutes=i))
+            for i in range(transaction_count)
+        ]
+    )
+
+def legacy_fetch():
+    """The old path: the connection's dict_factory builds each row"""
+    with db_helper.connection_pool.connection() as connection:
+        return connection.execute(QUERY).fetchall()
+
+def measure(fetch, repeat):
+    """Returns (best seconds, peak MiB) for fetch()"""
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        rows = fetch()
+        best = min(best, time.perf_counter() - start)
+        del rows
+
+    gc.collect()
+    tracemalloc.start()
+    rows = fetch()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return best, peak / (1024 * 1024)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--transactions', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_helper.DATABASE_PATH = os.path.join(tmp, 'bench.db')
+        seed_transactions(args.transactions)
+
+        fetchers = {'legacy dict_factory': legacy_fetch}
+        for mode in db_helper.ROW_MODES:
+            fetchers[mode] = lambda mode=mode: db_helper.execute_query(QUERY, row_mode=mode)
+
+        print(f"Fetching {args.transactions} transactions")
+        for label, fetch in fetchers.items():
+            seconds, peak = measure(fetch, args.repeat)
+            print(f"{label:>20}: {seconds * 1000:8.1f} ms  peak {peak:7.1f} MiB")
+
+        db_helper.writer_queue.stop()
+        db_helper.connection_pool.close_all()
+
+if __name__ == '__main__':
+    main()
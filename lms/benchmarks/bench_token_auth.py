@@ -0,0 +1,72 @@
+"""
+Benchmark the per-request cost of token_required with and without the token cache
+
+Usage (from the lms directory):
+    python -m benchmarks.bench_token_auth --requests 20000
+"""
+import argparse
+import time
+
+from flask import jsonify
+
+from backend.utils.jwt_helper import decode_token, generate_token, token_cache, token_required, verify_token
+from benchmarks.bench_helper import create_app
+
+def create_ping_app():
+    """Builds an app with a single protected route that does no other work"""
+    app = create_app()
+
+    @app.route('/ping')
+    @token_required
+    def ping():
+        return jsonify({'ok': True})
+
+    return app
+
+def time_calls(func, token, count):
+    """Returns the mean microseconds per call of func(token)"""
+    start = time.perf_counter()
+    for _ in range(count):
+        func(token)
+    return (time.perf_counter() - start) / count * 1e6
+
+def time_requests(client, headers, count):
+    """Returns the mean microseconds per protected request"""
+    start = time.perf_counter()
+    for _ in range(count):
+        response = client.get('/ping', headers=headers)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    return (time.perf_counter() - start) / count * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args()
+
+    token = generate_token({'id': 'admin-001', 'role': 'admin'})
+    headers = {'Authorization': f'Bearer {token}'}
+    client = create_ping_app().test_client()
+
+    max_entries = token_cache.max_entries
+    results = {}
+
+    # Verification alone
+    results['decode_token'] = time_calls(decode_token, token, args.requests)
+    verify_token(token)
+    results['verify_token (cached)'] = time_calls(verify_token, token, args.requests)
+
+    # Full request through the decorator
+    token_cache.clear()
+    token_cache.max_entries = 0
+    results['request (uncached)'] = time_requests(client, headers, args.requests)
+    token_cache.max_entries = max_entries
+    results['request (cached)'] = time_requests(client, headers, args.requests)
+
+    for label, micros in results.items():
+        print(f"{label:>22}: {micros:8.1f} us")
+    saved = results['request (uncached)'] - results['request (cached)']
+    print(f"{'saved per request':>22}: {saved:8.1f} us")
+    print(f"{'cache':>22}: {token_cache.stats()}")
+
+if __name__ == '__main__':
+    main()
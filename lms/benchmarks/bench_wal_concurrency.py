@@ -0,0 +1,127 @@
+"""
+Stress test: catalog read latency while issue/return writes run
+
+Reader threads run the GET /api/books/ listing query while writer
+processes (standing in for gunicorn workers) issue and return books.
+Read latency is measured once without writers and once with them; in
+WAL mode the p99 should stay flat and no "database is locked" errors
+should appear.
+
+Usage (from the lms directory):
+    python -m benchmarks.bench_wal_concurrency --writers 4 --seconds 10
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from backend.utils import db_helper
+from benchmarks.bench_helper import percentile, seed_database
+
+LIST_QUERY = """
+    SELECT b.*, s.name as subject_name, c.name as course_name
+    FROM books b
+    LEFT JOIN subjects s ON b.subject_id = s.subject_id
+    LEFT JOIN courses c ON s.course_id = c.course_id
+    WHERE b.status = %s
+"""
+
+def writer_process(database_path, book_ids, deadline, results):
+    """Repeatedly issues and returns books until the deadline"""
+    db_helper.DATABASE_PATH = database_path
+    writes = errors = 0
+    while time.time() < deadline:
+        for book_id in book_ids:
+            try:
+                db_helper.execute_query(
+                    "UPDATE books SET status = %s WHERE book_id = %s",
+                    ('Issued', book_id), fetch=False
+                )
+                db_helper.execute_query(
+                    """
+                    INSERT INTO transactions (allotment_id, book_id, user_id, status, issue_date)
+                    VALUES (%s, %s, %s, %s, %s)
+                    """,
+                    (str(uuid.uuid4()), book_id, 'user-bench', 'Issued', datetime.now()),
+                    fetch=False
+                )
+                db_helper.execute_query(
+                    "UPDATE books SET status = %s WHERE book_id = %s",
+                    ('Available', book_id), fetch=False
+                )
+                writes += 3
+            except Exception as e:
+                errors += 1
+                if 'locked' not in str(e):
+                    raise
+    results.put((writes, errors))
+
+def measure_reads(reader_count, seconds):
+    """Runs the listing query from reader threads and returns sorted latencies"""
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.time() + seconds
+
+    def reader():
+        local = []
+        while time.time() < deadline:
+            start = time.perf_counter()
+            db_helper.execute_query(LIST_QUERY, ('Available',))
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=reader) for _ in range(reader_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--books', type=int, default=2000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_helper.DATABASE_PATH = os.path.join(tmp, 'bench.db')
+        seed_database(args.books)
+
+        baseline = measure_reads(args.readers, args.seconds)
+
+        results = multiprocessing.Queue()
+        deadline = time.time() + args.seconds
+        writers = [
+            multiprocessing.Process(
+                target=writer_process,
+                args=(db_helper.DATABASE_PATH, [f'book-{i}' for i in range(n, args.books, args.writers)][:50],
+                      deadline, results)
+            )
+            for n in range(args.writers)
+        ]
+        for process in writers:
+            process.start()
+        loaded = measure_reads(args.readers, args.seconds)
+        totals = [results.get() for _ in writers]
+        for process in writers:
+            process.join()
+
+        db_helper.writer_queue.stop()
+        db_helper.connection_pool.close_all()
+
+    writes = sum(w for w, _ in totals)
+    locked = sum(e for _, e in totals)
+    print(f"{'':>14} {'reads':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for label, values in (('reads only', baseline), ('with writers', loaded)):
+        print(f"{label:>14} {len(values):8d} {percentile(values, 0.50) * 1000:8.2f} {percentile(values, 0.99) * 1000:8.2f}")
+    print(f"writes: {writes} ({writes / args.seconds:.0f}/s), 'database is locked' errors: {locked}")
+
+if __name__ == '__main__':
+    main()
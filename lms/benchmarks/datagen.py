@@ -0,0 +1,252 @@
+"""
+Generate a deterministic synthetic library at configurable scale
+
+Streams, courses, subjects, users, books and a year of circulation history
+are derived from --seed alone, so two runs with the same arguments produce
+identical databases. The history ends at HISTORY_END (or --end), not at
+today, so the dates and Issued/Overdue statuses do not depend on the day
+of the run. Borrowing is skewed the way a real library is: book and
+borrower popularity follow Zipf distributions, so a few hundred titles and
+regular readers account for most of the transactions.
+
+Usage (from the lms directory):
+    python -m benchmarks.datagen --db /tmp/lms.db --users 50000 --books 500000 --transactions 5000000
+"""
+import argparse
+import os
+import random
+import time
+from array import array
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from backend.config import LOAN_PERIOD_DAYS
+from backend.utils import db_helper
+from backend.utils.password_helper import hash_password
+
+# Every generated account uses this password
+DEFAULT_PASSWORD = 'library123'
+
+# Generated admin account, for benchmarks that need admin routes
+ADMIN = {'id': 'admin-bench', 'email': 'admin@vrec.edu', 'name': 'Bench Admin'}
+
+STREAMS = ['Engineering', 'Management', 'Sciences', 'Humanities', 'Pharmacy']
+COURSES = ['B.Tech', 'M.Tech', 'MBA', 'BBA', 'B.Sc', 'M.Sc', 'BA', 'B.Pharm']
+TOPICS = [
+    'Algorithms', 'Databases', 'Networks', 'Thermodynamics', 'Circuits', 'Statistics',
+    'Accounting', 'Marketing', 'Chemistry', 'Physics', 'Biology', 'Economics',
+    'Linguistics', 'History', 'Pharmacology', 'Mechanics', 'Optics', 'Calculus',
+]
+TITLE_WORDS = [
+    'Introduction', 'Principles', 'Advanced', 'Applied', 'Foundations', 'Handbook',
+    'Essentials', 'Modern', 'Practical', 'Theory', 'Analysis', 'Design',
+]
+SURNAMES = [
+    'Rao', 'Sharma', 'Reddy', 'Iyer', 'Gupta', 'Naidu', 'Patel', 'Kumar',
+    'Singh', 'Das', 'Menon', 'Joshi', 'Varma', 'Pillai', 'Chowdary', 'Bose',
+]
+
+# Default end of the generated history
+HISTORY_END = datetime(2025, 6, 30)
+
+BATCH_SIZE = 50000
+
+def zipf_weights(count, exponent):
+    """Cumulative Zipf weights for ranks 1..count"""
+    return list(accumulate(1.0 / (rank ** exponent) for rank in range(1, count + 1)))
+
+def insert_batches(connection, query, rows):
+    """Inserts rows from an iterable in BATCH_SIZE transactions"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            connection.executemany(db_helper.prepare_query(query), batch)
+            connection.commit()
+            batch = []
+    if batch:
+        connection.executemany(db_helper.prepare_query(query), batch)
+        connection.commit()
+
+def generate(users=2000, books=20000, transactions=200000, seed=42, days=365,
+             book_skew=0.5, user_skew=0.5, open_loan_rate=0.3, rounds=4, now=None):
+    """
+    Fills the database at db_helper.DATABASE_PATH with synthetic data
+
+    Args:
+        users (int): Students and faculty to create (plus one admin)
+        books (int): Book copies to create
+        transactions (int): Circulation history rows to create
+        seed (int): Random seed; the same seed gives the same data
+        days (int): Length of the circulation history
+        book_skew (float): Zipf exponent of book popularity
+        user_skew (float): Zipf exponent of borrower activity
+        open_loan_rate (float): Share of each book's latest loan in the last
+            LOAN_PERIOD_DAYS * 2 days that is still open
+        rounds (int): bcrypt cost of the shared password hash
+        now (datetime): End of the history, defaults to HISTORY_END
+
+    Returns:
+        dict: Counts and ids the benchmarks need
+    """
+    rng = random.Random(seed)
+    now = now or HISTORY_END
+    db_helper.init_db()
+    connection = db_helper.get_db_connection()
+    connection.execute("PRAGMA synchronous = OFF")
+
+    try:
+        # Academic structure: every stream offers a few courses, 8 semesters of subjects each
+        stream_ids = [f'stream-{i:02d}' for i in range(len(STREAMS))]
+        insert_batches(connection, "INSERT OR IGNORE INTO streams (stream_id, name) VALUES (%s, %s)",
+                       zip(stream_ids, STREAMS))
+        courses = []
+        for stream_index, stream_id in enumerate(stream_ids):
+            for course_index in range(3):
+                name = f'{COURSES[(stream_index + course_index) % len(COURSES)]} {STREAMS[stream_index]}'
+                courses.append((f'course-{stream_index:02d}-{course_index}', name, stream_id, 8))
+        insert_batches(connection, """
+            INSERT OR IGNORE INTO courses (course_id, name, stream_id, semesters) VALUES (%s, %s, %s, %s)
+        """, courses)
+        subjects = []
+        for course_id, course_name, _, semesters in courses:
+            for semester in range(1, semesters + 1):
+                for slot in range(4):
+                    topic = TOPICS[rng.randrange(len(TOPICS))]
+                    subjects.append((f'subject-{course_id[7:]}-{semester}-{slot}', f'{topic} {semester}.{slot}',
+                                     course_id, semester))
+        insert_batches(connection, """
+            INSERT OR IGNORE INTO subjects (subject_id, name, course_id, semester) VALUES (%s, %s, %s, %s)
+        """, subjects)
+        subject_ids = [subject[0] for subject in subjects]
+
+        # Users share one password hash; hashing per user would dominate generation time
+        password = hash_password(DEFAULT_PASSWORD, rounds)
+        user_ids = [f'user-{i:07d}' for i in range(users)]
+
+        def user_rows():
+            yield (ADMIN['id'], ADMIN['name'], 'admin', None, None, ADMIN['email'], password)
+            for i, user_id in enumerate(user_ids):
+                course = courses[rng.randrange(len(courses))]
+                role = 'faculty' if i % 50 == 0 else 'student'
+                name = f'{SURNAMES[rng.randrange(len(SURNAMES))]} {i}'
+                yield (user_id, name, role, course[2], course[0], f'user{i}@vrec.edu', password)
+
+        insert_batches(connection, """
+            INSERT OR IGNORE INTO users (id, name, role, stream, branch, email, password)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, user_rows())
+
+        # Several copies of each title, spread over the subjects
+        book_ids = [f'book-{i:08d}' for i in range(books)]
+
+        def book_rows():
+            for i, book_id in enumerate(book_ids):
+                title_number = i // 4
+                topic = TOPICS[title_number % len(TOPICS)]
+                word = TITLE_WORDS[(title_number // len(TOPICS)) % len(TITLE_WORDS)]
+                title = f'{word} of {topic} Volume {title_number // (len(TOPICS) * len(TITLE_WORDS)) + 1}'
+                author = f'{SURNAMES[title_number % len(SURNAMES)]} {chr(65 + title_number % 26)}.'
+                subject_id = subject_ids[title_number % len(subject_ids)]
+                yield (book_id, subject_id, title, author, f'VR{i:09d}', 'Available')
+
+        insert_batches(connection, """
+            INSERT OR IGNORE INTO books (book_id, subject_id, title, author, barcode, status)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, book_rows())
+
+        # Who borrows what: Zipf over shuffled ranks, so popular ids are scattered
+        book_rank = list(range(books))
+        rng.shuffle(book_rank)
+        user_rank = list(range(users))
+        rng.shuffle(user_rank)
+        book_weights = zipf_weights(books, book_skew)
+        user_weights = zipf_weights(users, user_skew)
+        borrowed_books = array('i')
+        borrowers = array('i')
+        for start in range(0, transactions, BATCH_SIZE):
+            count = min(BATCH_SIZE, transactions - start)
+            borrowed_books.extend(book_rank[i] for i in rng.choices(range(books), cum_weights=book_weights, k=count))
+            borrowers.extend(user_rank[i] for i in rng.choices(range(users), cum_weights=user_weights, k=count))
+
+        # Transactions are evenly spread over the history in issue order.
+        # Walking backwards, a book's latest recent loan may still be open.
+        start_time = now - timedelta(days=days)
+        step = timedelta(days=days) / max(transactions, 1)
+        open_since = now - timedelta(days=LOAN_PERIOD_DAYS * 2)
+        open_loans = set()
+        seen = set()
+        for i in range(transactions - 1, -1, -1):
+            if start_time + step * i < open_since:
+                break
+            book = borrowed_books[i]
+            if book not in seen:
+                seen.add(book)
+                if rng.random() < open_loan_rate:
+                    open_loans.add(i)
+
+        def transaction_rows():
+            for i in range(transactions):
+                issue_date = (start_time + step * i).replace(microsecond=0)
+                due_date = issue_date + timedelta(days=LOAN_PERIOD_DAYS)
+                if i in open_loans:
+                    status = 'Overdue' if due_date < now else 'Issued'
+                    return_date = None
+                else:
+                    status = 'Returned'
+                    return_date = min(issue_date + timedelta(days=rng.randint(1, LOAN_PERIOD_DAYS + 7)), now)
+                yield (f'txn-{i:09d}', book_ids[borrowed_books[i]], user_ids[borrowers[i]],
+                       status, issue_date, due_date, return_date)
+
+        insert_batches(connection, """
+            INSERT OR IGNORE INTO transactions
+                (allotment_id, book_id, user_id, status, issue_date, due_date, return_date)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, transaction_rows())
+
+        insert_batches(connection, "UPDATE books SET status = 'Issued' WHERE book_id = %s",
+                       ((book_ids[borrowed_books[i]],) for i in open_loans))
+        connection.execute("ANALYZE")
+        connection.commit()
+    finally:
+        connection.close()
+
+    return {
+        'seed': seed,
+        'users': users,
+        'books': books,
+        'transactions': transactions,
+        'open_loans': len(open_loans),
+        'admin': ADMIN,
+        'password': DEFAULT_PASSWORD,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db', required=True, help='SQLite file to create or extend')
+    parser.add_argument('--users', type=int, default=50000)
+    parser.add_argument('--books', type=int, default=500000)
+    parser.add_argument('--transactions', type=int, default=5000000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--book-skew', type=float, default=0.5, help='Zipf exponent of book popularity')
+    parser.add_argument('--user-skew', type=float, default=0.5, help='Zipf exponent of borrower activity')
+    parser.add_argument('--rounds', type=int, default=4, help='bcrypt cost of the shared password')
+    parser.add_argument('--end', help=f'End of the history, YYYY-MM-DD (default: {HISTORY_END:%Y-%m-%d})')
+    args = parser.parse_args()
+    now = datetime.strptime(args.end, '%Y-%m-%d') if args.end else None
+
+    db_helper.DATABASE_PATH = os.path.abspath(args.db)
+    started = time.perf_counter()
+    summary = generate(
+        args.users, args.books, args.transactions, args.seed, args.days,
+        book_skew=args.book_skew, user_skew=args.user_skew, rounds=args.rounds, now=now
+    )
+    db_helper.writer_queue.stop()
+    db_helper.connection_pool.close_all()
+    print(f"Generated {summary['users']} users, {summary['books']} books, "
+          f"{summary['transactions']} transactions ({summary['open_loans']} open) "
+          f"in {time.perf_counter() - started:.1f}s -> {db_helper.DATABASE_PATH}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,448 @@
+"""
+Closed-loop load test of the app under gunicorn, one scenario at a time
+
+Starts gunicorn on a local port against a datagen database and replays
+the traffic the library actually sees: the 9am login storm, barcode scans
+at the circulation desk, catalog searches from the student dashboard and
+the admin dashboard's stats and export calls, then all of them at once.
+Every virtual user sends its next request as soon as the previous one
+answers. Each scenario reports throughput, latency percentiles and errors,
+including "database is locked" failures counted from the server log.
+
+--workers and --worker-class take comma-separated lists; every combination
+gets a fresh server, so one run sizes a deployment. Needs gunicorn only.
+
+Usage (from the lms directory):
+    python -m benchmarks.loadgen --workers 1,2,4 --worker-class sync,gthread --duration 30
+    python -m benchmarks.loadgen --db /tmp/lms.db --scenario circulation_desk,mixed --output load.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta
+
+from backend.config import PASSWORD_HASH_ROUNDS
+from backend.utils import db_helper
+from benchmarks import datagen
+from benchmarks.bench_helper import percentile
+
+LMS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dataset generated when --db is not given
+SMALL_DATASET = {'users': 2000, 'books': 20000, 'transactions': 200000}
+
+# Books a desk clerk scans per allot/batch request
+BATCH_BOOKS = 5
+
+# Search terms typed into the student dashboard
+SEARCH_TERMS = datagen.TOPICS + ['Introduction', 'Applied Statistics', 'Modern Design', 'Rao', 'Volume 2']
+
+LOCKED = 'database is locked'
+
+class Recorder:
+    """Latency and outcome of every request a scenario sends"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = []
+
+    def add(self, operation, seconds, outcome):
+        with self._lock:
+            self.samples.append((operation, seconds, outcome))
+
+class Client:
+    """
+    One virtual user's keep-alive HTTP connection
+
+    Args:
+        port (int): Port gunicorn listens on
+        recorder (Recorder): Where request outcomes go
+    """
+
+    def __init__(self, port, recorder):
+        self.port = port
+        self.recorder = recorder
+        self.token = None
+        self._connection = None
+
+    def _send(self, method, path, body, headers):
+        if self._connection is None:
+            self._connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        self._connection.request(method, path, body=body, headers=headers)
+        response = self._connection.getresponse()
+        return response.status, response.read()
+
+    def request(self, operation, method, path, payload=None, expect=(200,)):
+        """
+        Sends one request and records it
+
+        Returns:
+            The decoded JSON body, or None when the request failed
+        """
+        headers = {}
+        body = None
+        if payload is not None:
+            body = json.dumps(payload)
+            headers['Content-Type'] = 'application/json'
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+
+        start = time.perf_counter()
+        try:
+            try:
+                status, data = self._send(method, '/api' + path, body, headers)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # Sync workers close the connection after every response
+                self.close()
+                status, data = self._send(method, '/api' + path, body, headers)
+        except (OSError, http.client.HTTPException) as e:
+            self.close()
+            self.recorder.add(operation, time.perf_counter() - start, f'connection: {type(e).__name__}')
+            return None
+        elapsed = time.perf_counter() - start
+
+        if status in expect:
+            outcome = 'ok'
+        elif LOCKED.encode() in data:
+            outcome = LOCKED
+        else:
+            outcome = str(status)
+        self.recorder.add(operation, elapsed, outcome)
+        if outcome != 'ok':
+            return None
+        try:
+            return json.loads(data) if data[:1] in (b'{', b'[') else {}
+        except ValueError:
+            return {}
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+def login(client, account):
+    """Logs a virtual user in; returns the user dict or None"""
+    result = client.request('login', 'POST', '/auth/login', {
+        'email': account['email'], 'password': account['password'], 'role': account['role'],
+    })
+    if result:
+        client.token = result['token']
+        return result['user']
+    return None
+
+class LoginStorm:
+    """Students open the dashboard at 9am: login, profile, their loans"""
+
+    users = 32
+
+    def __init__(self, fixtures):
+        self.accounts = fixtures['accounts']
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def setup(self, client, vu):
+        pass
+
+    def iteration(self, client, state):
+        with self._lock:
+            account = self.accounts[self._next % len(self.accounts)]
+            self._next += 1
+        user = login(client, account)
+        if user:
+            client.request('profile', 'GET', '/auth/profile')
+            client.request('my loans', 'GET', f"/transactions/user/{user['id']}")
+        client.token = None
+
+class CirculationDesk:
+    """Clerks scan barcodes to issue and receive books, singly and in stacks"""
+
+    users = 8
+
+    def __init__(self, fixtures):
+        self.fixtures = fixtures
+
+    def setup(self, client, vu):
+        login(client, self.fixtures['admin'])
+        # Each clerk works through its own shelf, so clerks never race for a book
+        shelf_size = BATCH_BOOKS + 1
+        shelf = self.fixtures['available'][vu * shelf_size:(vu + 1) * shelf_size]
+        if len(shelf) < shelf_size:
+            raise SystemExit(f"Not enough available books for {vu + 1} desk clerks")
+        return {'single': shelf[0], 'stack': shelf[1:]}
+
+    def iteration(self, client, state):
+        borrower = random.choice(self.fixtures['borrowers'])
+        book_id, barcode = state['single']
+        book = client.request('scan', 'GET', f'/books/by-barcode/{barcode}')
+        if book is not None:
+            client.request('allot', 'POST', '/books/allot', {'book_id': book_id, 'user_id': borrower})
+            client.request('scan', 'GET', f'/books/by-barcode/{barcode}')
+            client.request('return', 'POST', '/books/return', {'book_id': book_id})
+
+        barcodes = [barcode for _, barcode in state['stack']]
+        client.request('scan batch', 'POST', '/books/by-barcode', {'barcodes': barcodes})
+        client.request('allot batch', 'POST', '/books/allot/batch', {'user_id': borrower, 'barcodes': barcodes})
+        client.request('return batch', 'POST', '/books/return/batch', {'barcodes': barcodes})
+
+class CatalogSearch:
+    """Students search the catalog from the dashboard and open results"""
+
+    users = 16
+
+    def __init__(self, fixtures):
+        self.fixtures = fixtures
+
+    def setup(self, client, vu):
+        login(client, self.fixtures['accounts'][vu % len(self.fixtures['accounts'])])
+
+    def iteration(self, client, state):
+        term = urllib.parse.quote(random.choice(SEARCH_TERMS))
+        result = client.request('search', 'GET', f'/books/?search={term}')
+        if result and result.get('books'):
+            client.request('book', 'GET', f"/books/{random.choice(result['books'])['book_id']}")
+        subject = random.choice(self.fixtures['subjects'])
+        client.request('subject books', 'GET', f'/academic/subjects/{subject}/books')
+
+class AdminDashboard:
+    """Librarians refresh stats and recent loans and download exports"""
+
+    users = 2
+
+    def __init__(self, fixtures):
+        self.fixtures = fixtures
+
+    def setup(self, client, vu):
+        login(client, self.fixtures['admin'])
+
+    def iteration(self, client, state):
+        client.request('stats', 'GET', '/transactions/stats')
+        client.request('recent', 'GET', '/transactions/?limit=5')
+        client.request('overdue', 'GET', '/transactions/overdue')
+        client.request('export', 'GET', f"/transactions/export?start_date={self.fixtures['last_week']}")
+
+SCENARIOS = {
+    'login_storm': [LoginStorm],
+    'circulation_desk': [CirculationDesk],
+    'catalog_search': [CatalogSearch],
+    'admin_dashboard': [AdminDashboard],
+    'mixed': [LoginStorm, CirculationDesk, CatalogSearch, AdminDashboard],
+}
+
+def load_fixtures():
+    """Accounts, books and ids the scenarios draw from"""
+    accounts = [
+        {'email': email, 'role': role, 'password': datagen.DEFAULT_PASSWORD}
+        for email, role in db_helper.execute_query(
+            "SELECT email, role FROM users WHERE role != 'admin' AND id LIKE 'user-%' ORDER BY id LIMIT 5000",
+            row_mode='tuple'
+        )
+    ]
+    if not accounts:
+        raise SystemExit("The database was not generated by benchmarks.datagen")
+    latest = db_helper.execute_query("SELECT MAX(issue_date) FROM transactions", row_mode='tuple')[0][0]
+    latest = datetime.fromisoformat(str(latest)) if latest else datetime.now()
+    return {
+        'accounts': accounts,
+        'admin': {'email': datagen.ADMIN['email'], 'role': 'admin', 'password': datagen.DEFAULT_PASSWORD},
+        'borrowers': [
+            row[0] for row in db_helper.execute_query(
+                "SELECT id FROM users WHERE role = 'student' ORDER BY id LIMIT 1000", row_mode='tuple'
+            )
+        ],
+        'available': db_helper.execute_query(
+            "SELECT book_id, barcode FROM books WHERE status = 'Available' ORDER BY book_id LIMIT 2000",
+            row_mode='tuple'
+        ),
+        'subjects': [row[0] for row in db_helper.execute_query("SELECT subject_id FROM subjects", row_mode='tuple')],
+        'last_week': (latest - timedelta(days=7)).strftime('%Y-%m-%d'),
+    }
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(database, workers, worker_class, threads, log):
+    """Starts gunicorn and waits until /health answers; returns (process, port)"""
+    port = free_port()
+    env = dict(os.environ, LMS_DATABASE_PATH=database,
+               LMS_METRICS_DIR=os.path.join(os.path.dirname(log.name), f'metrics-{port}'))
+    process = subprocess.Popen([
+        sys.executable, '-m', 'gunicorn',
+        '--workers', str(workers),
+        '--worker-class', worker_class,
+        '--threads', str(threads),
+        '--bind', f'127.0.0.1:{port}',
+        '--timeout', '120',
+        'backend.app:app',
+    ], cwd=LMS_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"gunicorn exited with status {process.returncode}, see {log.name}")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return process, port
+        except OSError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit(f"gunicorn did not start within 60s, see {log.name}")
+
+def run_scenario(name, fixtures, port, duration, scale):
+    """Runs one scenario's virtual users until the duration is up"""
+    recorder = Recorder()
+    roles = [(role_class(fixtures), role_class.users) for role_class in SCENARIOS[name]]
+    users = [(role, vu) for role, count in roles for vu in range(max(1, round(count * scale)))]
+    logged_in = threading.Barrier(len(users) + 1)
+    go = threading.Barrier(len(users) + 1)
+    stop = threading.Event()
+
+    def virtual_user(role, vu):
+        client = Client(port, recorder)
+        state = role.setup(client, vu)
+        logged_in.wait()
+        # Start together: the first requests of a login storm arrive as one burst
+        go.wait()
+        while not stop.is_set():
+            role.iteration(client, state)
+        client.close()
+
+    threads = [threading.Thread(target=virtual_user, args=user, daemon=True) for user in users]
+    for thread in threads:
+        thread.start()
+    logged_in.wait()
+    # Requests sent during setup logins are not part of the measurement
+    recorder.samples.clear()
+    go.wait()
+    started = time.perf_counter()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return summarize(recorder.samples, time.perf_counter() - started, len(users))
+
+def summarize(samples, elapsed, users):
+    """Throughput, latency percentiles and errors, overall and per operation"""
+    def stats(subset):
+        latencies = sorted(seconds * 1000 for _, seconds, _ in subset)
+        errors = {}
+        for _, _, outcome in subset:
+            if outcome != 'ok':
+                errors[outcome] = errors.get(outcome, 0) + 1
+        return {
+            'requests': len(subset),
+            'throughput_rps': round(len(subset) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'max_ms': round(latencies[-1], 2) if latencies else 0.0,
+            'error_rate': round(sum(errors.values()) / len(subset), 4) if subset else 0.0,
+            'errors': errors,
+        }
+
+    operations = {}
+    for sample in samples:
+        operations.setdefault(sample[0], []).append(sample)
+    summary = stats(samples)
+    summary['virtual_users'] = users
+    summary['seconds'] = round(elapsed, 1)
+    summary['operations'] = {operation: stats(subset) for operation, subset in sorted(operations.items())}
+    return summary
+
+def count_locked(log, offset):
+    """'database is locked' lines the server logged since offset; returns (count, new offset)"""
+    with open(log.name, encoding='utf-8', errors='replace') as f:
+        f.seek(offset)
+        text = f.read()
+        return text.count(LOCKED), f.tell()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db', help='Database generated by benchmarks.datagen (default: a temporary one)')
+    parser.add_argument('--workers', default='2', help='Comma-separated gunicorn worker counts')
+    parser.add_argument('--worker-class', default='sync', help='Comma-separated gunicorn worker classes')
+    parser.add_argument('--threads', type=int, default=4, help='Threads per gthread worker')
+    parser.add_argument('--scenario', default=','.join(SCENARIOS), help='Comma-separated scenarios to run')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds per scenario')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplier on each scenario\'s virtual users')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    scenarios = args.scenario.split(',')
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+    random.seed(args.seed)
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.db:
+            db_helper.DATABASE_PATH = os.path.abspath(args.db)
+            db_helper.init_db()
+        else:
+            db_helper.DATABASE_PATH = os.path.join(tmp, 'load.db')
+            print(f"Generating {SMALL_DATASET}")
+            # Real bcrypt cost, so the login storm hashes what production hashes
+            datagen.generate(**SMALL_DATASET, rounds=PASSWORD_HASH_ROUNDS)
+        fixtures = load_fixtures()
+        db_helper.writer_queue.stop()
+        db_helper.connection_pool.close_all()
+
+        for worker_class in args.worker_class.split(','):
+            for workers in (int(count) for count in args.workers.split(',')):
+                threads = args.threads if worker_class == 'gthread' else 1
+                label = f'{workers} x {worker_class}' + (f' ({threads} threads)' if threads > 1 else '')
+                print(f"\n== {label}")
+                print(f"{'scenario':<18}{'users':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+                      f"{'errors':>8}{'locked':>8}")
+
+                with open(os.path.join(tmp, f'gunicorn-{worker_class}-{workers}.log'), 'w+') as log:
+                    process, port = start_server(db_helper.DATABASE_PATH, workers, worker_class, threads, log)
+                    offset = 0
+                    results = {}
+                    try:
+                        for name in scenarios:
+                            stats = run_scenario(name, fixtures, port, args.duration, args.scale)
+                            stats['locked_in_log'], offset = count_locked(log, offset)
+                            results[name] = stats
+                            print(f"{name:<18}{stats['virtual_users']:>6}{stats['throughput_rps']:>9.1f}"
+                                  f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}"
+                                  f"{sum(stats['errors'].values()):>8}{stats['locked_in_log']:>8}")
+                    finally:
+                        process.terminate()
+                        process.wait(timeout=30)
+
+                runs.append({
+                    'workers': workers,
+                    'worker_class': worker_class,
+                    'threads': threads,
+                    'scenarios': results,
+                })
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'database': args.db or SMALL_DATASET,
+                'duration': args.duration,
+                'scale': args.scale,
+                'runs': runs,
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+"""
+Makes the backend and benchmarks packages importable when running pytest from the lms directory
+"""
@@ -0,0 +1,56 @@
+"""
+Shared fixtures for the tests
+"""
+import pytest
+
+from backend.utils import db_helper
+from backend.utils.metrics_helper import metrics
+from backend.utils.jwt_helper import generate_token
+from benchmarks.bench_helper import create_app, seed_database
+
+STUDENT = {'id': 'student-test', 'name': 'Test Student', 'email': 'student@vrec.edu', 'role': 'student'}
+
+@pytest.fixture(scope='session', autouse=True)
+def runtime_dirs(tmp_path_factory):
+    """Keeps metric files and slow query logs out of the source tree"""
+    metrics_dir = str(tmp_path_factory.mktemp('metrics'))
+    slow_query_dir = str(tmp_path_factory.mktemp('logs'))
+    with pytest.MonkeyPatch.context() as patch:
+        # Processes started by the tests read the directories from the environment
+        patch.setenv('LMS_METRICS_DIR', metrics_dir)
+        patch.setenv('LMS_SLOW_QUERY_LOG_DIR', slow_query_dir)
+        patch.setattr(metrics, 'directory', metrics_dir)
+        patch.setattr(db_helper.slow_query_log, 'directory', slow_query_dir)
+        yield
+
+@pytest.fixture
+def library(tmp_path):
+    """A fresh migrated database with one student and two available copies, book-0 and book-1"""
+    database_path = db_helper.DATABASE_PATH
+    db_helper.DATABASE_PATH = str(tmp_path / 'lms.db')
+    seed_database(2, users=[
+        (STUDENT['id'], STUDENT['name'], STUDENT['role'], STUDENT['email'], 'x')
+    ])
+    yield db_helper.DATABASE_PATH
+    db_helper.writer_queue.stop()
+    db_helper.connection_pool.close_all()
+    db_helper.DATABASE_PATH = database_path
+
+@pytest.fixture
+def app(library):
+    """An app with the API blueprints on the library database"""
+    return create_app('books', 'transactions')
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def student():
+    """The account seeded by the library fixture"""
+    return STUDENT
+
+@pytest.fixture
+def auth_headers():
+    """Authorization header for the test student"""
+    return {'Authorization': f"Bearer {generate_token(STUDENT)}"}
@@ -0,0 +1,47 @@
+"""
+Circulation routes whose conditional update can match no row
+"""
+import pytest
+
+from backend.utils.db_helper import execute_query
+
+@pytest.fixture
+def allot(client, auth_headers, student):
+    """Posts an allot request for a book to the test student"""
+    def post(book_id):
+        return client.post(
+            '/api/books/allot',
+            json={'book_id': book_id, 'user_id': student['id']},
+            headers=auth_headers
+        )
+    return post
+
+def test_allot_issued_book_is_rejected(allot):
+    assert allot('book-0').status_code == 200
+    response = allot('book-0')
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Book is not available'
+
+def test_allot_missing_book_is_not_found(allot):
+    response = allot('book-missing')
+    assert response.status_code == 404
+    assert response.get_json()['message'] == 'Book not found'
+
+def test_return_returned_book_is_rejected(client, auth_headers, allot):
+    assert allot('book-0').status_code == 200
+    returned = client.post('/api/books/return', json={'book_id': 'book-0'}, headers=auth_headers)
+    assert returned.status_code == 200
+    response = client.post('/api/books/return', json={'book_id': 'book-0'}, headers=auth_headers)
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Book is not issued'
+
+def test_preorder_issued_book_is_rejected(client, auth_headers, allot):
+    assert allot('book-1').status_code == 200
+    response = client.post(
+        '/api/books/preorder',
+        json={'book_id': 'book-1', 'payment_status': 'Pending'},
+        headers=auth_headers
+    )
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Book is not available'
+    assert execute_query("SELECT COUNT(*) as count FROM preorders")[0]['count'] == 0
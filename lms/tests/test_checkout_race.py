@@ -0,0 +1,33 @@
+"""
+Concurrent checkouts of one copy through POST /api/books/allot
+"""
+import threading
+
+from backend.utils.db_helper import execute_query
+
+THREADS = 8
+
+def test_one_copy_is_issued_once(app, auth_headers, student):
+    barrier = threading.Barrier(THREADS)
+    statuses = []
+
+    def checkout():
+        client = app.test_client()
+        barrier.wait()
+        response = client.post(
+            '/api/books/allot',
+            json={'book_id': 'book-0', 'user_id': student['id']},
+            headers=auth_headers
+        )
+        statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=checkout) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses) == [200] + [400] * (THREADS - 1)
+    loans = execute_query("SELECT book_id FROM transactions", row_mode='tuple')
+    assert loans == [('book-0',)]
+    assert execute_query("SELECT status FROM books WHERE book_id = 'book-0'")[0]['status'] == 'Issued'
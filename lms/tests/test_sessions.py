@@ -0,0 +1,28 @@
+"""
+Refresh token rotation
+"""
+from datetime import datetime, timedelta
+
+from backend.utils.db_helper import execute_query, format_timestamp
+from backend.utils.session_helper import create_session, rotate_session
+
+def test_rotation_issues_a_new_token(library, student):
+    token = create_session(student['id'])
+    user, new_token = rotate_session(token)
+    assert user['id'] == student['id']
+    assert new_token != token
+
+def test_expired_session_is_rejected(library, student):
+    token = create_session(student['id'])
+    execute_query(
+        "UPDATE sessions SET expires_at = %s",
+        (format_timestamp(datetime.now() - timedelta(seconds=1)),),
+        fetch=False
+    )
+    assert rotate_session(token) is None
+
+def test_reused_token_revokes_the_family(library, student):
+    token = create_session(student['id'])
+    _, new_token = rotate_session(token)
+    assert rotate_session(token) is None
+    assert rotate_session(new_token) is None